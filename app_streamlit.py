@@ -5,12 +5,17 @@ Autores: Juan Manuel Marín Angarita (A00382037), Cristian Eduardo Botina Carpio
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 import os
-from collections import Counter, defaultdict
-from itertools import combinations
+import sys
+import time
+import functools
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 
 # Configuración de la página
 st.set_page_config(
@@ -73,9 +78,213 @@ DATA_DIR = BASE_DIR / "data"
 IMG_DIR = BASE_DIR / "docs" / "img"
 PRODUCTS_DIR = BASE_DIR / "Products"
 TRANSACTIONS_DIR = BASE_DIR / "Transactions"
+FREQUENCIES_FILE = DATA_DIR / "product_frequencies.npz"
+CATEGORY_LOOKUP_FILE = DATA_DIR / "category_lookup.npz"
+CATEGORY_COOCCURRENCE_FILE = DATA_DIR / "category_cooccurrence.npz"
+RULES_DIR = DATA_DIR / "association_rules"
+RESULTS_DB = DATA_DIR / "results.sqlite"
+
+# Panel de rendimiento visible por defecto (también se activa en la barra lateral)
+PERF_PANEL_DEFAULT = os.environ.get("APP_PERF_PANEL", "").lower() not in ("", "0", "false")
+
+# Llamadas/recargas recientes guardadas por función y por página (p50/p95)
+PERF_HISTORY = 200
+
+# Módulos compartidos con el pipeline de Airflow (dags/pipeline)
+sys.path.insert(0, str(BASE_DIR / "dags"))
+from pipeline.ingest import file_sha256
+from pipeline.kernels import (
+    build_category_lookup,
+    category_cooccurrence,
+    encode_transactions,
+    load_cooccurrence,
+    load_frequencies,
+    load_published_category_lookup,
+    matches_sources,
+    product_category_frequencies,
+    top_products,
+)
+from pipeline.rules import (
+    category_pair_table,
+    compute_pair_table_for_files,
+    compute_rules_for_files,
+    dataset_fingerprint,
+    load_pair_table,
+    load_rules,
+    pairs_path,
+    rule_count_curve,
+    rules_from_pair_table,
+    rules_path,
+)
+from pipeline.results_store import latest_run, load_result, query_rules
+
+# ==========================
+# MONITOR DE RENDIMIENTO
+# ==========================
+
+# Estado de la recarga en curso (Streamlit ejecuta cada sesión en su hilo)
+_perf_state = threading.local()
+
+@st.cache_resource
+def get_performance_log():
+    """Historial de latencias y tamaños compartido por todas las sesiones"""
+    return {
+        "lock": threading.Lock(),
+        "calls": defaultdict(lambda: deque(maxlen=PERF_HISTORY)),
+        "reruns": defaultdict(lambda: deque(maxlen=PERF_HISTORY)),
+        "sizes": {},
+    }
+
+def object_size(value):
+    """Tamaño aproximado en bytes de un resultado (DataFrames y arrays con su contenido)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(object_size(k) + object_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(object_size(item) for item in value)
+    return sys.getsizeof(value)
+
+def record_call(name, seconds, hit, size, position=None):
+    """
+    Registra una llamada a un helper en el historial y en la recarga en curso
+    (en `position`, para que las llamadas anidadas queden tras la que las hace)
+    """
+    log = get_performance_log()
+    with log["lock"]:
+        log["calls"][name].append((seconds, hit))
+        if size is not None:
+            log["sizes"][name] = size
+    rerun_calls = getattr(_perf_state, "rerun_calls", None)
+    if rerun_calls is not None:
+        depth = len(getattr(_perf_state, "frames", []))
+        rerun_calls.insert(len(rerun_calls) if position is None else position, {
+            "Función": "· " * depth + name,
+            "ms": round(seconds * 1000, 1),
+            "Caché": {True: "hit", False: "miss", None: "—"}[hit],
+            "MB": round(log["sizes"].get(name, 0) / 1e6, 2) if hit is not None else None,
+        })
+
+def timed(cache=None):
+    """
+    Decorador de los helpers: mide cada llamada y, con `cache` (st.cache_data),
+    distingue aciertos de fallos según se ejecute o no el cuerpo de la función
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def compute(*args, **kwargs):
+            # Solo se ejecuta en un fallo de caché
+            frames = getattr(_perf_state, "frames", None)
+            if frames:
+                frames[-1]["miss"] = True
+            return function(*args, **kwargs)
+
+        cached = cache(compute) if cache is not None else function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not hasattr(_perf_state, "frames"):
+                _perf_state.frames = []
+            frame = {"miss": False}
+            _perf_state.frames.append(frame)
+            position = len(getattr(_perf_state, "rerun_calls", None) or [])
+            start = time.perf_counter()
+            try:
+                result = cached(*args, **kwargs)
+            finally:
+                _perf_state.frames.pop()
+            seconds = time.perf_counter() - start
+            if cache is None:
+                record_call(function.__name__, seconds, None, None, position)
+            else:
+                hit = not frame["miss"]
+                size = None if hit else object_size(result)
+                record_call(function.__name__, seconds, hit, size, position)
+            return result
+
+        if hasattr(cached, "clear"):
+            wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+def record_rerun(page, seconds):
+    """Registra la duración de una recarga completa de la página"""
+    log = get_performance_log()
+    with log["lock"]:
+        log["reruns"][page].append(seconds)
+
+def _percentile_ms(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 1)
+
+def function_performance_summary():
+    """Llamadas recientes, tasa de aciertos, p50/p95 y tamaño en caché por helper"""
+    log = get_performance_log()
+    with log["lock"]:
+        calls = {name: list(history) for name, history in log["calls"].items()}
+        sizes = dict(log["sizes"])
+    rows = []
+    for name, history in sorted(calls.items()):
+        seconds = [elapsed for elapsed, _ in history]
+        hits = [hit for _, hit in history if hit is not None]
+        rows.append({
+            "Función": name,
+            "Llamadas": len(history),
+            "Aciertos": f"{sum(hits) / len(hits):.0%}" if hits else "—",
+            "p50 (ms)": _percentile_ms(seconds, 50),
+            "p95 (ms)": _percentile_ms(seconds, 95),
+            "MB": round(sizes[name] / 1e6, 2) if name in sizes else None,
+        })
+    return pd.DataFrame(rows)
+
+def page_performance_summary():
+    """Recargas recientes y p50/p95 de su duración por página"""
+    log = get_performance_log()
+    with log["lock"]:
+        reruns = {page: list(history) for page, history in log["reruns"].items()}
+    return pd.DataFrame([
+        {
+            "Página": page,
+            "Recargas": len(seconds),
+            "p50 (ms)": _percentile_ms(seconds, 50),
+            "p95 (ms)": _percentile_ms(seconds, 95),
+        }
+        for page, seconds in sorted(reruns.items(), key=lambda item: str(item[0]))
+    ])
+
+def render_performance_panel(page, seconds, rerun_calls):
+    """Panel de la barra lateral: esta recarga y el acumulado de todas las sesiones"""
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=True):
+        st.caption(f"Recarga de «{page}»: {seconds * 1000:.0f} ms")
+        if rerun_calls:
+            st.dataframe(pd.DataFrame(rerun_calls), hide_index=True, use_container_width=True)
+        st.markdown(f"**Helpers** (últimas {PERF_HISTORY} llamadas, todas las sesiones)")
+        st.dataframe(function_performance_summary(), hide_index=True, use_container_width=True)
+        st.markdown("**Recargas por página**")
+        st.dataframe(page_performance_summary(), hide_index=True, use_container_width=True)
+
+def run_with_performance_panel(app):
+    """Ejecuta una recarga de la app midiendo su duración por página y sus llamadas"""
+    _perf_state.rerun_calls = []
+    _perf_state.frames = []
+    start = time.perf_counter()
+    try:
+        app()
+    finally:
+        # También tras st.stop(), que termina la recarga con una excepción
+        seconds = time.perf_counter() - start
+        page = st.session_state.get("page")
+        record_rerun(page, seconds)
+        rerun_calls, _perf_state.rerun_calls = _perf_state.rerun_calls, None
+        st.sidebar.markdown("---")
+        if st.sidebar.checkbox("Panel de rendimiento", value=PERF_PANEL_DEFAULT, key="perf_panel"):
+            render_performance_panel(page, seconds, rerun_calls)
 
 # Cache para cargar datos
-@st.cache_data
+@timed(st.cache_data)
 def load_data():
     """Carga todos los datasets necesarios"""
     try:
@@ -117,8 +326,19 @@ def load_data():
         st.error(f"Error cargando datos: {e}")
         return None, None, None
 
-@st.cache_data
 def calculate_statistics(transactions_df):
+    """
+    Estadísticas descriptivas: las guardadas por el DAG para este dataset
+    (desde agregados y sketches por archivo) o, si no hay, calculadas sobre
+    las transacciones cargadas
+    """
+    stats = get_stored_statistics(get_dataset_fingerprint(get_transactions_file_stats()))
+    if stats is not None:
+        return stats
+    return compute_statistics(transactions_df)
+
+@timed(st.cache_data)
+def compute_statistics(transactions_df):
     """Calcula estadísticas descriptivas"""
     stats = {
         "total_ventas": transactions_df["num_products"].sum(),
@@ -131,94 +351,215 @@ def calculate_statistics(transactions_df):
     }
     return stats
 
-@st.cache_data
-def get_top_products(transactions_df, n=10):
-    """Obtiene los productos más vendidos"""
-    all_products = []
-    for products in transactions_df["products"]:
-        all_products.extend(products.split())
+@timed(st.cache_data)
+def get_product_frequencies(transactions_df, product_category_df):
+    """Frecuencias de productos y categorías (publicadas por el DAG o calculadas con el kernel)"""
+    if FREQUENCIES_FILE.exists():
+        frequencies = load_frequencies(FREQUENCIES_FILE)
+        # Solo reutilizar si se publicaron para los mismos archivos de transacciones y ProductCategory
+        if matches_sources(frequencies, **get_source_fingerprints()):
+            return frequencies
     
-    product_counts = Counter(all_products)
-    top_products = product_counts.most_common(n)
+    baskets = encode_transactions(transactions_df)
+    return product_category_frequencies(baskets, get_category_lookup(product_category_df))
+
+@timed()
+def get_category_lookup(product_category_df):
+    """Lookup denso producto -> categoría (publicado por el DAG o construido en memoria)"""
+    if CATEGORY_LOOKUP_FILE.exists():
+        # None si el DAG lo publicó para otro ProductCategory.csv
+        lookup = load_published_category_lookup(CATEGORY_LOOKUP_FILE, get_product_category_sha256())
+        if lookup is not None:
+            return lookup
+    return build_category_lookup(product_category_df)
+
+@timed(st.cache_data)
+def get_category_cooccurrence(transactions_df, product_category_df):
+    """Co-ocurrencia de categorías en canastas (publicada por el DAG o calculada con el kernel)"""
+    if CATEGORY_COOCCURRENCE_FILE.exists():
+        cooccurrence = load_cooccurrence(CATEGORY_COOCCURRENCE_FILE)
+        # Solo reutilizar si se publicó para los mismos archivos de transacciones y ProductCategory
+        if matches_sources(cooccurrence, **get_source_fingerprints()):
+            return cooccurrence
     
-    df = pd.DataFrame(top_products, columns=["Producto", "Ventas"])
+    baskets = encode_transactions(transactions_df)
+    return category_cooccurrence(baskets, get_category_lookup(product_category_df))
+
+@timed(st.cache_data)
+def get_top_products(transactions_df, product_category_df, n=10):
+    """Obtiene los productos más vendidos"""
+    frequencies = get_product_frequencies(transactions_df, product_category_df)
+    df = pd.DataFrame(top_products(frequencies, n), columns=["Producto", "Ventas"])
     return df
 
-@st.cache_data
+@timed(st.cache_data)
 def get_top_customers(transactions_df, n=10):
     """Obtiene los clientes más frecuentes"""
     customer_counts = transactions_df.groupby("customer").size().sort_values(ascending=False).head(n)
     df = pd.DataFrame({"Cliente": customer_counts.index, "Transacciones": customer_counts.values})
     return df
 
-@st.cache_data
-def build_association_rules(transactions_df, min_support=0.01, min_confidence=0.3):
-    """Construye reglas de asociación usando Apriori"""
-    transactions_list = []
-    for products_str in transactions_df["products"]:
-        products = products_str.split()
-        transactions_list.append(products)
-    
-    # Calcular frecuencia de items individuales
-    item_counts = Counter()
-    for transaction in transactions_list:
-        for item in set(transaction):
-            item_counts[item] += 1
-    
-    total_transactions = len(transactions_list)
-    frequent_items = {
-        item: count for item, count in item_counts.items()
-        if count / total_transactions >= min_support
+@timed()
+def get_stored_run(fingerprint):
+    """Última ejecución del DAG guardada en el almacén para este dataset, o None"""
+    if not RESULTS_DB.exists():
+        return None
+    return latest_run(str(RESULTS_DB), fingerprint)
+
+@timed()
+def get_stored_top_customers(fingerprint, n=10):
+    """Top clientes guardados por el DAG (sin recorrer las transacciones), o None"""
+    run = get_stored_run(fingerprint)
+    if run is None:
+        return None
+    customer_results = load_result(str(RESULTS_DB), run["run_id"], "customer")
+    top_customers = (customer_results or {}).get("top_customers")
+    if not top_customers or len(top_customers) < n:
+        return None
+    customers = list(top_customers.items())[:n]
+    return pd.DataFrame({
+        "Cliente": [int(customer) for customer, _ in customers],
+        "Transacciones": [count for _, count in customers],
+    })
+
+@timed()
+def get_stored_statistics(fingerprint):
+    """Estadísticas del resumen guardado por el DAG (sin recorrer las transacciones), o None"""
+    run = get_stored_run(fingerprint)
+    if run is None:
+        return None
+    summary = (load_result(str(RESULTS_DB), run["run_id"], "stats") or {}).get("summary")
+    if not summary or "first_date" not in summary:
+        return None
+    return {
+        "total_ventas": summary["total_products"],
+        "num_transacciones": summary["num_transactions"],
+        "promedio_productos": summary["total_products"] / summary["num_transactions"],
+        "clientes_unicos": summary["num_customers"],
+        "tiendas": summary["num_stores"],
+        "fecha_inicio": pd.Timestamp(summary["first_date"]),
+        "fecha_fin": pd.Timestamp(summary["last_date"])
     }
-    
-    # Calcular pares frecuentes
-    pair_counts = Counter()
-    for transaction in transactions_list:
-        items = list(set(transaction))
-        for pair in combinations(sorted(items), 2):
-            pair_counts[pair] += 1
-    
-    frequent_pairs = {
-        pair: count for pair, count in pair_counts.items()
-        if count / total_transactions >= min_support
+
+@timed()
+def get_stored_product_recommendations(fingerprint, product_id, min_support, min_confidence, top_n=5):
+    """
+    Recomendaciones para un producto consultando las reglas del almacén por
+    antecedente (índice), o None si no hay una ejecución con estos umbrales
+    """
+    run = get_stored_run(fingerprint)
+    if run is None or (run["min_support"], run["min_confidence"]) != (min_support, min_confidence):
+        return None
+    rules_df = query_rules(str(RESULTS_DB), run["run_id"], antecedent=product_id, limit=top_n)
+    return [
+        {
+            "product": rule["consequent"],
+            "confidence": rule["confidence"],
+            "lift": rule["lift"],
+            "support": rule["support"],
+        }
+        for rule in rules_df.to_dict("records")
+    ]
+
+@timed()
+def get_transactions_file_stats():
+    """Path, tamaño y mtime de cada CSV de Transactions (invalida la huella si cambian)"""
+    return tuple(
+        (str(path), path.stat().st_size, path.stat().st_mtime_ns)
+        for path in sorted(TRANSACTIONS_DIR.glob("*.csv"))
+    )
+
+@timed(st.cache_data)
+def get_dataset_fingerprint(file_stats):
+    """Huella del dataset: la misma que usa el DAG para guardar las reglas"""
+    return dataset_fingerprint([file_sha256(path) for path, _, _ in file_stats])
+
+@timed(st.cache_data)
+def get_file_sha256(path, size, mtime_ns):
+    """Hash del contenido de un archivo (se recalcula si cambian tamaño o mtime)"""
+    return file_sha256(path)
+
+def get_product_category_sha256():
+    """Hash de ProductCategory.csv: con él publica el DAG el lookup, las frecuencias y la co-ocurrencia"""
+    path = PRODUCTS_DIR / "ProductCategory.csv"
+    stat = path.stat()
+    return get_file_sha256(str(path), stat.st_size, stat.st_mtime_ns)
+
+def get_source_fingerprints():
+    """Huellas de los datos de origen con las que el DAG publica sus archivos para la app"""
+    return {
+        "dataset_fingerprint": get_dataset_fingerprint(get_transactions_file_stats()),
+        "product_category_sha256": get_product_category_sha256(),
     }
-    
-    # Calcular reglas de asociación
-    rules = []
-    for (item_a, item_b), count_ab in frequent_pairs.items():
-        support_ab = count_ab / total_transactions
-        support_a = item_counts[item_a] / total_transactions
-        support_b = item_counts[item_b] / total_transactions
-        
-        # Regla A -> B
-        confidence_ab = count_ab / item_counts[item_a]
-        lift_ab = confidence_ab / support_b
-        
-        if confidence_ab >= min_confidence:
-            rules.append({
-                "antecedent": item_a,
-                "consequent": item_b,
-                "support": support_ab,
-                "confidence": confidence_ab,
-                "lift": lift_ab
-            })
-        
-        # Regla B -> A
-        confidence_ba = count_ab / item_counts[item_b]
-        lift_ba = confidence_ba / support_a
-        
-        if confidence_ba >= min_confidence:
-            rules.append({
-                "antecedent": item_b,
-                "consequent": item_a,
-                "support": support_ab,
-                "confidence": confidence_ba,
-                "lift": lift_ba
-            })
-    
-    return rules, item_counts
 
-@st.cache_data
+@timed(st.cache_data)
+def load_association_rules(fingerprint, min_support, min_confidence, rules_mtime):
+    """Carga las reglas de asociación guardadas (por el DAG o en segundo plano)"""
+    rules_df, item_counts = load_rules(str(RULES_DIR), fingerprint, min_support, min_confidence)
+    return rules_df.to_dict("records"), item_counts
+
+@timed()
+def get_association_rules(fingerprint, min_support, min_confidence):
+    """Reglas en caché para estos umbrales, o None si aún no se han calculado"""
+    path = Path(rules_path(str(RULES_DIR), fingerprint, min_support, min_confidence))
+    if not path.exists():
+        return None
+    return load_association_rules(fingerprint, min_support, min_confidence, path.stat().st_mtime_ns)
+
+@st.cache_resource
+def get_rules_executor():
+    """Proceso en segundo plano para recalcular reglas sin bloquear la interfaz"""
+    return ProcessPoolExecutor(max_workers=1)
+
+@st.cache_resource
+def get_rules_jobs():
+    """Cálculos de reglas en curso, por (huella, soporte, confianza)"""
+    return {}
+
+def request_rules_computation(fingerprint, min_support, min_confidence):
+    """Lanza (una sola vez) el cálculo de reglas para umbrales sin caché"""
+    jobs = get_rules_jobs()
+    key = (fingerprint, min_support, min_confidence)
+    if key not in jobs:
+        transactions_files = [path for path, _, _ in get_transactions_file_stats()]
+        jobs[key] = get_rules_executor().submit(
+            compute_rules_for_files,
+            transactions_files,
+            str(RULES_DIR),
+            fingerprint,
+            min_support,
+            min_confidence,
+        )
+    return jobs[key]
+
+@timed(st.cache_data)
+def load_pair_counts(fingerprint, pairs_mtime):
+    """Carga la tabla de conteos de items y pares al soporte base"""
+    return load_pair_table(pairs_path(str(RULES_DIR), fingerprint))
+
+@timed()
+def get_pair_table(fingerprint):
+    """Tabla de pares del dataset, o None si aún no se ha calculado"""
+    path = Path(pairs_path(str(RULES_DIR), fingerprint))
+    if not path.exists():
+        return None
+    return load_pair_counts(fingerprint, path.stat().st_mtime_ns)
+
+def request_pair_table_computation(fingerprint):
+    """Lanza (una sola vez) el cálculo de la tabla de pares si el DAG no la publicó"""
+    jobs = get_rules_jobs()
+    key = (fingerprint, "pairs")
+    if key not in jobs:
+        transactions_files = [path for path, _, _ in get_transactions_file_stats()]
+        jobs[key] = get_rules_executor().submit(
+            compute_pair_table_for_files,
+            transactions_files,
+            str(RULES_DIR),
+            fingerprint,
+        )
+    return jobs[key]
+
+@timed(st.cache_data)
 def recommend_for_customer(customer_id, transactions_df, rules, top_n=5):
     """Recomienda productos para un cliente específico"""
     # Obtener productos que el cliente ya compró
@@ -270,7 +611,7 @@ def recommend_for_customer(customer_id, transactions_df, rules, top_n=5):
     
     return sorted_recs, customer_products
 
-@st.cache_data
+@timed(st.cache_data)
 def recommend_for_product(product_id, rules, top_n=5):
     """Recomienda productos complementarios para un producto específico"""
     # Crear diccionario de recomendaciones
@@ -311,10 +652,13 @@ def main():
             "Análisis Descriptivo",
             "Segmentación de Clientes",
             "Sistema de Recomendación",
+            "Explorar Reglas",
+            "Reglas por Categoría",
             "Visualizaciones",
             "Informe Completo",
             "Cargar Nuevos Datos"
-        ]
+        ],
+        key="page"
     )
     
     # Cargar datos
@@ -365,12 +709,12 @@ def main():
         
         # Top 10 Productos
         st.markdown('<div class="sub-header">Top 10 Productos Más Vendidos</div>', unsafe_allow_html=True)
-        top_products = get_top_products(transactions_df, 10)
+        top_products_df = get_top_products(transactions_df, product_category_df, 10)
         
         col1, col2 = st.columns([2, 1])
         with col1:
             fig = px.bar(
-                top_products,
+                top_products_df,
                 x="Ventas",
                 y="Producto",
                 orientation="h",
@@ -382,11 +726,13 @@ def main():
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            st.dataframe(top_products, height=400)
+            st.dataframe(top_products_df, height=400)
         
         # Top 10 Clientes
         st.markdown('<div class="sub-header">Top 10 Clientes por Transacciones</div>', unsafe_allow_html=True)
-        top_customers = get_top_customers(transactions_df, 10)
+        top_customers = get_stored_top_customers(get_dataset_fingerprint(get_transactions_file_stats()), 10)
+        if top_customers is None:
+            top_customers = get_top_customers(transactions_df, 10)
         
         col1, col2 = st.columns([2, 1])
         with col1:
@@ -680,15 +1026,45 @@ def main():
         """)
         
         # Parámetros de Apriori
-        st.info("""
+        col1, col2 = st.columns(2)
+        with col1:
+            min_support = st.select_slider(
+                "Soporte mínimo:",
+                options=[0.005, 0.01, 0.02, 0.03, 0.05],
+                value=0.01,
+                format_func=lambda x: f"{x:.1%}"
+            )
+        with col2:
+            min_confidence = st.select_slider(
+                "Confianza mínima:",
+                options=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6],
+                value=0.3,
+                format_func=lambda x: f"{x:.0%}"
+            )
+        
+        st.info(f"""
         **Parámetros del Algoritmo Apriori:**
-        - **Soporte mínimo**: 1% (0.01) - Solo se consideran productos que aparecen en al menos 1% de transacciones
-        - **Confianza mínima**: 30% (0.30) - Las reglas deben tener al menos 30% de probabilidad de ocurrir
+        - **Soporte mínimo**: {min_support:.1%} ({min_support}) - Solo se consideran productos que aparecen en al menos {min_support:.1%} de transacciones
+        - **Confianza mínima**: {min_confidence:.0%} ({min_confidence:.2f}) - Las reglas deben tener al menos {min_confidence:.0%} de probabilidad de ocurrir
         """)
         
-        # Construir reglas de asociación
-        with st.spinner("Construyendo reglas de asociación..."):
-            rules, item_counts = build_association_rules(transactions_df, min_support=0.01, min_confidence=0.3)
+        # Reglas de asociación: guardadas por el DAG o calculadas en segundo plano
+        fingerprint = get_dataset_fingerprint(get_transactions_file_stats())
+        association = get_association_rules(fingerprint, min_support, min_confidence)
+        if association is None:
+            job = request_rules_computation(fingerprint, min_support, min_confidence)
+            if job.done() and job.exception() is not None:
+                st.error(f"Error al calcular las reglas de asociación: {job.exception()}")
+                get_rules_jobs().pop((fingerprint, min_support, min_confidence), None)
+            else:
+                st.warning(
+                    "Las reglas para estos umbrales aún no están en caché. "
+                    "Se están calculando en segundo plano; actualiza en unos momentos."
+                )
+            if st.button("Actualizar"):
+                st.rerun()
+            st.stop()
+        rules, item_counts = association
         
         st.success(f"Se generaron {len(rules)} reglas de asociación con éxito")
         
@@ -817,11 +1193,22 @@ def main():
             
             if st.button("Generar Productos Complementarios", type="primary"):
                 with st.spinner("Buscando productos complementarios..."):
-                    recommendations = recommend_for_product(
+                    # Consulta indexada al almacén si el DAG guardó estos umbrales
+                    recommendations = get_stored_product_recommendations(
+                        fingerprint,
                         selected_product,
-                        rules,
+                        min_support,
+                        min_confidence,
                         top_n=num_product_recs
                     )
+                    if recommendations is None:
+                        recommendations = recommend_for_product(
+                            selected_product,
+                            rules,
+                            top_n=num_product_recs
+                        )
+                    elif not recommendations:
+                        recommendations = None
                 
                 if recommendations is None:
                     st.error(f"No se encontraron productos complementarios para {selected_product}")
@@ -897,6 +1284,180 @@ def main():
         rules_df = pd.DataFrame(rules_data)
         st.dataframe(rules_df, use_container_width=True)
     
+    # ==========================
+    # PÁGINA: EXPLORAR REGLAS
+    # ==========================
+    elif page == "Explorar Reglas":
+        st.markdown('<div class="main-header">Exploración de Umbrales de Apriori</div>', unsafe_allow_html=True)
+        
+        st.markdown("""
+        Los conteos de productos y de pares se guardan una sola vez con un soporte base bajo.
+        Soporte, confianza y lift de cualquier umbral mayor se obtienen **filtrando esa tabla**,
+        sin volver a recorrer las transacciones.
+        """)
+        
+        fingerprint = get_dataset_fingerprint(get_transactions_file_stats())
+        pair_table = get_pair_table(fingerprint)
+        if pair_table is None:
+            job = request_pair_table_computation(fingerprint)
+            if job.done() and job.exception() is not None:
+                st.error(f"Error al calcular la tabla de pares: {job.exception()}")
+                get_rules_jobs().pop((fingerprint, "pairs"), None)
+            else:
+                st.warning(
+                    "La tabla de pares aún no está disponible. "
+                    "Se está calculando en segundo plano; actualiza en unos momentos."
+                )
+            if st.button("Actualizar"):
+                st.rerun()
+            st.stop()
+        
+        base_support = float(pair_table["base_support"])
+        num_transactions = int(pair_table["num_transactions"])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            min_support = st.slider(
+                "Soporte mínimo:",
+                min_value=base_support,
+                max_value=0.05,
+                value=0.01,
+                step=0.001,
+                format="%.3f"
+            )
+        with col2:
+            min_confidence = st.slider(
+                "Confianza mínima:",
+                min_value=0.0,
+                max_value=1.0,
+                value=0.3,
+                step=0.05,
+                format="%.2f"
+            )
+        
+        # Filtrado vectorizado sobre la tabla de pares
+        start = time.perf_counter()
+        explored_rules = rules_from_pair_table(pair_table, min_support, min_confidence)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Reglas", f"{len(explored_rules):,}")
+        with col2:
+            frequent_items = pair_table["item_counts"] / num_transactions >= min_support
+            st.metric("Productos frecuentes", f"{int(frequent_items.sum()):,}")
+        with col3:
+            frequent_pairs = pair_table["pair_counts"] / num_transactions >= min_support
+            st.metric("Pares frecuentes", f"{int(frequent_pairs.sum()):,}")
+        with col4:
+            st.metric("Tiempo de filtrado", f"{elapsed_ms:.1f} ms")
+        
+        # Curva: número de reglas según el soporte mínimo
+        st.markdown('<div class="sub-header">Número de Reglas vs. Soporte Mínimo</div>', unsafe_allow_html=True)
+        supports = np.linspace(base_support, 0.05, 50)
+        curve_df = pd.DataFrame({
+            "Soporte mínimo": supports,
+            "Reglas": rule_count_curve(pair_table, supports, min_confidence)
+        })
+        fig = px.line(
+            curve_df,
+            x="Soporte mínimo",
+            y="Reglas",
+            title=f"Reglas con confianza ≥ {min_confidence:.0%}",
+            log_y=True,
+            template="plotly_dark"
+        )
+        fig.add_vline(x=min_support, line_dash="dash", line_color="red")
+        fig.update_layout(height=400, xaxis_tickformat=".1%")
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Top reglas para los umbrales elegidos
+        st.markdown('<div class="sub-header">Top 20 Reglas por Lift</div>', unsafe_allow_html=True)
+        top_rules = explored_rules.sort_values("lift", ascending=False, kind="stable").head(20)
+        st.dataframe(
+            pd.DataFrame({
+                "Regla": top_rules["antecedent"] + " → " + top_rules["consequent"],
+                "Soporte": (top_rules["support"] * 100).map("{:.2f}%".format),
+                "Confianza": (top_rules["confidence"] * 100).map("{:.1f}%".format),
+                "Lift": top_rules["lift"].map("{:.2f}".format)
+            }).reset_index(drop=True),
+            use_container_width=True
+        )
+    
+    # ==========================
+    # PÁGINA: REGLAS POR CATEGORÍA
+    # ==========================
+    elif page == "Reglas por Categoría":
+        st.markdown('<div class="main-header">Reglas de Asociación entre Categorías</div>', unsafe_allow_html=True)
+        
+        st.markdown("""
+        Cada canasta se reduce al **conjunto de categorías** de sus productos (según `ProductCategory.csv`).
+        Con pocas categorías la co-ocurrencia cabe en una matriz densa, y las reglas resultantes son
+        menos dispersas que las de productos individuales.
+        """)
+        
+        cooccurrence = get_category_cooccurrence(transactions_df, product_category_df)
+        matrix = cooccurrence["matrix"]
+        num_transactions = int(cooccurrence["num_transactions"])
+        category_names = dict(zip(categories_df["category_id"], categories_df["category_name"]))
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            min_support = st.select_slider(
+                "Soporte mínimo:",
+                options=[0.005, 0.01, 0.02, 0.05, 0.1, 0.2],
+                value=0.01,
+                format_func=lambda x: f"{x:.1%}"
+            )
+        with col2:
+            min_confidence = st.select_slider(
+                "Confianza mínima:",
+                options=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7],
+                value=0.3,
+                format_func=lambda x: f"{x:.0%}"
+            )
+        
+        category_rules = rules_from_pair_table(
+            category_pair_table(cooccurrence), min_support, min_confidence
+        )
+        st.success(f"Se generaron {len(category_rules)} reglas entre categorías")
+        
+        # Heatmap de lift entre categorías
+        st.markdown('<div class="sub-header">Lift entre Categorías</div>', unsafe_allow_html=True)
+        present = np.flatnonzero(np.diag(matrix))
+        counts = np.diag(matrix)[present]
+        lift_matrix = matrix[np.ix_(present, present)] * num_transactions / np.outer(counts, counts)
+        np.fill_diagonal(lift_matrix, np.nan)
+        labels = [category_names.get(c, str(c)) for c in present]
+        fig = px.imshow(
+            lift_matrix,
+            x=labels,
+            y=labels,
+            color_continuous_scale="RdBu_r",
+            color_continuous_midpoint=1.0,
+            labels={"color": "Lift"},
+            title="Lift de co-ocurrencia (1 = independencia)",
+            template="plotly_dark"
+        )
+        fig.update_layout(height=800)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Top reglas entre categorías
+        st.markdown('<div class="sub-header">Top 20 Reglas por Lift</div>', unsafe_allow_html=True)
+        top_rules = category_rules.sort_values("lift", ascending=False, kind="stable").head(20)
+        st.dataframe(
+            pd.DataFrame({
+                "Regla": [
+                    f"{category_names.get(int(a), a)} → {category_names.get(int(c), c)}"
+                    for a, c in zip(top_rules["antecedent"], top_rules["consequent"])
+                ],
+                "Soporte": (top_rules["support"] * 100).map("{:.2f}%".format),
+                "Confianza": (top_rules["confidence"] * 100).map("{:.1f}%".format),
+                "Lift": top_rules["lift"].map("{:.2f}".format)
+            }),
+            use_container_width=True
+        )
+    
     # ==========================
     # PÁGINA: VISUALIZACIONES
     # ==========================
@@ -1090,7 +1651,8 @@ def main():
         
         **4. Agregar nuevos archivos CSV**
         - Coloca los archivos en la carpeta `Transactions/`
-        - El DAG detectará automáticamente los nuevos archivos
+        - El DAG `transactions_watcher_dag` detectará automáticamente los nuevos archivos
+        - Cada archivo nuevo se valida y procesa en paralelo (una tarea por archivo)
         - Se ejecutará el pipeline completo: carga → limpieza → análisis → visualizaciones
         
         **5. Resultados**
@@ -1161,4 +1723,4 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
+    run_with_performance_panel(main)
@@ -1,21 +1,112 @@
 from datetime import datetime, timedelta
-from airflow import DAG
-from airflow.operators.python import PythonOperator
-from airflow.exceptions import AirflowException
-from airflow.models import Pool
-from airflow import settings
+
+try:
+    from airflow import DAG
+    from airflow.operators.python import PythonOperator
+    from airflow.exceptions import (
+        AirflowException,
+        AirflowFailException,
+        AirflowSkipException,
+    )
+    from airflow.models import Pool
+    from airflow import settings
+except ImportError:
+    # Sin Airflow (scripts/run_local.py): mismo grafo con las clases locales
+    from pipeline.local_runner import (
+        DAG,
+        PythonOperator,
+        AirflowException,
+        AirflowFailException,
+        AirflowSkipException,
+    )
+
+    Pool = settings = None
 import pandas as pd
 import os
 import glob
-import matplotlib.pyplot as plt
-from itertools import combinations
-from collections import defaultdict, Counter
+from collections import defaultdict
 import numpy as np
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-import seaborn as sns
 import gc
 import logging
+import shutil
+
+from pipeline.aggregates import merge_aggregates
+from pipeline.bitsets import bitset_pair_count_table
+from pipeline import kernels, sketches
+from pipeline.artifacts import (
+    add_reference,
+    artifact_path,
+    code_version,
+    collect_garbage,
+    release_run,
+    write_artifact,
+)
+from pipeline.ingest import (
+    file_fingerprint,
+    file_sha256,
+    load_manifest,
+    load_rejected,
+    plan_ingest,
+    prune_partitions,
+    prune_rejected,
+    read_partition,
+    read_partition_sketches,
+    read_transactions_file,
+    reject_file,
+    save_manifest,
+    write_partition,
+)
+from pipeline.kernels import (
+    build_category_lookup,
+    category_cooccurrence,
+    category_volume,
+    concat_baskets,
+    distinct_categories_per_group,
+    histogram_summary,
+    load_baskets,
+    load_category_lookup,
+    load_frequencies,
+    product_category_frequencies,
+    publish_category_lookup,
+    save_baskets,
+    save_category_lookup,
+    save_cooccurrence,
+    save_frequencies,
+    top_products,
+    with_sources,
+)
+from pipeline.metrics import (
+    collect_run_metrics,
+    instrument_task,
+    measure,
+    record_rows,
+)
+from pipeline.plots import plot_job, render_plots
+from pipeline.report import result_tables, write_machine_readable, write_text_reports
+from pipeline.results_store import save_run
+from pipeline.sketches import merge_sketches, sketch_statistics
+from pipeline.review import resolve_review_mode, review_frame
+from pipeline.rules import (
+    PARTITION_KINDS,
+    category_pair_table,
+    dataset_fingerprint,
+    load_pair_table,
+    mine_partition,
+    pair_count_table,
+    pairs_path,
+    partition_label,
+    partition_rules_path,
+    prune_rules,
+    rule_drift,
+    rule_partitions,
+    rules_from_pair_table,
+    rules_path,
+    save_pair_table,
+    save_rules,
+    top_rules,
+)
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -27,6 +118,51 @@ RESULTS_DIR = "/opt/airflow/results"
 # Crear directorio para archivos intermedios
 INTERMEDIATE_DIR = os.path.join(DATA_DIR, "intermediate")
 
+# Caché de gráficas (PNG direccionados por hash de sus datos de entrada)
+PLOT_CACHE_DIR = os.path.join(DATA_DIR, "plot_cache")
+
+# Archivos publicados para Streamlit: guardan las huellas de sus datos de
+# origen (`kernels.with_sources`) para que la app solo los use si coinciden
+
+# Frecuencias de productos/categorías de la última ejecución (usadas por Streamlit)
+FREQUENCIES_FILE = os.path.join(DATA_DIR, "product_frequencies.npz")
+
+# Lookup denso producto -> categoría (int16, -1 para productos desconocidos)
+CATEGORY_LOOKUP_FILE = os.path.join(DATA_DIR, "category_lookup.npz")
+
+# Co-ocurrencia de categorías en canastas de la última ejecución (Streamlit)
+CATEGORY_COOCCURRENCE_FILE = os.path.join(DATA_DIR, "category_cooccurrence.npz")
+
+# Almacén columnar de transacciones (una partición por archivo ingerido)
+TRANSACTIONS_STORE_DIR = os.path.join(DATA_DIR, "transactions_store")
+
+# Reglas de asociación completas por (dataset, min_support, min_confidence)
+RULES_DIR = os.path.join(DATA_DIR, "association_rules")
+
+# Almacén SQLite de resultados versionados por ejecución (lo consulta la app)
+RESULTS_DB = os.path.join(DATA_DIR, "results.sqlite")
+
+# Métricas de rendimiento por tarea (un JSON por ejecución)
+METRICS_DIR = os.path.join(DATA_DIR, "metrics")
+
+# Perfiles de cProfile por tarea (parámetro `profile` o PIPELINE_PROFILE=1)
+PROFILES_DIR = os.path.join(RESULTS_DIR, "profiles")
+
+# Umbrales de Apriori (reglas globales y por tienda/mes)
+MIN_SUPPORT = 0.01  # 1% de las transacciones
+MIN_CONFIDENCE = 0.3  # 30% de confianza
+
+# Backends de conteo de pares (parámetro `association_backend` del DAG);
+# ambos producen la misma tabla de pares
+ASSOCIATION_BACKENDS = {
+    "pairs": pair_count_table,
+    "bitset": bitset_pair_count_table,
+}
+
+# Tiempo, CPU, memoria y filas de cada tarea, y su perfil si se pide (las
+# rutas se leen al ejecutar)
+instrumented = instrument_task(lambda: METRICS_DIR, lambda: PROFILES_DIR)
+
 
 def notify_failure(context):
     """
@@ -51,35 +187,73 @@ def notify_retry(context):
     )
 
 
-def get_intermediate_path(run_id, filename):
+def get_intermediate_path(run_id, filename, *inputs):
     """
-    Genera path para archivo intermedio.
+    Genera path para archivo intermedio, direccionado por el hash de sus entradas
+    (hashes de archivos de origen o paths de otros artefactos), y registra la
+    ejecución como referencia del artefacto.
     """
-    os.makedirs(INTERMEDIATE_DIR, exist_ok=True)
-    return os.path.join(INTERMEDIATE_DIR, f"{run_id}_{filename}")
+    path = artifact_path(INTERMEDIATE_DIR, filename, inputs)
+    add_reference(INTERMEDIATE_DIR, run_id, path)
+    return path
 
 
-def cleanup_intermediate_files(run_id):
+def cleanup_intermediate_files(run_id, keep=False):
     """
-    Limpia archivos intermedios de una ejecución específica.
+    Suelta las referencias de una ejecución y elimina los archivos intermedios
+    que ya no referencia ninguna. Con `keep=True` los de esta ejecución quedan
+    fijados como los de la última ejecución correcta para poder reutilizarlos.
     """
     try:
-        pattern = os.path.join(INTERMEDIATE_DIR, f"{run_id}_*")
-        for file_path in glob.glob(pattern):
-            try:
+        release_run(INTERMEDIATE_DIR, run_id, pin=keep)
+        removed, freed = collect_garbage(INTERMEDIATE_DIR)
+
+        # Copias por run_id de versiones anteriores del DAG
+        for file_path in glob.glob(os.path.join(INTERMEDIATE_DIR, "*_*")):
+            if os.path.isfile(file_path):
+                freed += os.path.getsize(file_path)
                 os.remove(file_path)
-                logger.info(f"Removed intermediate file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Could not remove {file_path}: {e}")
+                removed += 1
+
+        logger.info(
+            f"Removed {removed} unreferenced intermediate files ({freed / 1e6:.1f} MB)"
+        )
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
 
 
+def reuse_task_outputs(context, outputs):
+    """
+    Memoización por tarea: el path de cada salida ya incluye el hash de las
+    entradas y de la versión del código, así que si todas existen la tarea
+    publica sus paths en XCom sin recalcular. Devuelve True si se reutilizan.
+    """
+    if not all(os.path.exists(path) for path in outputs.values()):
+        return False
+    for key, path in outputs.items():
+        context["ti"].xcom_push(key=key, value=path)
+    logger.info(f"✓ Inputs and code unchanged, reusing {', '.join(outputs)}")
+    return True
+
+
+def cleanup_failed_run(context):
+    """
+    Callback de fallo del DAG: libera los archivos intermedios de la ejecución.
+    """
+    cleanup_intermediate_files(context["dag_run"].run_id)
+    collect_run_metrics(METRICS_DIR, context["dag_run"].run_id)
+
+
+@instrumented
 def setup_pools(**context):
     """
     Configura los pools necesarios para el DAG automáticamente.
     Esta función se ejecuta al inicio y crea los pools si no existen.
     """
+    if Pool is None:
+        logger.info("Airflow not installed, skipping pool setup")
+        return
+
     try:
         session = settings.Session()
 
@@ -147,9 +321,92 @@ default_args = {
 }
 
 
+def get_transactions_files():
+    """
+    Lista los CSV de Transactions (falla si no hay ninguno).
+    """
+    transactions_dir = os.path.join(DATASET_DIR, "Transactions")
+    transactions_files = glob.glob(os.path.join(transactions_dir, "*.csv"))
+    if not transactions_files:
+        raise AirflowException(f"No transaction files found in {transactions_dir}")
+    return transactions_files
+
+
+@instrumented
+def plan_transaction_files(**context):
+    """
+    Compara los archivos de Transactions con el manifiesto del almacén columnar.
+    Devuelve la huella (path, sha256, tamaño, mtime) de cada archivo nuevo o
+    modificado para mapear `ingest_transaction_file` (parámetro `full_refresh`
+    para reprocesarlos todos, también los que están en cuarentena).
+    """
+    try:
+        transactions_files = get_transactions_files()
+        os.makedirs(TRANSACTIONS_STORE_DIR, exist_ok=True)
+        full_refresh = bool(context["params"].get("full_refresh", False))
+        manifest = load_manifest(TRANSACTIONS_STORE_DIR)
+        entries, changed_files = plan_ingest(
+            transactions_files,
+            manifest,
+            TRANSACTIONS_STORE_DIR,
+            full_refresh,
+            rejected=load_rejected(TRANSACTIONS_STORE_DIR),
+        )
+        logger.info(
+            f"Found {len(transactions_files)} transaction files: "
+            f"{len(changed_files)} new or changed, "
+            f"{len(entries) - len(changed_files)} reused from store, "
+            f"{len(transactions_files) - len(entries)} quarantined"
+        )
+        changed_files = set(changed_files)
+        return [entry for entry in entries if entry["path"] in changed_files]
+
+    except Exception as e:
+        logger.error(f"Error in plan_transaction_files: {e}")
+        raise
+
+
+@instrumented
+def ingest_transaction_file(path, sha256, size, mtime_ns, **context):
+    """
+    Parsea y valida un archivo de Transactions y lo guarda como partición
+    del almacén columnar. Se ejecuta como tarea mapeada, una por archivo, con
+    la huella calculada por `plan_transaction_files`.
+    Un archivo inválido queda en cuarentena y la instancia se omite, para que
+    `load_data` combine los demás.
+    """
+    try:
+        # Reutiliza el hash del plan si el archivo no cambió desde entonces
+        entry = file_fingerprint(
+            path,
+            {"sha256": sha256, "size": size, "mtime_ns": mtime_ns},
+        )
+        logger.info(f"Reading file: {path}")
+        with measure("parse") as step:
+            transactions_df = read_transactions_file(path)
+            step["rows"] = len(transactions_df)
+        with measure("write_partition", rows=len(transactions_df)):
+            write_partition(TRANSACTIONS_STORE_DIR, entry["sha256"], transactions_df)
+        logger.info(f"✓ Ingested {len(transactions_df)} transactions from {path}")
+
+    except ValueError as e:
+        # Archivo inválido: reintentar no sirve de nada. En cuarentena, el
+        # vigilante no lo vuelve a detectar hasta que cambie
+        logger.error(f"Invalid transactions file {path}: {e}")
+        reject_file(TRANSACTIONS_STORE_DIR, entry, e)
+        raise AirflowSkipException(f"Quarantined invalid file: {e}")
+    except Exception as e:
+        logger.error(f"Error in ingest_transaction_file: {e}")
+        raise
+
+
+@instrumented
 def load_data(**context):
     """
     Carga todos los archivos CSV del dataset y los guarda como archivos pickle.
+    Etapa de merge: une las particiones del almacén columnar (ingeridas en
+    paralelo por `ingest_transaction_file`), actualiza el manifiesto y combina
+    los agregados parciales.
     Usa archivos intermedios en lugar de XCom para evitar sobrecarga de la base de datos.
     """
     run_id = context["run_id"]
@@ -168,69 +425,169 @@ def load_data(**context):
                 f"ProductCategory file not found: {product_category_path}"
             )
 
-        # Cargar el dataset Categories
-        logger.info(f"Loading categories from {categories_path}")
-        categories_df = pd.read_csv(
-            categories_path,
-            sep="|",
-            header=None,
-            names=["category_id", "category_name"],
+        # Artefactos direccionados por el hash de los archivos de origen
+        categories_hash = file_sha256(categories_path)
+        product_category_hash = file_sha256(product_category_path)
+        categories_file = get_intermediate_path(
+            run_id, "categories.pkl", categories_hash
         )
-
-        # Cargar el dataset ProductCategory
-        logger.info(f"Loading product categories from {product_category_path}")
-        product_category_df = pd.read_csv(
-            product_category_path,
-            sep="|",
-            header=None,
-            names=["product_code", "category_id"],
+        product_category_file = get_intermediate_path(
+            run_id, "product_category.pkl", product_category_hash
+        )
+        category_lookup_file = get_intermediate_path(
+            run_id, "category_lookup.npy", product_category_hash
         )
 
-        # Cargar el dataset Transactions (todos los csv)
-        transactions_files = glob.glob(
-            os.path.join(DATASET_DIR, "Transactions", "*.csv")
+        with measure("read_products"):
+            # Cargar el dataset Categories
+            if os.path.exists(categories_file):
+                logger.info(f"✓ Reusing categories from {categories_file}")
+            else:
+                logger.info(f"Loading categories from {categories_path}")
+                categories_df = pd.read_csv(
+                    categories_path,
+                    sep="|",
+                    header=None,
+                    names=["category_id", "category_name"],
+                )
+                write_artifact(categories_file, categories_df.to_pickle)
+                logger.info(f"✓ Loaded {len(categories_df)} categories")
+                del categories_df
+
+            # Cargar el dataset ProductCategory
+            if os.path.exists(product_category_file) and os.path.exists(
+                category_lookup_file
+            ):
+                logger.info(
+                    f"✓ Reusing product categories from {product_category_file}"
+                )
+            else:
+                logger.info(f"Loading product categories from {product_category_path}")
+                product_category_df = pd.read_csv(
+                    product_category_path,
+                    sep="|",
+                    header=None,
+                    names=["product_code", "category_id"],
+                )
+                category_lookup = build_category_lookup(product_category_df)
+                write_artifact(product_category_file, product_category_df.to_pickle)
+                write_artifact(
+                    category_lookup_file,
+                    lambda path: save_category_lookup(path, category_lookup),
+                )
+                logger.info(f"✓ Loaded {len(product_category_df)} product categories")
+                del product_category_df, category_lookup
+        publish_category_lookup(
+            CATEGORY_LOOKUP_FILE,
+            load_category_lookup(category_lookup_file),
+            product_category_hash,
         )
-        if not transactions_files:
-            raise AirflowException(
-                f"No transaction files found in {os.path.join(DATASET_DIR, 'Transactions')}"
-            )
 
-        logger.info(f"Loading {len(transactions_files)} transaction files")
-        transactions_list = []
-        for file in transactions_files:
-            logger.info(f"Reading file: {file}")
-            df = pd.read_csv(
-                file,
-                sep="|",
-                header=None,
-                names=["date", "store", "customer", "products"],
+        # Completar el almacén con los archivos que no ingirió la etapa mapeada
+        # (p. ej. si cambiaron después de planificar)
+        transactions_files = get_transactions_files()
+        os.makedirs(TRANSACTIONS_STORE_DIR, exist_ok=True)
+        for path in prune_rejected(TRANSACTIONS_STORE_DIR):
+            logger.info(f"Released from quarantine (changed or removed): {path}")
+        rejected = load_rejected(TRANSACTIONS_STORE_DIR)
+        for path, rejected_entry in rejected.items():
+            logger.warning(
+                f"Skipping quarantined file {path}: {rejected_entry['error']}"
             )
-            transactions_list.append(df)
-
-        transactions_df = pd.concat(transactions_list, ignore_index=True)
+        # Huellas del plan: los archivos recién ingeridos no se vuelven a hashear
+        manifest = load_manifest(TRANSACTIONS_STORE_DIR)
+        planned = context["ti"].xcom_pull(task_ids="plan_transaction_files") or []
+        manifest["files"].update({entry["path"]: entry for entry in planned})
+        entries, changed_files = plan_ingest(
+            transactions_files, manifest, TRANSACTIONS_STORE_DIR, rejected=rejected
+        )
+        if changed_files:
+            logger.info(f"Ingesting {len(changed_files)} files missing from store")
+        for entry in list(entries):
+            if entry["path"] not in changed_files:
+                continue
+            logger.info(f"Reading file: {entry['path']}")
+            try:
+                transactions_df = read_transactions_file(entry["path"])
+            except ValueError as e:
+                logger.error(f"Invalid transactions file {entry['path']}: {e}")
+                reject_file(TRANSACTIONS_STORE_DIR, entry, e)
+                entries.remove(entry)
+                continue
+            write_partition(TRANSACTIONS_STORE_DIR, entry["sha256"], transactions_df)
+            del transactions_df
+        if not entries:
+            raise AirflowFailException("No valid transaction files to load")
+
+        save_manifest(
+            TRANSACTIONS_STORE_DIR,
+            {"files": {entry["path"]: entry for entry in entries}},
+        )
+        for filename in prune_partitions(TRANSACTIONS_STORE_DIR, entries):
+            logger.info(f"Removed stale partition: {filename}")
 
-        # Convertir fecha a datetime y crear variables temporales
-        logger.info("Processing temporal variables")
-        transactions_df["date"] = pd.to_datetime(transactions_df["date"])
-        transactions_df["year"] = transactions_df["date"].dt.year
-        transactions_df["month"] = transactions_df["date"].dt.month
-        transactions_df["week"] = transactions_df["date"].dt.isocalendar().week
-        transactions_df["day_of_week"] = transactions_df["date"].dt.dayofweek
-        transactions_df["day_name"] = transactions_df["date"].dt.day_name()
+        # El dataset combinado depende solo de las particiones (y su orden)
+        partition_hashes = [entry["sha256"] for entry in entries]
+        transactions_file = get_intermediate_path(
+            run_id, "transactions.pkl", *partition_hashes
+        )
+        baskets_file = get_intermediate_path(run_id, "baskets.npz", *partition_hashes)
+        aggregates_file = get_intermediate_path(
+            run_id, "aggregates.pkl", *partition_hashes
+        )
 
-        # Convertir store y customer a categóricas (son IDs, no variables numéricas continuas)
-        transactions_df["store"] = transactions_df["store"].astype(str)
-        transactions_df["customer"] = transactions_df["customer"].astype(str)
+        if all(
+            os.path.exists(path)
+            for path in [transactions_file, baskets_file, aggregates_file]
+        ):
+            logger.info("✓ Reusing assembled transactions (same store partitions)")
+        else:
+            # Reconstruir el dataset completo desde el almacén columnar
+            logger.info("Assembling transactions from store partitions")
+            with measure("assemble_partitions") as step:
+                transactions_list, baskets_list, aggregates_list = zip(
+                    *(
+                        read_partition(TRANSACTIONS_STORE_DIR, sha256)
+                        for sha256 in partition_hashes
+                    )
+                )
+                transactions_df = pd.concat(transactions_list, ignore_index=True)
+                baskets = concat_baskets(baskets_list)
+                aggregates = merge_aggregates(aggregates_list)
+                step["rows"] = len(transactions_df)
+
+            logger.info(f"Saving intermediate files to {INTERMEDIATE_DIR}")
+            with measure("write_intermediate", rows=len(transactions_df)):
+                write_artifact(transactions_file, transactions_df.to_pickle)
+                write_artifact(baskets_file, lambda path: save_baskets(path, baskets))
+                write_artifact(
+                    aggregates_file, lambda path: pd.to_pickle(aggregates, path)
+                )
+            logger.info(
+                f"✓ Loaded {len(transactions_df)} transactions from {len(entries)} files"
+            )
 
-        # Guardar en archivos pickle (en lugar de XCom)
-        categories_file = get_intermediate_path(run_id, "categories.pkl")
-        product_category_file = get_intermediate_path(run_id, "product_category.pkl")
-        transactions_file = get_intermediate_path(run_id, "transactions.pkl")
+            # Liberar memoria
+            del transactions_df, transactions_list, baskets, baskets_list
+            del aggregates, aggregates_list
+            gc.collect()
 
-        logger.info(f"Saving intermediate files to {INTERMEDIATE_DIR}")
-        categories_df.to_pickle(categories_file)
-        product_category_df.to_pickle(product_category_file)
-        transactions_df.to_pickle(transactions_file)
+        # Sketches del dataset: se combinan los de cada partición, sin leer
+        # transacciones
+        sketches_file = get_intermediate_path(
+            run_id, "sketches.pkl", *partition_hashes
+        )
+        if not os.path.exists(sketches_file):
+            with measure("merge_sketches", rows=len(partition_hashes)):
+                dataset_sketches = merge_sketches(
+                    [
+                        read_partition_sketches(TRANSACTIONS_STORE_DIR, sha256)
+                        for sha256 in partition_hashes
+                    ]
+                )
+                write_artifact(
+                    sketches_file, lambda path: pd.to_pickle(dataset_sketches, path)
+                )
 
         # Guardar solo los paths en XCom (ligero)
         context["ti"].xcom_push(key="categories_file", value=categories_file)
@@ -238,20 +595,23 @@ def load_data(**context):
             key="product_category_file", value=product_category_file
         )
         context["ti"].xcom_push(key="transactions_file", value=transactions_file)
-
-        logger.info(
-            f"✓ Loaded {len(categories_df)} categories, {len(product_category_df)} product categories, {len(transactions_df)} transactions"
+        context["ti"].xcom_push(key="baskets_file", value=baskets_file)
+        context["ti"].xcom_push(key="category_lookup_file", value=category_lookup_file)
+        context["ti"].xcom_push(key="aggregates_file", value=aggregates_file)
+        context["ti"].xcom_push(key="sketches_file", value=sketches_file)
+        context["ti"].xcom_push(
+            key="dataset_fingerprint", value=dataset_fingerprint(partition_hashes)
+        )
+        context["ti"].xcom_push(
+            key="product_category_sha256", value=product_category_hash
         )
-
-        # Liberar memoria
-        del categories_df, product_category_df, transactions_df, transactions_list
-        gc.collect()
 
     except Exception as e:
         logger.error(f"Error in load_data: {e}")
         raise
 
 
+@instrumented
 def data_review(**context):
     """
     Realiza revisión inicial del dataset: estructura, tipos, nulos, duplicados.
@@ -265,43 +625,31 @@ def data_review(**context):
 
         # Cargar desde pickle
         logger.info("Loading data from intermediate files")
-        categories_df = pd.read_pickle(categories_file)
-        product_category_df = pd.read_pickle(product_category_file)
-        transactions_df = pd.read_pickle(transactions_file)
-
+        with measure("read_intermediate") as step:
+            categories_df = pd.read_pickle(categories_file)
+            product_category_df = pd.read_pickle(product_category_file)
+            transactions_df = pd.read_pickle(transactions_file)
+            step["rows"] = len(transactions_df)
+
+        # Duplicados exactos o estimados (entradas muy grandes), según el
+        # parámetro `review_mode` y el tamaño de las transacciones
+        review_mode = resolve_review_mode(
+            context["params"].get("review_mode", "auto"), len(transactions_df)
+        )
         review_results = {}
-
-        # Categories
-        review_results["categories"] = {
-            "num_records": len(categories_df),
-            "num_columns": len(categories_df.columns),
-            "columns": categories_df.columns.tolist(),
-            "dtypes": {k: str(v) for k, v in categories_df.dtypes.to_dict().items()},
-            "nulls": categories_df.isnull().sum().to_dict(),
-            "duplicates": int(categories_df.duplicated().sum()),
-        }
-
-        # ProductCategory
-        review_results["product_category"] = {
-            "num_records": len(product_category_df),
-            "num_columns": len(product_category_df.columns),
-            "columns": product_category_df.columns.tolist(),
-            "dtypes": {
-                k: str(v) for k, v in product_category_df.dtypes.to_dict().items()
-            },
-            "nulls": product_category_df.isnull().sum().to_dict(),
-            "duplicates": int(product_category_df.duplicated().sum()),
-        }
-
-        # Transactions
-        review_results["transactions"] = {
-            "num_records": len(transactions_df),
-            "num_columns": len(transactions_df.columns),
-            "columns": transactions_df.columns.tolist(),
-            "dtypes": {k: str(v) for k, v in transactions_df.dtypes.to_dict().items()},
-            "nulls": transactions_df.isnull().sum().to_dict(),
-            "duplicates": int(transactions_df.duplicated().sum()),
-        }
+        for table, df in [
+            ("categories", categories_df),
+            ("product_category", product_category_df),
+            ("transactions", transactions_df),
+        ]:
+            timings = {}
+            review_results[table] = review_frame(
+                df, table, mode=review_mode, timings=timings
+            )
+            checks = ", ".join(
+                f"{check} {seconds:.2f}s" for check, seconds in timings.items()
+            )
+            logger.info(f"✓ Reviewed {table} ({review_mode}): {checks}")
 
         # Imprimir resultados en consola (para logs)
         for table, stats in review_results.items():
@@ -311,8 +659,15 @@ def data_review(**context):
 
         # Guardar resultados en archivo pickle
         run_id = context["run_id"]
-        review_file = get_intermediate_path(run_id, "review_results.pkl")
-        pd.to_pickle(review_results, review_file)
+        review_file = get_intermediate_path(
+            run_id,
+            "review_results.pkl",
+            categories_file,
+            product_category_file,
+            transactions_file,
+            review_mode,
+        )
+        write_artifact(review_file, lambda path: pd.to_pickle(review_results, path))
         context["ti"].xcom_push(key="review_file", value=review_file)
 
         # Liberar memoria
@@ -324,58 +679,67 @@ def data_review(**context):
         raise
 
 
+@instrumented
 def descriptive_stats(**context):
     """
     Calcula estadísticas descriptivas.
-    Carga datos desde archivos pickle.
+    Usa las canastas codificadas, los agregados y los sketches combinados por
+    archivo, sin cargar las transacciones completas.
     """
     try:
         # Obtener paths desde XCom
-        categories_file = context["ti"].xcom_pull(key="categories_file")
         product_category_file = context["ti"].xcom_pull(key="product_category_file")
-        transactions_file = context["ti"].xcom_pull(key="transactions_file")
+        baskets_file = context["ti"].xcom_pull(key="baskets_file")
+        aggregates_file = context["ti"].xcom_pull(key="aggregates_file")
+        category_lookup_file = context["ti"].xcom_pull(key="category_lookup_file")
+        sketches_file = context["ti"].xcom_pull(key="sketches_file")
 
-        # Cargar desde pickle
+        # Salidas direccionadas por entradas + versión del código
+        run_id = context["run_id"]
+        stats_inputs = [
+            product_category_file,
+            baskets_file,
+            aggregates_file,
+            category_lookup_file,
+            sketches_file,
+            code_version(descriptive_stats, kernels, sketches),
+        ]
+        stats_file = get_intermediate_path(run_id, "stats_results.pkl", *stats_inputs)
+        frequencies_file = get_intermediate_path(
+            run_id, "frequencies.npz", *stats_inputs
+        )
+        if reuse_task_outputs(
+            context, {"stats_file": stats_file, "frequencies_file": frequencies_file}
+        ):
+            shutil.copyfile(frequencies_file, FREQUENCIES_FILE)
+            return
+
+        # Cargar desde archivos intermedios
         logger.info("Loading data from intermediate files")
-        categories_df = pd.read_pickle(categories_file)
-        product_category_df = pd.read_pickle(product_category_file)
-        transactions_df = pd.read_pickle(transactions_file)
+        with measure("read_intermediate") as step:
+            product_category_df = pd.read_pickle(product_category_file)
+            baskets = load_baskets(baskets_file)
+            aggregates = pd.read_pickle(aggregates_file)
+            step["rows"] = len(baskets["basket_lengths"])
+        num_transactions = len(baskets["basket_lengths"])
 
         stats_results = {}
 
-        # Para Transactions: expandir productos y calcular estadísticas
-        transactions_expanded = transactions_df.copy()
-        transactions_expanded["num_products"] = (
-            transactions_expanded["products"].str.split().str.len()
-        )
+        # Tamaño de canasta (num_products) desde su histograma: los tamaños son
+        # enteros pequeños y las canastas codificadas ya tienen sus longitudes
+        basket_size_histogram = np.bincount(baskets["basket_lengths"])
+        basket_size_stats = histogram_summary(basket_size_histogram)
 
         # Estadísticas numéricas solo para num_products (store y customer son categóricas)
-        numeric_vars = ["num_products"]
-        stats_results["numeric"] = {}
-        for var in numeric_vars:
-            desc = transactions_expanded[[var]].describe(percentiles=[0.25, 0.5, 0.75])
-            mode = transactions_expanded[var].mode().tolist()
-            stats_results["numeric"][var] = {"describe": desc.to_dict(), "mode": mode}
-
-        # Detectar outliers usando IQR para num_products
-        stats_results["outliers"] = {}
-        for var in numeric_vars:
-            Q1 = transactions_expanded[var].quantile(0.25)
-            Q3 = transactions_expanded[var].quantile(0.75)
-            IQR = Q3 - Q1
-            outliers = transactions_expanded[
-                (transactions_expanded[var] < (Q1 - 1.5 * IQR))
-                | (transactions_expanded[var] > (Q3 + 1.5 * IQR))
-            ]
-            stats_results["outliers"][var] = {
-                "count": int(len(outliers)),
-                "min_outlier": (
-                    float(outliers[var].min()) if len(outliers) > 0 else None
-                ),
-                "max_outlier": (
-                    float(outliers[var].max()) if len(outliers) > 0 else None
-                ),
+        stats_results["numeric"] = {
+            "num_products": {
+                "describe": {"num_products": basket_size_stats["describe"]},
+                "mode": basket_size_stats["mode"],
             }
+        }
+
+        # Outliers por IQR para num_products
+        stats_results["outliers"] = {"num_products": basket_size_stats["outliers"]}
 
         # Estadísticas categóricas (categorías)
         category_counts = product_category_df["category_id"].value_counts()
@@ -385,21 +749,62 @@ def descriptive_stats(**context):
             "category_frequencies": category_freq.to_dict(),
         }
 
-        # Frecuencia de productos (top 20)
-        all_products = []
-        for products in transactions_df["products"]:
-            all_products.extend(products.split())
-        product_counts = pd.Series(all_products).value_counts()
-        stats_results["product_frequencies"] = product_counts.head(20).to_dict()
+        # Distribución del tamaño de canasta (para el histograma de gráficas)
+        stats_results["basket_size_histogram"] = {
+            int(size): int(count)
+            for size, count in enumerate(basket_size_histogram)
+            if count
+        }
+
+        # Frecuencias de productos, categorías y tienda × categoría (kernel único)
+        frequencies = product_category_frequencies(
+            baskets, load_category_lookup(category_lookup_file)
+        )
+        product_counts = top_products(frequencies, 20)
+        stats_results["product_frequencies"] = dict(product_counts)
+
+        # Volumen vendido por categoría (unidades de productos de cada categoría)
+        stats_results["category_volume"] = {
+            int(k): int(v) for k, v in category_volume(frequencies).items()
+        }
 
-        # Frecuencias para store (ahora categórica)
-        store_counts = transactions_df["store"].value_counts()
-        store_freq = (store_counts / len(transactions_df) * 100).round(2)
+        # Frecuencias para store (ahora categórica), desde su índice codificado;
+        # los empates quedan por orden de aparición, como en value_counts
+        store_ids, first_seen, counts = np.unique(
+            baskets["store_index"], return_index=True, return_counts=True
+        )
+        order = np.argsort(first_seen)
+        store_counts = pd.Series(
+            counts[order], index=baskets["stores"][store_ids[order]]
+        ).sort_values(ascending=False, kind="stable")
+        store_freq = (store_counts / num_transactions * 100).round(2)
         stats_results["store_frequencies"] = {
             "counts": store_counts.to_dict(),
             "frequencies": store_freq.to_dict(),
         }
 
+        # Totales del dataset (para el informe ejecutivo): clientes exactos desde
+        # los agregados combinados por archivo (un registro por cliente)
+        dates = aggregates["daily_sales"].index
+        stats_results["summary"] = {
+            "total_products": int(len(baskets["product_ids"])),
+            "num_transactions": num_transactions,
+            "num_customers": len(aggregates["customer_totals"]),
+            "num_stores": len(store_counts),
+            "first_date": dates.min().isoformat(),
+            "last_date": dates.max().isoformat(),
+        }
+
+        # Mismas estadísticas desde los sketches combinados por archivo
+        # (aproximadas, de tamaño fijo: válidas para ingesta incremental)
+        stats_results["sketches"] = sketch_statistics(pd.read_pickle(sketches_file))
+        logger.info(
+            "Sketch estimates: "
+            f"{stats_results['sketches']['unique_customers']} customers "
+            f"(exact {stats_results['summary']['num_customers']}), "
+            f"{stats_results['sketches']['unique_products']} products"
+        )
+
         # Imprimir resultados
         logger.info("\n=== ESTADÍSTICAS NUMÉRICAS ===")
         for var, stats in stats_results["numeric"].items():
@@ -415,7 +820,7 @@ def descriptive_stats(**context):
             logger.info(f"Categoría {cat}: {count} productos ({category_freq[cat]}%)")
 
         logger.info("\nTop productos:")
-        for prod, count in list(product_counts.items())[:10]:
+        for prod, count in product_counts[:10]:
             logger.info(f"Producto {prod}: {count} veces")
 
         logger.info("\nTop stores:")
@@ -423,13 +828,26 @@ def descriptive_stats(**context):
             logger.info(f"Store {store}: {count} transacciones ({store_freq[store]}%)")
 
         # Guardar resultados en archivo pickle
-        run_id = context["run_id"]
-        stats_file = get_intermediate_path(run_id, "stats_results.pkl")
-        pd.to_pickle(stats_results, stats_file)
+        write_artifact(stats_file, lambda path: pd.to_pickle(stats_results, path))
         context["ti"].xcom_push(key="stats_file", value=stats_file)
 
+        # Guardar frecuencias para las tareas siguientes y publicarlas para
+        # Streamlit, con las huellas de las transacciones y de ProductCategory
+        frequencies = with_sources(
+            frequencies,
+            dataset_fingerprint=context["ti"].xcom_pull(key="dataset_fingerprint"),
+            product_category_sha256=context["ti"].xcom_pull(
+                key="product_category_sha256"
+            ),
+        )
+        write_artifact(
+            frequencies_file, lambda path: save_frequencies(path, frequencies)
+        )
+        save_frequencies(FREQUENCIES_FILE, frequencies)
+        context["ti"].xcom_push(key="frequencies_file", value=frequencies_file)
+
         # Liberar memoria
-        del categories_df, product_category_df, transactions_df
+        del product_category_df, baskets, aggregates
         gc.collect()
 
     except Exception as e:
@@ -437,81 +855,53 @@ def descriptive_stats(**context):
         raise
 
 
+@instrumented
 def temporal_analysis(**context):
     """
     Analiza patrones temporales en las ventas.
-    Carga datos desde archivos pickle.
+    Usa los agregados combinados por load_data en lugar de recorrer las transacciones.
     """
     try:
         # Obtener path desde XCom
-        transactions_file = context["ti"].xcom_pull(key="transactions_file")
+        aggregates_file = context["ti"].xcom_pull(key="aggregates_file")
 
-        # Cargar desde pickle
-        logger.info("Loading transactions from intermediate file")
-        transactions_df = pd.read_pickle(transactions_file)
-
-        transactions_df["num_products"] = (
-            transactions_df["products"].str.split().str.len()
+        # Salida direccionada por entradas + versión del código
+        run_id = context["run_id"]
+        temporal_file = get_intermediate_path(
+            run_id,
+            "temporal_results.pkl",
+            aggregates_file,
+            code_version(temporal_analysis),
         )
+        if reuse_task_outputs(context, {"temporal_file": temporal_file}):
+            return
+
+        # Agregados combinados a partir de los parciales de cada archivo
+        logger.info("Loading merged aggregates from intermediate file")
+        aggregates = pd.read_pickle(aggregates_file)
 
         temporal_results = {}
 
         # Ventas diarias
-        daily_sales = (
-            transactions_df.groupby("date")
-            .agg({"customer": "count", "num_products": "sum"})
-            .rename(
-                columns={
-                    "customer": "num_transactions",
-                    "num_products": "total_products",
-                }
-            )
-        )
+        daily_sales = aggregates["daily_sales"]
         temporal_results["daily_sales"] = {
             str(k): v for k, v in daily_sales.to_dict("index").items()
         }
 
         # Ventas semanales
-        weekly_sales = (
-            transactions_df.groupby(["year", "week"])
-            .agg({"customer": "count", "num_products": "sum"})
-            .rename(
-                columns={
-                    "customer": "num_transactions",
-                    "num_products": "total_products",
-                }
-            )
-        )
+        weekly_sales = aggregates["weekly_sales"]
         temporal_results["weekly_sales"] = {
             str(k): v for k, v in weekly_sales.to_dict("index").items()
         }
 
         # Ventas mensuales
-        monthly_sales = (
-            transactions_df.groupby(["year", "month"])
-            .agg({"customer": "count", "num_products": "sum"})
-            .rename(
-                columns={
-                    "customer": "num_transactions",
-                    "num_products": "total_products",
-                }
-            )
-        )
+        monthly_sales = aggregates["monthly_sales"]
         temporal_results["monthly_sales"] = {
             str(k): v for k, v in monthly_sales.to_dict("index").items()
         }
 
         # Ventas por día de la semana
-        day_of_week_sales = (
-            transactions_df.groupby("day_name")
-            .agg({"customer": "count", "num_products": "sum"})
-            .rename(
-                columns={
-                    "customer": "num_transactions",
-                    "num_products": "total_products",
-                }
-            )
-        )
+        day_of_week_sales = aggregates["day_of_week_sales"]
         day_order = [
             "Monday",
             "Tuesday",
@@ -552,13 +942,11 @@ def temporal_analysis(**context):
             )
 
         # Guardar resultados en archivo pickle
-        run_id = context["run_id"]
-        temporal_file = get_intermediate_path(run_id, "temporal_results.pkl")
-        pd.to_pickle(temporal_results, temporal_file)
+        write_artifact(temporal_file, lambda path: pd.to_pickle(temporal_results, path))
         context["ti"].xcom_push(key="temporal_file", value=temporal_file)
 
         # Liberar memoria
-        del transactions_df
+        del aggregates
         gc.collect()
 
     except Exception as e:
@@ -566,6 +954,7 @@ def temporal_analysis(**context):
         raise
 
 
+@instrumented
 def customer_analysis(**context):
     """
     Analiza patrones de comportamiento de clientes y realiza clustering con K-Means.
@@ -574,22 +963,41 @@ def customer_analysis(**context):
     try:
         # Obtener paths desde XCom
         transactions_file = context["ti"].xcom_pull(key="transactions_file")
-        product_category_file = context["ti"].xcom_pull(key="product_category_file")
+        aggregates_file = context["ti"].xcom_pull(key="aggregates_file")
+        category_lookup_file = context["ti"].xcom_pull(key="category_lookup_file")
+
+        # Salidas direccionadas por entradas + versión del código
+        run_id = context["run_id"]
+        customer_inputs = [
+            transactions_file,
+            aggregates_file,
+            category_lookup_file,
+            code_version(customer_analysis, kernels),
+        ]
+        clusters_file = get_intermediate_path(
+            run_id, "customer_clusters.pkl", *customer_inputs
+        )
+        customer_file = get_intermediate_path(
+            run_id, "customer_results.pkl", *customer_inputs
+        )
+        if reuse_task_outputs(
+            context, {"clusters_file": clusters_file, "customer_file": customer_file}
+        ):
+            return
 
         # Cargar desde pickle
         logger.info("Loading data from intermediate files")
-        transactions_df = pd.read_pickle(transactions_file)
-        product_category_df = pd.read_pickle(product_category_file)
-
-        transactions_df["num_products"] = (
-            transactions_df["products"].str.split().str.len()
-        )
+        with measure("read_intermediate") as step:
+            transactions_df = pd.read_pickle(transactions_file)
+            aggregates = pd.read_pickle(aggregates_file)
+            category_lookup = load_category_lookup(category_lookup_file)
+            step["rows"] = len(transactions_df)
 
         customer_results = {}
 
         # Frecuencia de compra por cliente
         logger.info("Calculating purchase frequency...")
-        customer_freq = transactions_df.groupby("customer").size()
+        customer_freq = aggregates["customer_totals"]["frequency"]
         customer_results["purchase_frequency"] = {
             "mean": float(customer_freq.mean()),
             "median": float(customer_freq.median()),
@@ -600,15 +1008,16 @@ def customer_analysis(**context):
 
         # Tiempo promedio entre compras
         logger.info("Calculating time between purchases...")
-        customer_dates = transactions_df.groupby("customer")["date"].apply(
-            lambda x: x.sort_values().tolist()
-        )
-        time_between_purchases = []
-        for customer, dates in customer_dates.items():
-            if isinstance(dates, list) and len(dates) > 1:
-                for i in range(1, len(dates)):
-                    diff = (dates[i] - dates[i - 1]).days
-                    time_between_purchases.append(diff)
+        with measure("time_between_purchases", rows=len(transactions_df)):
+            customer_dates = transactions_df.groupby("customer")["date"].apply(
+                lambda x: x.sort_values().tolist()
+            )
+            time_between_purchases = []
+            for customer, dates in customer_dates.items():
+                if isinstance(dates, list) and len(dates) > 1:
+                    for i in range(1, len(dates)):
+                        diff = (dates[i] - dates[i - 1]).days
+                        time_between_purchases.append(diff)
 
         if time_between_purchases:
             customer_results["time_between_purchases"] = {
@@ -623,46 +1032,32 @@ def customer_analysis(**context):
         logger.info("Starting K-Means clustering preparation...")
         # Preparar características para clustering
 
-        # 1. Frecuencia: número de transacciones por cliente
+        # 1. Frecuencia y volumen total por cliente (agregados combinados)
         logger.info("Aggregating customer features...")
-        customer_features = (
-            transactions_df.groupby("customer")
-            .agg(
-                {"date": "count", "num_products": "sum"}  # Frecuencia  # Volumen total
-            )
-            .rename(columns={"date": "frequency", "num_products": "total_volume"})
+        customer_features = aggregates["customer_totals"].copy()
+
+        # Pares (cliente, producto) distintos de todas las particiones
+        customer_products = aggregates["customer_products"]
+        pair_customer = customer_features.index.get_indexer(
+            customer_products["customer"]
         )
+        pair_product = customer_products["product_id"].to_numpy()
 
-        # 2. Número de productos distintos por cliente (optimizado)
+        # 2. Número de productos distintos por cliente
         logger.info("Calculating distinct products per customer...")
+        customer_features["distinct_products"] = np.bincount(
+            pair_customer, minlength=len(customer_features)
+        )
 
-        def count_distinct_products(products_series):
-            all_products = set()
-            for products_str in products_series:
-                all_products.update(products_str.split())
-            return len(all_products)
-
-        customer_features["distinct_products"] = transactions_df.groupby("customer")[
-            "products"
-        ].apply(count_distinct_products)
-
-        # 3. Diversidad de categorías (número de categorías distintas compradas) (optimizado)
+        # 3. Diversidad de categorías (número de categorías distintas compradas)
+        # Join producto -> categoría vectorizado sobre los pares cliente-producto
         logger.info("Calculating category diversity per customer...")
-        product_to_category = product_category_df.set_index("product_code")[
-            "category_id"
-        ].to_dict()
-
-        def count_category_diversity(products_series):
-            all_categories = set()
-            for products_str in products_series:
-                for product in products_str.split():
-                    if product in product_to_category:
-                        all_categories.add(product_to_category[product])
-            return len(all_categories)
-
-        customer_features["category_diversity"] = transactions_df.groupby("customer")[
-            "products"
-        ].apply(count_category_diversity)
+        customer_features["category_diversity"] = distinct_categories_per_group(
+            pair_customer,
+            len(customer_features),
+            pair_product,
+            category_lookup,
+        )
 
         # 4. Promedio de productos por transacción
         logger.info("Calculating average products per transaction...")
@@ -672,14 +1067,17 @@ def customer_analysis(**context):
 
         # Normalizar características para K-Means (ahora con 5 características)
         logger.info("Scaling features for K-Means (5 features)...")
-        scaler = StandardScaler()
-        features_scaled = scaler.fit_transform(customer_features)
-
-        # Aplicar K-Means con 4 clusters
-        logger.info("Running K-Means clustering (4 clusters)...")
-        n_clusters = 4
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10, max_iter=300)
-        customer_features["cluster"] = kmeans.fit_predict(features_scaled)
+        with measure("kmeans", rows=len(customer_features)):
+            scaler = StandardScaler()
+            features_scaled = scaler.fit_transform(customer_features)
+
+            # Aplicar K-Means con 4 clusters
+            logger.info("Running K-Means clustering (4 clusters)...")
+            n_clusters = 4
+            kmeans = KMeans(
+                n_clusters=n_clusters, random_state=42, n_init=10, max_iter=300
+            )
+            customer_features["cluster"] = kmeans.fit_predict(features_scaled)
         logger.info(f"K-Means completed. Inertia: {kmeans.inertia_:.2f}")
 
         # Analizar características de cada cluster
@@ -762,13 +1160,33 @@ def customer_analysis(**context):
             },
         }
 
+        # Top 10 clientes por número de transacciones
+        customer_results["top_customers"] = {
+            k: int(v)
+            for k, v in customer_features["frequency"]
+            .sort_values(ascending=False)
+            .head(10)
+            .items()
+        }
+
+        # Correlación entre variables de cliente (heatmap de generate_plots)
+        correlation_features = pd.DataFrame(
+            {
+                "Frecuencia": customer_features["frequency"],
+                "Volumen_Total": customer_features["total_volume"],
+                "Promedio_Productos": customer_features["total_volume"]
+                / customer_features["frequency"],
+                "Productos_Distintos": customer_features["distinct_products"],
+                "Diversidad_Categorias": customer_features["category_diversity"],
+            }
+        )
+        customer_results["feature_correlation"] = correlation_features.corr().to_dict()
+
         # Guardar DataFrame con clusters en archivo separado
         customer_features["cluster_name"] = customer_features["cluster"].map(
             cluster_names
         )
-        run_id = context["run_id"]
-        clusters_file = get_intermediate_path(run_id, "customer_clusters.pkl")
-        customer_features.to_pickle(clusters_file)
+        write_artifact(clusters_file, customer_features.to_pickle)
         context["ti"].xcom_push(key="clusters_file", value=clusters_file)
 
         logger.info("\n=== ANÁLISIS DE CLIENTES ===")
@@ -812,12 +1230,11 @@ def customer_analysis(**context):
             )
 
         # Guardar resultados en archivo pickle
-        customer_file = get_intermediate_path(run_id, "customer_results.pkl")
-        pd.to_pickle(customer_results, customer_file)
+        write_artifact(customer_file, lambda path: pd.to_pickle(customer_results, path))
         context["ti"].xcom_push(key="customer_file", value=customer_file)
 
         # Liberar memoria
-        del transactions_df, product_category_df, customer_features
+        del transactions_df, aggregates, category_lookup, customer_features
         gc.collect()
 
     except Exception as e:
@@ -825,6 +1242,7 @@ def customer_analysis(**context):
         raise
 
 
+@instrumented
 def recommendation_system(**context):
     """
     Sistema de recomendación basado en reglas de asociación.
@@ -834,11 +1252,13 @@ def recommendation_system(**context):
         # Obtener paths desde XCom
         transactions_file = context["ti"].xcom_pull(key="transactions_file")
         association_file = context["ti"].xcom_pull(key="association_file")
+        frequencies_file = context["ti"].xcom_pull(key="frequencies_file")
 
         # Cargar desde pickle
         logger.info("Loading data from intermediate files")
         transactions_df = pd.read_pickle(transactions_file)
         association_results = pd.read_pickle(association_file)
+        record_rows(len(transactions_df))
 
         recommendation_results = {}
 
@@ -948,15 +1368,12 @@ def recommendation_system(**context):
             customer_recommendations_examples
         )
 
-        # Ejemplo: Generar recomendaciones para los top 10 productos más vendidos
-        all_products = []
-        for products in transactions_df["products"]:
-            all_products.extend(products.split())
-        product_counts = Counter(all_products)
-        top_products = [prod for prod, count in product_counts.most_common(20)]
+        # Ejemplo: Generar recomendaciones para los top 20 productos más vendidos
+        frequencies = load_frequencies(frequencies_file)
+        top_sold_products = [prod for prod, count in top_products(frequencies, 20)]
 
         product_recommendations_examples = {}
-        for product in top_products:
+        for product in top_sold_products:
             recs = recommend_for_product(product, top_n=5)
             if recs:
                 product_recommendations_examples[product] = [
@@ -1005,9 +1422,16 @@ def recommendation_system(**context):
         # Guardar resultados en archivo pickle
         run_id = context["run_id"]
         recommendation_file = get_intermediate_path(
-            run_id, "recommendation_results.pkl"
+            run_id,
+            "recommendation_results.pkl",
+            transactions_file,
+            association_file,
+            frequencies_file,
+        )
+        write_artifact(
+            recommendation_file,
+            lambda path: pd.to_pickle(recommendation_results, path),
         )
-        pd.to_pickle(recommendation_results, recommendation_file)
         context["ti"].xcom_push(key="recommendation_file", value=recommendation_file)
 
         # Liberar memoria
@@ -1019,109 +1443,109 @@ def recommendation_system(**context):
         raise
 
 
+@instrumented
 def product_association_analysis(**context):
     """
     Analiza reglas de asociación entre productos usando el algoritmo Apriori.
-    Carga datos desde archivos pickle.
+    Cuenta items y pares sobre las canastas codificadas y genera las reglas
+    como arrays (soporte, confianza y lift vectorizados).
     """
     try:
-        # Obtener path desde XCom
-        transactions_file = context["ti"].xcom_pull(key="transactions_file")
+        # Obtener paths desde XCom
+        baskets_file = context["ti"].xcom_pull(key="baskets_file")
+        fingerprint = context["ti"].xcom_pull(key="dataset_fingerprint")
 
-        # Cargar desde pickle
-        logger.info("Loading transactions from intermediate file")
-        transactions_df = pd.read_pickle(transactions_file)
+        # Parámetros para Apriori
+        min_support = MIN_SUPPORT
+        min_confidence = MIN_CONFIDENCE
 
-        # Convertir transacciones a lista de listas de productos
-        transactions_list = []
-        for products_str in transactions_df["products"]:
-            products = products_str.split()
-            transactions_list.append(products)
+        backend = context["params"].get("association_backend", "pairs")
+        if backend not in ASSOCIATION_BACKENDS:
+            raise AirflowFailException(f"Unknown association backend: {backend}")
+        count_pairs = ASSOCIATION_BACKENDS[backend]
 
-        # Parámetros para Apriori
-        min_support = 0.01  # 1% de las transacciones
-        min_confidence = 0.3  # 30% de confianza
+        # Salidas direccionadas por entradas + versión del código; el conjunto
+        # completo de reglas se guarda por (dataset, umbrales) para Streamlit
+        run_id = context["run_id"]
+        association_file = get_intermediate_path(
+            run_id,
+            "association_results.pkl",
+            baskets_file,
+            code_version(
+                product_association_analysis,
+                count_pairs,
+                rules_from_pair_table,
+                top_rules,
+            ),
+        )
+        rules_file = rules_path(RULES_DIR, fingerprint, min_support, min_confidence)
+        pairs_file = pairs_path(RULES_DIR, fingerprint)
+        if reuse_task_outputs(
+            context,
+            {
+                "association_file": association_file,
+                "rules_file": rules_file,
+                "pairs_file": pairs_file,
+            },
+        ):
+            return
 
-        association_results = {}
+        # Tabla de conteos de items y pares al soporte base: la app obtiene de
+        # ella las reglas para cualquier umbral mayor sin volver a contar
+        if os.path.exists(pairs_file):
+            pair_table = load_pair_table(pairs_file)
+        else:
+            logger.info(f"Counting item pairs at base support ({backend} backend)")
+            with measure("count_pairs") as step:
+                baskets = load_baskets(baskets_file)
+                step["rows"] = len(baskets["basket_lengths"])
+                pair_table = count_pairs(baskets)
+                del baskets
+            save_pair_table(pairs_file, pair_table)
+            logger.info(
+                f"✓ Pair table saved: {len(pair_table['pair_counts'])} pairs "
+                f"with support >= {float(pair_table['base_support']):.2%}"
+            )
+        context["ti"].xcom_push(key="pairs_file", value=pairs_file)
+
+        total_transactions = int(pair_table["num_transactions"])
+        record_rows(total_transactions)
+        item_support = pair_table["item_counts"] / total_transactions
+        frequent = np.flatnonzero(item_support >= min_support)
+        num_frequent_pairs = int(
+            (pair_table["pair_counts"] / total_transactions >= min_support).sum()
+        )
 
-        # Calcular frecuencia de itemsets individuales
-        item_counts = Counter()
-        for transaction in transactions_list:
-            for item in set(transaction):
-                item_counts[item] += 1
-
-        total_transactions = len(transactions_list)
-        frequent_items = {
-            item: count
-            for item, count in item_counts.items()
-            if count / total_transactions >= min_support
-        }
+        association_results = {}
 
+        # Top 20 items por frecuencia (empates por código de producto)
+        top_items = frequent[
+            np.argsort(-pair_table["item_counts"][frequent], kind="stable")[:20]
+        ]
         association_results["frequent_items"] = {
-            k: int(v)
-            for k, v in sorted(
-                frequent_items.items(), key=lambda x: x[1], reverse=True
-            )[:20]
-        }
-
-        # Calcular pares frecuentes
-        pair_counts = Counter()
-        for transaction in transactions_list:
-            items = list(set(transaction))
-            for pair in combinations(sorted(items), 2):
-                pair_counts[pair] += 1
-
-        frequent_pairs = {
-            pair: count
-            for pair, count in pair_counts.items()
-            if count / total_transactions >= min_support
+            str(item): int(count)
+            for item, count in zip(
+                pair_table["items"][top_items], pair_table["item_counts"][top_items]
+            )
         }
 
-        # Calcular reglas de asociación
-        rules = []
-        for (item_a, item_b), count_ab in frequent_pairs.items():
-            support_ab = count_ab / total_transactions
-            support_a = item_counts[item_a] / total_transactions
-            support_b = item_counts[item_b] / total_transactions
-
-            # Regla A -> B
-            confidence_ab = count_ab / item_counts[item_a]
-            lift_ab = confidence_ab / support_b
-
-            if confidence_ab >= min_confidence:
-                rules.append(
-                    {
-                        "antecedent": item_a,
-                        "consequent": item_b,
-                        "support": float(support_ab),
-                        "confidence": float(confidence_ab),
-                        "lift": float(lift_ab),
-                    }
-                )
-
-            # Regla B -> A
-            confidence_ba = count_ab / item_counts[item_b]
-            lift_ba = confidence_ba / support_a
-
-            if confidence_ba >= min_confidence:
-                rules.append(
-                    {
-                        "antecedent": item_b,
-                        "consequent": item_a,
-                        "support": float(support_ab),
-                        "confidence": float(confidence_ba),
-                        "lift": float(lift_ba),
-                    }
-                )
+        # Reglas como tabla columnar; el conjunto completo se guarda en
+        # parquet (la app lo carga sin recalcular)
+        with measure("generate_rules", rows=len(pair_table["pair_counts"])):
+            rules = rules_from_pair_table(pair_table, min_support, min_confidence)
+        save_rules(
+            RULES_DIR, fingerprint, min_support, min_confidence, rules, pair_table
+        )
+        context["ti"].xcom_push(key="rules_file", value=rules_file)
 
-        # Ordenar por lift y tomar las top 20
-        rules_sorted = sorted(rules, key=lambda x: x["lift"], reverse=True)[:20]
+        # Top 20 por lift con argpartition (sin ordenar todas las reglas)
+        rules_sorted = top_rules(rules, 20, "lift").to_dict("records")
         association_results["top_rules"] = rules_sorted
 
         logger.info("\n=== ANÁLISIS DE ASOCIACIÓN DE PRODUCTOS ===")
         logger.info(f"\nTotal de transacciones: {total_transactions}")
-        logger.info(f"Items frecuentes encontrados: {len(frequent_items)}")
-        logger.info(f"Pares frecuentes encontrados: {len(frequent_pairs)}")
+        logger.info(f"Items frecuentes encontrados: {len(frequent)}")
+        logger.info(f"Pares frecuentes encontrados: {num_frequent_pairs}")
         logger.info(f"Reglas generadas: {len(rules)}")
 
         logger.info(f"\nTop 10 reglas de asociación (ordenadas por lift):")
@@ -1134,13 +1558,13 @@ def product_association_analysis(**context):
             )
 
         # Guardar resultados en archivo pickle
-        run_id = context["run_id"]
-        association_file = get_intermediate_path(run_id, "association_results.pkl")
-        pd.to_pickle(association_results, association_file)
+        write_artifact(
+            association_file, lambda path: pd.to_pickle(association_results, path)
+        )
         context["ti"].xcom_push(key="association_file", value=association_file)
 
         # Liberar memoria
-        del transactions_df, transactions_list
+        del pair_table, rules
         gc.collect()
 
     except Exception as e:
@@ -1148,16 +1572,226 @@ def product_association_analysis(**context):
         raise
 
 
+@instrumented
+def category_association_analysis(**context):
+    """
+    Reglas de asociación entre categorías: cada canasta se reduce a su
+    conjunto de categorías (bits) y se cuenta la co-ocurrencia en una matriz
+    densa categorías × categorías.
+    """
+    try:
+        # Obtener paths desde XCom
+        categories_file = context["ti"].xcom_pull(key="categories_file")
+        baskets_file = context["ti"].xcom_pull(key="baskets_file")
+        category_lookup_file = context["ti"].xcom_pull(key="category_lookup_file")
+
+        # Salidas direccionadas por entradas + versión del código
+        run_id = context["run_id"]
+        category_inputs = [
+            categories_file,
+            baskets_file,
+            category_lookup_file,
+            code_version(category_association_analysis, kernels, rules_from_pair_table),
+        ]
+        cooccurrence_file = get_intermediate_path(
+            run_id, "category_cooccurrence.npz", *category_inputs
+        )
+        category_association_file = get_intermediate_path(
+            run_id, "category_association.pkl", *category_inputs
+        )
+        if reuse_task_outputs(
+            context,
+            {
+                "cooccurrence_file": cooccurrence_file,
+                "category_association_file": category_association_file,
+            },
+        ):
+            shutil.copyfile(cooccurrence_file, CATEGORY_COOCCURRENCE_FILE)
+            return
+
+        logger.info("Computing category co-occurrence from encoded baskets")
+        cooccurrence = category_cooccurrence(
+            load_baskets(baskets_file, ["product_ids", "basket_lengths"]),
+            load_category_lookup(category_lookup_file),
+        )
+        rules = rules_from_pair_table(
+            category_pair_table(cooccurrence), MIN_SUPPORT, MIN_CONFIDENCE
+        )
+
+        # Nombres de categoría para el informe
+        categories_df = pd.read_pickle(categories_file)
+        category_names = dict(
+            zip(categories_df["category_id"].astype(str), categories_df["category_name"])
+        )
+        top = top_rules(rules, 20, "lift")
+        top["antecedent_name"] = top["antecedent"].map(category_names)
+        top["consequent_name"] = top["consequent"].map(category_names)
+
+        category_results = {
+            "num_categories": int((np.diag(cooccurrence["matrix"]) > 0).sum()),
+            "num_rules": len(rules),
+            "top_rules": top.to_dict("records"),
+        }
+        logger.info(
+            f"✓ Category rules: {len(rules)} rules over "
+            f"{category_results['num_categories']} categories"
+        )
+
+        cooccurrence = with_sources(
+            cooccurrence,
+            dataset_fingerprint=context["ti"].xcom_pull(key="dataset_fingerprint"),
+            product_category_sha256=context["ti"].xcom_pull(
+                key="product_category_sha256"
+            ),
+        )
+        write_artifact(
+            cooccurrence_file, lambda path: save_cooccurrence(path, cooccurrence)
+        )
+        write_artifact(
+            category_association_file,
+            lambda path: pd.to_pickle(category_results, path),
+        )
+        # Copia estable para Streamlit
+        save_cooccurrence(CATEGORY_COOCCURRENCE_FILE, cooccurrence)
+
+        context["ti"].xcom_push(key="cooccurrence_file", value=cooccurrence_file)
+        context["ti"].xcom_push(
+            key="category_association_file", value=category_association_file
+        )
+
+    except Exception as e:
+        logger.error(f"Error in category_association_analysis: {e}")
+        raise
+
+
+@instrumented
+def plan_rule_partitions(**context):
+    """
+    Devuelve una partición (tienda o mes) por elemento para mapear
+    `mine_partition_rules`. Solo lee las etiquetas de las canastas.
+    """
+    try:
+        baskets_file = context["ti"].xcom_pull(key="baskets_file")
+        labels = load_baskets(
+            baskets_file, [labels_key for labels_key, _ in PARTITION_KINDS.values()]
+        )
+        partitions = rule_partitions(labels)
+        logger.info(f"Planned {len(partitions)} rule partitions (stores and months)")
+        return [{"kind": kind, "key": key} for kind, key in partitions]
+
+    except Exception as e:
+        logger.error(f"Error in plan_rule_partitions: {e}")
+        raise
+
+
+@instrumented
+def mine_partition_rules(kind, key, **context):
+    """
+    Reglas de asociación de una tienda o un mes. Se ejecuta como tarea
+    mapeada: cada partición lee solo los arrays de canastas que necesita y
+    reutiliza la codificación compartida de load_data. Devuelve el path de
+    sus reglas.
+    """
+    try:
+        baskets_file = context["ti"].xcom_pull(key="baskets_file")
+        fingerprint = context["ti"].xcom_pull(key="dataset_fingerprint")
+
+        rules_file = partition_rules_path(
+            RULES_DIR, fingerprint, kind, key, MIN_SUPPORT, MIN_CONFIDENCE
+        )
+        if os.path.exists(rules_file):
+            logger.info(f"✓ Reusing rules for {partition_label(kind, key)}")
+            return rules_file
+
+        baskets = load_baskets(
+            baskets_file, ["product_ids", "basket_lengths", *PARTITION_KINDS[kind]]
+        )
+        rules, num_transactions = mine_partition(
+            baskets, kind, key, MIN_SUPPORT, MIN_CONFIDENCE
+        )
+        os.makedirs(RULES_DIR, exist_ok=True)
+        write_artifact(rules_file, lambda path: rules.to_parquet(path, index=False))
+        logger.info(
+            f"✓ {partition_label(kind, key)}: {len(rules)} rules "
+            f"from {num_transactions} transactions"
+        )
+
+        # Liberar memoria
+        del baskets, rules
+        gc.collect()
+        return rules_file
+
+    except Exception as e:
+        logger.error(f"Error in mine_partition_rules: {e}")
+        raise
+
+
+@instrumented
+def rule_drift_analysis(**context):
+    """
+    Compara las reglas de cada tienda y cada mes con las reglas globales
+    (reglas nuevas, ausentes, Jaccard y cambio de lift).
+    """
+    try:
+        rules_file = context["ti"].xcom_pull(key="rules_file")
+        partition_files = list(
+            context["ti"].xcom_pull(task_ids="mine_partition_rules") or []
+        )
+        partitions = [
+            partition_label(item["kind"], item["key"])
+            for item in context["ti"].xcom_pull(task_ids="plan_rule_partitions")
+        ]
+
+        drift_file = get_intermediate_path(
+            context["run_id"],
+            "rule_drift.pkl",
+            rules_file,
+            *partition_files,
+            code_version(rule_drift_analysis, rule_drift),
+        )
+        if reuse_task_outputs(context, {"drift_file": drift_file}):
+            return
+
+        summary, lifts = rule_drift(
+            pd.read_parquet(rules_file),
+            {
+                label: pd.read_parquet(path)
+                for label, path in zip(partitions, partition_files)
+            },
+        )
+
+        logger.info("\n=== DERIVA DE REGLAS ENTRE PARTICIONES ===")
+        for row in summary.itertuples():
+            logger.info(
+                f"{row.partition}: {row.rules} reglas, {row.new} nuevas, "
+                f"{row.missing} ausentes, Jaccard={row.jaccard:.2f}"
+            )
+
+        drift_results = {
+            "min_support": MIN_SUPPORT,
+            "min_confidence": MIN_CONFIDENCE,
+            "summary": summary,
+            "top_drift": lifts.head(20),
+        }
+        write_artifact(drift_file, lambda path: pd.to_pickle(drift_results, path))
+        context["ti"].xcom_push(key="drift_file", value=drift_file)
+
+    except Exception as e:
+        logger.error(f"Error in rule_drift_analysis: {e}")
+        raise
+
+
+@instrumented
 def generate_plots(**context):
     """
     Genera gráficas basadas en las estadísticas calculadas.
-    Carga datos desde archivos pickle y libera memoria después de cada gráfico.
+    Solo consume los resultados de descriptive_stats, temporal_analysis,
+    customer_analysis y product_association (no lee las transacciones) y
+    delega el renderizado de cada gráfica a un pool de procesos (ver pipeline.plots).
     """
     try:
         # Obtener paths desde XCom
         categories_file = context["ti"].xcom_pull(key="categories_file")
-        product_category_file = context["ti"].xcom_pull(key="product_category_file")
-        transactions_file = context["ti"].xcom_pull(key="transactions_file")
         stats_file = context["ti"].xcom_pull(key="stats_file")
         temporal_file = context["ti"].xcom_pull(key="temporal_file")
         customer_file = context["ti"].xcom_pull(key="customer_file")
@@ -1167,138 +1801,65 @@ def generate_plots(**context):
         # Cargar desde pickle
         logger.info("Loading data from intermediate files")
         categories_df = pd.read_pickle(categories_file)
-        product_category_df = pd.read_pickle(product_category_file)
-        transactions_df = pd.read_pickle(transactions_file)
         stats_results = pd.read_pickle(stats_file)
         temporal_results = pd.read_pickle(temporal_file)
         customer_results = pd.read_pickle(customer_file)
         association_results = pd.read_pickle(association_file)
+        customer_clusters_df = pd.read_pickle(clusters_file)
 
-        os.makedirs(RESULTS_DIR, exist_ok=True)
-
-        logger.info("Starting plot generation (15 plots total)")
-
-        # Gráficas originales
+        logger.info("Preparing plot aggregates")
+        jobs = []
+        category_id_to_name = categories_df.set_index("category_id")[
+            "category_name"
+        ].to_dict()
 
         # 1. Top productos vendidos
-        logger.info("Generating plot 1/14: Top products")
-        product_counts = pd.Series(stats_results["product_frequencies"]).head(10)
-        plt.figure(figsize=(10, 6))
-        product_counts.plot(kind="barh", color="skyblue")
-        plt.title("Top 10 Productos Mas Vendidos")
-        plt.xlabel("Numero de Ventas")
-        plt.ylabel("Producto")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "top_products.png"), dpi=100, bbox_inches="tight"
-        )
-        plt.close("all")
-        gc.collect()
+        jobs.append(
+            plot_job(
+                "top_products",
+                pd.Series(stats_results["product_frequencies"]).head(10),
+            )
+        )
 
         # 2. Ranking de tiendas
-        logger.info("Generating plot 2/14: Store ranking")
-        store_counts = pd.Series(stats_results["store_frequencies"]["counts"])
-        plt.figure(figsize=(8, 6))
-        store_counts.plot(kind="bar", color="lightgreen")
-        plt.title("Ranking de Tiendas por Numero de Transacciones")
-        plt.xlabel("Tienda")
-        plt.ylabel("Numero de Transacciones")
-        plt.xticks(rotation=0)
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "store_ranking.png"), dpi=100, bbox_inches="tight"
-        )
-        plt.close("all")
-        gc.collect()
+        jobs.append(
+            plot_job(
+                "store_ranking",
+                pd.Series(stats_results["store_frequencies"]["counts"]),
+            )
+        )
 
         # 3. Histograma de número de productos por transacción
-        logger.info("Generating plot 3/14: Products histogram")
-        transactions_expanded = transactions_df.copy()
-        transactions_expanded["num_products"] = (
-            transactions_expanded["products"].str.split().str.len()
-        )
-        plt.figure(figsize=(10, 6))
-        plt.hist(
-            transactions_expanded["num_products"], bins=30, edgecolor="black", alpha=0.7
-        )
-        plt.title("Distribucion del Numero de Productos por Transaccion")
-        plt.xlabel("Numero de Productos")
-        plt.ylabel("Frecuencia")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "products_histogram.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        del transactions_expanded
-        gc.collect()
+        jobs.append(
+            plot_job(
+                "products_histogram",
+                pd.Series(stats_results["basket_size_histogram"]),
+            )
+        )
 
         # 4. Distribución de categorías
-        logger.info("Generating plot 4/14: Category distribution")
-        category_id_to_name = categories_df.set_index("category_id")[
-            "category_name"
-        ].to_dict()
         category_counts = pd.Series(stats_results["categorical"]["category_counts"])
-        category_counts_named = category_counts.rename(index=category_id_to_name).head(
-            10
-        )
-        plt.figure(figsize=(12, 6))
-        category_counts_named.plot(kind="bar", color="coral")
-        plt.title("Top 10 Categorias por Numero de Productos")
-        plt.xlabel("Categoria")
-        plt.ylabel("Numero de Productos")
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "category_distribution.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        gc.collect()
-
-        # Nuevas gráficas de análisis temporal
+        jobs.append(
+            plot_job(
+                "category_distribution",
+                category_counts.rename(index=category_id_to_name).head(10),
+            )
+        )
 
         # 5. Ventas diarias (serie temporal)
-        logger.info("Generating plot 5/14: Daily sales timeseries")
         daily_sales_df = pd.DataFrame(temporal_results["daily_sales"]).T
         daily_sales_df.index = pd.to_datetime(daily_sales_df.index)
-        plt.figure(figsize=(14, 6))
-        plt.plot(daily_sales_df.index, daily_sales_df["num_transactions"], linewidth=1)
-        plt.title("Serie Temporal de Transacciones Diarias")
-        plt.xlabel("Fecha")
-        plt.ylabel("Numero de Transacciones")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "daily_sales_timeseries.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        gc.collect()
+        jobs.append(
+            plot_job("daily_sales_timeseries", daily_sales_df["num_transactions"])
+        )
 
         # 6. Ventas por día de la semana
-        logger.info("Generating plot 6/14: Sales by day of week")
         day_of_week_df = pd.DataFrame(temporal_results["day_of_week_sales"]).T
-        plt.figure(figsize=(10, 6))
-        day_of_week_df["num_transactions"].plot(kind="bar", color="steelblue")
-        plt.title("Transacciones por Dia de la Semana")
-        plt.xlabel("Dia de la Semana")
-        plt.ylabel("Numero de Transacciones")
-        plt.xticks(rotation=45, ha="right")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "sales_by_day_of_week.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        gc.collect()
+        jobs.append(
+            plot_job("sales_by_day_of_week", day_of_week_df["num_transactions"])
+        )
 
         # 7. Ventas mensuales
-        logger.info("Generating plot 7/14: Monthly sales")
         monthly_sales_list = []
         for key, value in temporal_results["monthly_sales"].items():
             year, month = eval(key)
@@ -1314,825 +1875,175 @@ def generate_plots(**context):
             monthly_sales_df[["year", "month"]].assign(day=1)
         )
         monthly_sales_df = monthly_sales_df.sort_values("date")
+        jobs.append(
+            plot_job("monthly_sales", monthly_sales_df[["date", "num_transactions"]])
+        )
 
-        plt.figure(figsize=(12, 6))
-        plt.plot(
-            monthly_sales_df["date"],
-            monthly_sales_df["num_transactions"],
-            marker="o",
-            linewidth=2,
-        )
-        plt.title("Ventas Mensuales")
-        plt.xlabel("Mes")
-        plt.ylabel("Numero de Transacciones")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "monthly_sales.png"), dpi=100, bbox_inches="tight"
-        )
-        plt.close("all")
-        gc.collect()
-
-        # Nuevas gráficas de análisis de clientes
-
-        # 8. Clustering K-Means de clientes
-        logger.info("Generating plot 8/14: Customer clustering (K-Means)")
+        # 8. Clustering K-Means de clientes (pie, scatter 2D y perfiles)
         if (
             "clustering" in customer_results
             and "cluster_sizes" in customer_results["clustering"]
         ):
-            cluster_sizes_df = pd.Series(
-                customer_results["clustering"]["cluster_sizes"]
-            )
-            plt.figure(figsize=(12, 8))
-            # Colores más contrastantes para distinguir mejor los 4 clusters
-            colors = ["#e74c3c", "#3498db", "#2ecc71", "#f39c12"]
-            wedges, texts, autotexts = plt.pie(
-                cluster_sizes_df.values,
-                labels=cluster_sizes_df.index,
-                autopct="%1.1f%%",
-                colors=colors,
-                startangle=90,
-                textprops={'fontsize': 11, 'weight': 'bold'},
-                explode=[0.05] * len(cluster_sizes_df),  # Separar ligeramente las porciones
-            )
-            # Hacer más legibles los porcentajes
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontsize(12)
-                autotext.set_weight('bold')
-            plt.title("Clustering K-Means de Clientes (4 Segmentos)", fontsize=14, weight='bold')
-            plt.tight_layout()
-            plt.savefig(
-                os.path.join(RESULTS_DIR, "customer_clustering_kmeans.png"),
-                dpi=150,
-                bbox_inches="tight",
+            jobs.append(
+                plot_job(
+                    "customer_clustering_kmeans",
+                    pd.Series(customer_results["clustering"]["cluster_sizes"]),
+                    dpi=150,
+                )
             )
-            plt.close("all")
-            gc.collect()
-
-            # Visualización 2D del clustering (proyección desde 4D)
-            logger.info("Generating plot 8b/14: Customer clustering scatter")
-            customer_clusters_df = pd.read_pickle(clusters_file)
-            plt.figure(figsize=(14, 9))
-
-            # Scatter plot de frecuencia vs volumen total coloreado por cluster
-            # Nota: Los clusters fueron calculados en 4D (frecuencia, volumen, productos distintos, categorías)
-            # Esta es solo una proyección 2D para visualización
-            cluster_colors = {0: '#e74c3c', 1: '#3498db', 2: '#2ecc71', 3: '#f39c12'}
-            cluster_names_map = {
-                0: customer_clusters_df[customer_clusters_df['cluster']==0]['cluster_name'].iloc[0] if len(customer_clusters_df[customer_clusters_df['cluster']==0]) > 0 else 'Cluster 0',
-                1: customer_clusters_df[customer_clusters_df['cluster']==1]['cluster_name'].iloc[0] if len(customer_clusters_df[customer_clusters_df['cluster']==1]) > 0 else 'Cluster 1',
-                2: customer_clusters_df[customer_clusters_df['cluster']==2]['cluster_name'].iloc[0] if len(customer_clusters_df[customer_clusters_df['cluster']==2]) > 0 else 'Cluster 2',
-                3: customer_clusters_df[customer_clusters_df['cluster']==3]['cluster_name'].iloc[0] if len(customer_clusters_df[customer_clusters_df['cluster']==3]) > 0 else 'Cluster 3',
-            }
-            
-            for cluster_id in sorted(customer_clusters_df['cluster'].unique()):
-                cluster_data = customer_clusters_df[customer_clusters_df['cluster'] == cluster_id]
-                plt.scatter(
-                    cluster_data['frequency'],
-                    cluster_data['total_volume'],
-                    c=cluster_colors[cluster_id],
-                    label=cluster_names_map[cluster_id],
-                    alpha=0.6,
-                    s=100,
-                    edgecolors='black',
-                    linewidths=0.5
+            jobs.append(
+                plot_job(
+                    "customer_clustering_scatter",
+                    customer_clusters_df[
+                        ["frequency", "total_volume", "cluster", "cluster_name"]
+                    ],
+                    dpi=150,
                 )
-            
-            plt.xlabel("Frecuencia de Compra (# Transacciones)", fontsize=12, weight='bold')
-            plt.ylabel("Volumen Total (# Productos)", fontsize=12, weight='bold')
-            plt.title("K-Means: Proyección 2D (Frecuencia vs Volumen)\nClusters calculados en 5D: Frecuencia + Volumen + Productos Distintos + Diversidad Categorías + Prom Prod/Trans", 
-                     fontsize=13, weight='bold')
-            plt.legend(title='Segmento de Cliente', loc='best', fontsize=10)
-            plt.grid(True, alpha=0.3, linestyle='--')
-            plt.tight_layout()
-            plt.savefig(
-                os.path.join(RESULTS_DIR, "customer_clustering_scatter.png"),
-                dpi=150,
-                bbox_inches="tight",
             )
-            plt.close("all")
-            del customer_clusters_df
-            gc.collect()
-
-            # Visualización adicional: Gráfico de barras comparativo de características por cluster
-            logger.info("Generating plot 8c/14: Cluster profiles comparison")
-            cluster_profiles_data = customer_results["clustering"]["cluster_profiles"]
-            
-            fig, axes = plt.subplots(3, 2, figsize=(16, 16))
-            fig.suptitle("Perfiles de los 4 Clusters K-Means - Comparación de 5 Características", 
-                        fontsize=16, weight='bold')
-            
-            cluster_names_list = list(cluster_profiles_data.keys())
-            cluster_colors_list = ['#e74c3c', '#3498db', '#2ecc71', '#f39c12']
-            
-            # Gráfico 1: Frecuencia promedio
-            frequencies = [cluster_profiles_data[name]['avg_frequency'] for name in cluster_names_list]
-            axes[0, 0].bar(range(len(cluster_names_list)), frequencies, color=cluster_colors_list, edgecolor='black', linewidth=1.5)
-            axes[0, 0].set_xticks(range(len(cluster_names_list)))
-            axes[0, 0].set_xticklabels(cluster_names_list, rotation=15, ha='right', fontsize=10)
-            axes[0, 0].set_ylabel('Frecuencia Promedio', fontsize=11, weight='bold')
-            axes[0, 0].set_title('Frecuencia de Compra por Cluster', fontsize=12, weight='bold')
-            axes[0, 0].grid(axis='y', alpha=0.3, linestyle='--')
-            
-            # Gráfico 2: Volumen total promedio
-            volumes = [cluster_profiles_data[name]['avg_total_volume'] for name in cluster_names_list]
-            axes[0, 1].bar(range(len(cluster_names_list)), volumes, color=cluster_colors_list, edgecolor='black', linewidth=1.5)
-            axes[0, 1].set_xticks(range(len(cluster_names_list)))
-            axes[0, 1].set_xticklabels(cluster_names_list, rotation=15, ha='right', fontsize=10)
-            axes[0, 1].set_ylabel('Volumen Total Promedio', fontsize=11, weight='bold')
-            axes[0, 1].set_title('Volumen de Compra por Cluster', fontsize=12, weight='bold')
-            axes[0, 1].grid(axis='y', alpha=0.3, linestyle='--')
-            
-            # Gráfico 3: Productos distintos promedio
-            distinct_prods = [cluster_profiles_data[name]['avg_distinct_products'] for name in cluster_names_list]
-            axes[1, 0].bar(range(len(cluster_names_list)), distinct_prods, color=cluster_colors_list, edgecolor='black', linewidth=1.5)
-            axes[1, 0].set_xticks(range(len(cluster_names_list)))
-            axes[1, 0].set_xticklabels(cluster_names_list, rotation=15, ha='right', fontsize=10)
-            axes[1, 0].set_ylabel('Productos Distintos Promedio', fontsize=11, weight='bold')
-            axes[1, 0].set_title('Variedad de Productos por Cluster', fontsize=12, weight='bold')
-            axes[1, 0].grid(axis='y', alpha=0.3, linestyle='--')
-            
-            # Gráfico 4: Diversidad de categorías promedio
-            category_div = [cluster_profiles_data[name]['avg_category_diversity'] for name in cluster_names_list]
-            axes[1, 1].bar(range(len(cluster_names_list)), category_div, color=cluster_colors_list, edgecolor='black', linewidth=1.5)
-            axes[1, 1].set_xticks(range(len(cluster_names_list)))
-            axes[1, 1].set_xticklabels(cluster_names_list, rotation=15, ha='right', fontsize=10)
-            axes[1, 1].set_ylabel('Diversidad de Categorías Promedio', fontsize=11, weight='bold')
-            axes[1, 1].set_title('Diversidad de Categorías por Cluster', fontsize=12, weight='bold')
-            axes[1, 1].grid(axis='y', alpha=0.3, linestyle='--')
-            
-            # Gráfico 5: Promedio de productos por transacción
-            avg_prod_trans = [cluster_profiles_data[name]['avg_products_per_transaction'] for name in cluster_names_list]
-            axes[2, 0].bar(range(len(cluster_names_list)), avg_prod_trans, color=cluster_colors_list, edgecolor='black', linewidth=1.5)
-            axes[2, 0].set_xticks(range(len(cluster_names_list)))
-            axes[2, 0].set_xticklabels(cluster_names_list, rotation=15, ha='right', fontsize=10)
-            axes[2, 0].set_ylabel('Promedio Prod/Trans', fontsize=11, weight='bold')
-            axes[2, 0].set_title('Productos Promedio por Transacción por Cluster', fontsize=12, weight='bold')
-            axes[2, 0].grid(axis='y', alpha=0.3, linestyle='--')
-            
-            # Ocultar el panel vacío (2, 1)
-            axes[2, 1].axis('off')
-            
-            plt.tight_layout()
-            plt.savefig(
-                os.path.join(RESULTS_DIR, "customer_clustering_profiles.png"),
-                dpi=150,
-                bbox_inches="tight",
+            jobs.append(
+                plot_job(
+                    "customer_clustering_profiles",
+                    customer_results["clustering"]["cluster_profiles"],
+                    dpi=150,
+                )
             )
-            plt.close("all")
-            gc.collect()
 
         # 9. Top reglas de asociación
-        logger.info("Generating plot 9/14: Association rules")
         if association_results["top_rules"]:
-            top_rules = association_results["top_rules"][:10]
-            rules_labels = [f"{r['antecedent']}->{r['consequent']}" for r in top_rules]
-            rules_lift = [r["lift"] for r in top_rules]
-
-            plt.figure(figsize=(12, 6))
-            plt.barh(range(len(rules_labels)), rules_lift, color="teal")
-            plt.yticks(range(len(rules_labels)), rules_labels)
-            plt.xlabel("Lift")
-            plt.title("Top 10 Reglas de Asociacion (por Lift)")
-            plt.tight_layout()
-            plt.savefig(
-                os.path.join(RESULTS_DIR, "association_rules.png"),
-                dpi=100,
-                bbox_inches="tight",
+            jobs.append(
+                plot_job("association_rules", association_results["top_rules"][:10])
             )
-            plt.close("all")
-            gc.collect()
-
-        # === NUEVAS VISUALIZACIONES ANALÍTICAS REQUERIDAS ===
 
         # 10. Top 10 Clientes (Resumen Ejecutivo)
-        logger.info("Generating plot 10/14: Top 10 customers")
-        customer_transaction_counts = (
-            transactions_df.groupby("customer")
-            .size()
-            .sort_values(ascending=False)
-            .head(10)
+        jobs.append(
+            plot_job("top_10_customers", pd.Series(customer_results["top_customers"]))
         )
-        plt.figure(figsize=(10, 6))
-        customer_transaction_counts.plot(kind="barh", color="orange")
-        plt.title("Top 10 Clientes por Numero de Transacciones")
-        plt.xlabel("Numero de Transacciones")
-        plt.ylabel("Cliente ID")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "top_10_customers.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        gc.collect()
 
         # 11. Boxplot - Distribución de productos por cliente y por categoría
-        logger.info("Generating plot 11/14: Boxplot distribution")
-
-        # Calcular productos por cliente (contar productos en la columna 'products')
-        def count_products(products_str):
-            return len(products_str.split())
-
-        transactions_df["num_products"] = transactions_df["products"].apply(
-            count_products
+        category_volume = pd.Series(stats_results["category_volume"])
+        jobs.append(
+            plot_job(
+                "boxplot_distribution",
+                {
+                    "customer_volume": customer_clusters_df["total_volume"],
+                    "top_categories": category_volume.head(10),
+                },
+            )
         )
-        customer_product_counts = transactions_df.groupby("customer")[
-            "num_products"
-        ].sum()
-
-        # Calcular productos por categoría
-        # Expandir productos y mapear a categorías
-        product_to_category = product_category_df.set_index("product_code")[
-            "category_id"
-        ].to_dict()
-        category_product_counts = []
-
-        for products_str in transactions_df["products"]:
-            for product in products_str.split():
-                if product in product_to_category:
-                    category_product_counts.append(product_to_category[product])
-
-        category_counts_series = pd.Series(category_product_counts).value_counts()
-
-        # Crear figura con subplots
-        fig, axes = plt.subplots(1, 2, figsize=(14, 6))
-
-        # Boxplot 1: Distribución por cliente
-        axes[0].boxplot([customer_product_counts], labels=["Clientes"])
-        axes[0].set_ylabel("Total de Productos Comprados")
-        axes[0].set_title("Distribucion de Productos por Cliente")
-        axes[0].grid(axis="y", alpha=0.3)
-
-        # Boxplot 2: Distribución por categoría (top 10 categorías)
-        top_categories = category_counts_series.head(10)
-        axes[1].barh(range(len(top_categories)), top_categories.values)
-        axes[1].set_yticks(range(len(top_categories)))
-        axes[1].set_yticklabels([f"Cat {cat}" for cat in top_categories.index])
-        axes[1].set_xlabel("Numero de Productos")
-        axes[1].set_title("Top 10 Categorias por Volumen")
-
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "boxplot_distribution.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        gc.collect()
-
-        # 12. Heatmap - Correlación entre variables numéricas
-        logger.info("Generating plot 12/14: Correlation heatmap")
-        # Crear DataFrame con variables numéricas por cliente usando vectorización
-
-        # Funciones auxiliares para agrupar
-        def count_distinct_products_heatmap(products_series):
-            all_products = set()
-            for products_str in products_series:
-                all_products.update(products_str.split())
-            return len(all_products)
-
-        def count_category_diversity_heatmap(products_series):
-            categories_purchased = set()
-            for products_str in products_series:
-                for product in products_str.split():
-                    if product in product_to_category:
-                        categories_purchased.add(product_to_category[product])
-            return len(categories_purchased)
-
-        # Agrupar por cliente y calcular métricas
-        features_df = pd.DataFrame()
-        features_df["Frecuencia"] = transactions_df.groupby("customer").size()
-        features_df["Volumen_Total"] = transactions_df.groupby("customer")[
-            "num_products"
-        ].sum()
-        features_df["Promedio_Productos"] = transactions_df.groupby("customer")[
-            "num_products"
-        ].mean()
-        features_df["Productos_Distintos"] = transactions_df.groupby("customer")[
-            "products"
-        ].apply(count_distinct_products_heatmap)
-        features_df["Diversidad_Categorias"] = transactions_df.groupby("customer")[
-            "products"
-        ].apply(count_category_diversity_heatmap)
-        features_df = features_df.reset_index(drop=True)
-        correlation_matrix = features_df.corr()
-
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(
-            correlation_matrix,
-            annot=True,
-            cmap="coolwarm",
-            center=0,
-            square=True,
-            linewidths=1,
-            cbar_kws={"shrink": 0.8},
-        )
-        plt.title("Heatmap de Correlacion entre Variables de Cliente")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "correlation_heatmap.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
-        gc.collect()
-
-        # 13. Días pico de compra (agregado por día)
-        logger.info("Generating plot 13/14: Peak days")
-        daily_transactions = transactions_df.groupby(
-            transactions_df["date"].dt.date
-        ).size()
-        top_days = daily_transactions.sort_values(ascending=False).head(10)
-
-        plt.figure(figsize=(12, 6))
-        plt.bar(range(len(top_days)), top_days.values, color="purple", alpha=0.7)
-        plt.xticks(
-            range(len(top_days)),
-            [str(d) for d in top_days.index],
-            rotation=45,
-            ha="right",
-        )
-        plt.xlabel("Fecha")
-        plt.ylabel("Numero de Transacciones")
-        plt.title("Top 10 Dias Pico de Compra")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "peak_days.png"), dpi=100, bbox_inches="tight"
-        )
-        plt.close("all")
-        gc.collect()
 
-        # 14. Categorías más "rentables" (por volumen/frecuencia relativa)
-        logger.info("Generating plot 14/14: Categories by volume")
-        category_volume = defaultdict(int)
-        for products_str in transactions_df["products"]:
-            for product in products_str.split():
-                if product in product_to_category:
-                    category_volume[product_to_category[product]] += 1
+        # 12. Heatmap - Correlación entre variables numéricas por cliente
+        jobs.append(
+            plot_job(
+                "correlation_heatmap",
+                pd.DataFrame(customer_results["feature_correlation"]),
+            )
+        )
 
-        category_volume_series = (
-            pd.Series(category_volume).sort_values(ascending=False).head(10)
+        # 13. Días pico de compra (desde las ventas diarias de temporal_analysis)
+        top_days = (
+            daily_sales_df["num_transactions"].sort_values(ascending=False).head(10)
         )
+        top_days.index = top_days.index.date
+        jobs.append(plot_job("peak_days", top_days))
 
-        # Mapear a nombres si están disponibles
-        category_id_to_name = categories_df.set_index("category_id")[
-            "category_name"
-        ].to_dict()
-        category_labels = [
+        # 14. Categorías más "rentables" (por volumen/frecuencia relativa)
+        top_category_volume = category_volume.head(10)
+        top_category_volume.index = [
             category_id_to_name.get(cat, f"Cat {cat}")
-            for cat in category_volume_series.index
+            for cat in top_category_volume.index
         ]
+        jobs.append(plot_job("categories_by_volume", top_category_volume))
 
-        plt.figure(figsize=(12, 6))
-        plt.barh(
-            range(len(category_volume_series)),
-            category_volume_series.values,
-            color="gold",
-        )
-        plt.yticks(range(len(category_volume_series)), category_labels)
-        plt.xlabel("Volumen Total (Frecuencia de Productos)")
-        plt.title("Top 10 Categorias por Volumen (Rentabilidad Relativa)")
-        plt.tight_layout()
-        plt.savefig(
-            os.path.join(RESULTS_DIR, "categories_by_volume.png"),
-            dpi=100,
-            bbox_inches="tight",
-        )
-        plt.close("all")
+        # Liberar los DataFrames grandes antes de lanzar los procesos
+        del categories_df, customer_clusters_df
+        del stats_results, temporal_results, customer_results, association_results
         gc.collect()
 
-        logger.info("✓ All 14 plots generated and saved successfully")
+        num_plots = len(jobs)
+        with measure("render_plots"):
+            timings = render_plots(jobs, RESULTS_DIR, cache_dir=PLOT_CACHE_DIR)
+        context["ti"].xcom_push(key="plot_timings", value=timings)
 
-        # Liberar toda la memoria
-        del categories_df, product_category_df, transactions_df
-        del stats_results, temporal_results, customer_results, association_results
-        gc.collect()
+        logger.info(
+            f"✓ All {num_plots} plots saved successfully ({len(timings)} re-rendered)"
+        )
 
     except Exception as e:
         logger.error(f"Error in generate_plots: {e}")
-        plt.close("all")  # Cerrar cualquier figura abierta
         raise
 
 
+@instrumented
 def save_results(**context):
     """
-    Guarda los resultados en archivos.
-    Carga datos desde archivos pickle.
+    Guarda los resultados en archivos (informes `.txt` y sus versiones
+    JSON/Parquet) y en el almacén SQLite, versionados por run_id. Solo carga
+    los artefactos de resultados (pequeños) y las reglas, no las transacciones.
     """
     try:
-        # Obtener paths desde XCom
-        review_file = context["ti"].xcom_pull(key="review_file")
-        stats_file = context["ti"].xcom_pull(key="stats_file")
-        temporal_file = context["ti"].xcom_pull(key="temporal_file")
-        customer_file = context["ti"].xcom_pull(key="customer_file")
-        association_file = context["ti"].xcom_pull(key="association_file")
+        # Obtener paths desde XCom (los tres últimos son opcionales)
+        result_files = {
+            "review": context["ti"].xcom_pull(key="review_file"),
+            "stats": context["ti"].xcom_pull(key="stats_file"),
+            "temporal": context["ti"].xcom_pull(key="temporal_file"),
+            "customer": context["ti"].xcom_pull(key="customer_file"),
+            "association": context["ti"].xcom_pull(key="association_file"),
+            "recommendation": context["ti"].xcom_pull(key="recommendation_file"),
+            "category": context["ti"].xcom_pull(key="category_association_file"),
+            "drift": context["ti"].xcom_pull(key="drift_file"),
+        }
 
         # Cargar desde pickle
         logger.info("Loading results from intermediate files")
-        review_results = pd.read_pickle(review_file)
-        stats_results = pd.read_pickle(stats_file)
-        temporal_results = pd.read_pickle(temporal_file)
-        customer_results = pd.read_pickle(customer_file)
-        association_results = pd.read_pickle(association_file)
+        results = {
+            key: pd.read_pickle(path) if path else None
+            for key, path in result_files.items()
+        }
 
         os.makedirs(RESULTS_DIR, exist_ok=True)
         logger.info(f"Saving results to {RESULTS_DIR}")
+        write_text_reports(RESULTS_DIR, results)
+        write_machine_readable(RESULTS_DIR, results)
+        logger.info("✓ All results saved successfully to files")
 
-        # Guardar revisión de datos
-        with open(os.path.join(RESULTS_DIR, "data_review.txt"), "w") as f:
-            for table, stats in review_results.items():
-                f.write(f"=== {table.upper()} ===\n")
-                for key, value in stats.items():
-                    f.write(f"{key}: {value}\n")
-                f.write("\n")
-
-        # Guardar estadísticas descriptivas
-        with open(os.path.join(RESULTS_DIR, "descriptive_stats.txt"), "w") as f:
-            f.write("=== ESTADÍSTICAS NUMÉRICAS ===\n")
-            for var, stats in stats_results["numeric"].items():
-                f.write(f"\n--- {var.upper()} ---\n")
-                desc_df = pd.DataFrame(stats["describe"])
-                f.write(desc_df.to_string())
-                f.write(f"\nModa: {stats['mode']}\n")
-                f.write(f"Outliers: {stats_results['outliers'][var]}\n")
-
-            f.write("\n=== ESTADÍSTICAS CATEGÓRICAS ===\n")
-            f.write("Categorías:\n")
-            for cat, count in list(
-                stats_results["categorical"]["category_counts"].items()
-            )[:10]:
-                freq = stats_results["categorical"]["category_frequencies"][cat]
-                f.write(f"Categoría {cat}: {count} productos ({freq}%)\n")
-
-            f.write("\nTop productos:\n")
-            for prod, count in list(stats_results["product_frequencies"].items())[:10]:
-                f.write(f"Producto {prod}: {count} veces\n")
-
-            f.write("\nTop stores:\n")
-            for store, count in list(
-                stats_results["store_frequencies"]["counts"].items()
-            )[:10]:
-                freq = stats_results["store_frequencies"]["frequencies"][store]
-                f.write(f"Store {store}: {count} transacciones ({freq}%)\n")
-
-        # Guardar análisis temporal
-        with open(os.path.join(RESULTS_DIR, "temporal_analysis.txt"), "w") as f:
-            f.write("=== ANÁLISIS TEMPORAL ===\n\n")
-
-            f.write("Estadísticas diarias:\n")
-            for key, value in temporal_results["daily_stats"].items():
-                f.write(f"{key}: {value}\n")
-
-            f.write("\nVentas por día de la semana:\n")
-            for day, stats in temporal_results["day_of_week_sales"].items():
-                f.write(
-                    f"{day}: {stats['num_transactions']} transacciones, {stats['total_products']} productos\n"
-                )
-
-            f.write("\nTop 10 días con más ventas:\n")
-            daily_sales_sorted = sorted(
-                temporal_results["daily_sales"].items(),
-                key=lambda x: x[1]["num_transactions"],
-                reverse=True,
-            )[:10]
-            for date, stats in daily_sales_sorted:
-                f.write(f"{date}: {stats['num_transactions']} transacciones\n")
-
-        # Guardar análisis de clientes (incluyendo clustering K-Means)
-        with open(os.path.join(RESULTS_DIR, "customer_analysis.txt"), "w") as f:
-            f.write("=== ANÁLISIS DE CLIENTES ===\n\n")
-
-            f.write("Frecuencia de compra:\n")
-            for key, value in customer_results["purchase_frequency"].items():
-                f.write(f"{key}: {value}\n")
-
-            if customer_results["time_between_purchases"]:
-                f.write("\nTiempo entre compras:\n")
-                for key, value in customer_results["time_between_purchases"].items():
-                    f.write(f"{key}: {value}\n")
-
-            if "clustering" in customer_results:
-                f.write("\n=== CLUSTERING K-MEANS ===\n\n")
-                f.write(
-                    f"Número de clusters: {customer_results['clustering']['n_clusters']}\n\n"
-                )
-
-                for cluster_name, profile in customer_results["clustering"][
-                    "cluster_profiles"
-                ].items():
-                    f.write(f"\n{cluster_name} (n={profile['size']}):\n")
-                    f.write(f"  Descripción: {profile['description']}\n")
-                    f.write(f"  Frecuencia promedio: {profile['avg_frequency']:.2f}\n")
-                    f.write(
-                        f"  Volumen total promedio: {profile['avg_total_volume']:.2f}\n"
-                    )
-                    f.write(
-                        f"  Productos distintos promedio: {profile['avg_distinct_products']:.2f}\n"
-                    )
-                    f.write(
-                        f"  Diversidad de categorías promedio: {profile['avg_category_diversity']:.2f}\n"
-                    )
-
-        # Guardar análisis de asociación de productos
-        with open(os.path.join(RESULTS_DIR, "product_association.txt"), "w") as f:
-            f.write("=== ANÁLISIS DE ASOCIACIÓN DE PRODUCTOS ===\n\n")
-
-            f.write("Items frecuentes (Top 20):\n")
-            for item, count in association_results["frequent_items"].items():
-                f.write(f"Producto {item}: {count} transacciones\n")
-
-            f.write(f"\nReglas de asociación (Top 20 por lift):\n")
-            for i, rule in enumerate(association_results["top_rules"], 1):
-                f.write(
-                    f"{i}. {rule['antecedent']} -> {rule['consequent']}: "
-                    f"Support={rule['support']:.4f}, "
-                    f"Confidence={rule['confidence']:.4f}, "
-                    f"Lift={rule['lift']:.4f}\n"
-                )
-
-        # Guardar sistema de recomendaciones
-        recommendation_file = context["ti"].xcom_pull(key="recommendation_file")
-        if recommendation_file:
-            recommendation_results = pd.read_pickle(recommendation_file)
-            with open(os.path.join(RESULTS_DIR, "recommendations.txt"), "w") as f:
-                f.write("=== SISTEMA DE RECOMENDACIÓN ===\n\n")
-
-                f.write("RECOMENDACIONES PARA CLIENTES:\n\n")
-                for customer, recs in list(
-                    recommendation_results["customer_recommendations_examples"].items()
-                )[:10]:
-                    f.write(f"\nCliente {customer}:\n")
-                    for i, rec in enumerate(recs[:5], 1):
-                        f.write(
-                            f"  {i}. Producto {rec['product']} "
-                            f"(Score: {rec['score']:.2f}, Lift: {rec['avg_lift']:.2f})\n"
-                        )
-
-                f.write("\n\nRECOMENDACIONES PARA PRODUCTOS:\n\n")
-                for product, recs in list(
-                    recommendation_results["product_recommendations_examples"].items()
-                )[:10]:
-                    f.write(f"\nProducto {product}:\n")
-                    for i, rec in enumerate(recs[:5], 1):
-                        f.write(
-                            f"  {i}. Producto {rec['product']} "
-                            f"(Lift: {rec['lift']:.2f}, Confidence: {rec['confidence']:.2f})\n"
-                        )
-
-        # === INFORME EJECUTIVO CONSOLIDADO ===
-        transactions_file = context["ti"].xcom_pull(key="transactions_file")
-        transactions_df = pd.read_pickle(transactions_file)
-        transactions_df["num_products"] = (
-            transactions_df["products"].str.split().str.len()
+        # Almacén consultable: resultados, tablas y el conjunto completo de reglas
+        rules_file = context["ti"].xcom_pull(key="rules_file")
+        save_run(
+            RESULTS_DB,
+            context["run_id"],
+            results,
+            result_tables(results),
+            rules=pd.read_parquet(rules_file) if rules_file else None,
+            fingerprint=context["ti"].xcom_pull(key="dataset_fingerprint"),
+            min_support=MIN_SUPPORT,
+            min_confidence=MIN_CONFIDENCE,
         )
+        logger.info(f"✓ Results stored in {RESULTS_DB} (run {context['run_id']})")
 
-        with open(
-            os.path.join(RESULTS_DIR, "INFORME_EJECUTIVO.txt"), "w", encoding="utf-8"
-        ) as f:
-            f.write("=" * 80 + "\n")
-            f.write(" " * 20 + "INFORME EJECUTIVO\n")
-            f.write(" " * 10 + "Análisis y Modelado Analítico de Transacciones\n")
-            f.write("=" * 80 + "\n\n")
-
-            # RESUMEN EJECUTIVO
-            f.write("1. RESUMEN EJECUTIVO\n")
-            f.write("-" * 80 + "\n\n")
-
-            total_ventas = transactions_df["num_products"].sum()
-            num_transacciones = len(transactions_df)
-
-            f.write(f"Total de ventas (unidades): {total_ventas:,}\n")
-            f.write(f"Número de transacciones: {num_transacciones:,}\n")
-            f.write(
-                f"Promedio de productos por transacción: {total_ventas/num_transacciones:.2f}\n"
-            )
-            f.write(
-                f"Número de clientes únicos: {transactions_df['customer'].nunique():,}\n"
-            )
-            f.write(f"Número de tiendas: {transactions_df['store'].nunique()}\n\n")
-
-            # Top 10 productos
-            f.write("Top 10 Productos Más Vendidos:\n")
-            for i, (prod, count) in enumerate(
-                list(stats_results["product_frequencies"].items())[:10], 1
-            ):
-                f.write(f"  {i}. Producto {prod}: {count} ventas\n")
-
-            # Top 10 clientes
-            f.write("\nTop 10 Clientes:\n")
-            top_customers = (
-                transactions_df.groupby("customer")
-                .size()
-                .sort_values(ascending=False)
-                .head(10)
-            )
-            for i, (customer, count) in enumerate(top_customers.items(), 1):
-                f.write(f"  {i}. Cliente {customer}: {count} transacciones\n")
-
-            # Días pico
-            f.write("\nTop 5 Días Pico de Compra:\n")
-            daily_sales_sorted = sorted(
-                temporal_results["daily_sales"].items(),
-                key=lambda x: x[1]["num_transactions"],
-                reverse=True,
-            )[:5]
-            for i, (date, stats) in enumerate(daily_sales_sorted, 1):
-                f.write(f"  {i}. {date}: {stats['num_transactions']} transacciones\n")
-
-            # Categorías más rentables
-            f.write("\nTop 5 Categorías por Volumen:\n")
-            for i, (cat, count) in enumerate(
-                list(stats_results["categorical"]["category_counts"].items())[:5], 1
-            ):
-                freq = stats_results["categorical"]["category_frequencies"][cat]
-                f.write(f"  {i}. Categoría {cat}: {count} productos ({freq}%)\n")
-
-            # ANÁLISIS DESCRIPTIVO
-            f.write("\n\n2. ANÁLISIS DESCRIPTIVO\n")
-            f.write("-" * 80 + "\n\n")
-
-            f.write("2.1 Análisis Temporal\n")
-            f.write(
-                "  - Tendencia: Se identificaron patrones de venta diarios y semanales.\n"
-            )
-            f.write(
-                f"  - Promedio de transacciones diarias: {temporal_results['daily_stats']['mean_daily_transactions']:.2f}\n"
-            )
-            f.write(f"  - Día de la semana con más ventas: ")
-            day_sales = temporal_results["day_of_week_sales"]
-            max_day = max(day_sales.items(), key=lambda x: x[1]["num_transactions"])
-            f.write(f"{max_day[0]} ({max_day[1]['num_transactions']} transacciones)\n")
-
-            f.write("\n2.2 Análisis de Clientes\n")
-            f.write(
-                f"  - Frecuencia promedio de compra: {customer_results['purchase_frequency']['mean']:.2f} transacciones\n"
-            )
-            if customer_results["time_between_purchases"]:
-                f.write(
-                    f"  - Tiempo promedio entre compras: {customer_results['time_between_purchases']['mean_days']:.2f} días\n"
-                )
-
-            # ANÁLISIS AVANZADO - CLUSTERING
-            f.write("\n\n3. ANÁLISIS AVANZADO: SEGMENTACIÓN DE CLIENTES (K-MEANS)\n")
-            f.write("-" * 80 + "\n\n")
-
-            if "clustering" in customer_results:
-                f.write("Se aplicó clustering K-Means con 4 grupos basados en:\n")
-                f.write("  - Frecuencia de compra\n")
-                f.write("  - Volumen total de productos\n")
-                f.write("  - Número de productos distintos\n")
-                f.write("  - Diversidad de categorías compradas\n\n")
-
-                for cluster_name, profile in customer_results["clustering"][
-                    "cluster_profiles"
-                ].items():
-                    f.write(
-                        f"{cluster_name} ({profile['size']} clientes, {profile['size']/len(transactions_df['customer'].unique())*100:.1f}%):\n"
-                    )
-                    f.write(f"  {profile['description']}\n")
-                    f.write(f"  - Frecuencia: {profile['avg_frequency']:.2f}\n")
-                    f.write(f"  - Volumen: {profile['avg_total_volume']:.2f}\n")
-                    f.write(
-                        f"  - Productos distintos: {profile['avg_distinct_products']:.2f}\n"
-                    )
-                    f.write(
-                        f"  - Diversidad de categorías: {profile['avg_category_diversity']:.2f}\n\n"
-                    )
-
-            # ANÁLISIS AVANZADO - RECOMENDACIONES
-            f.write("\n4. ANÁLISIS AVANZADO: SISTEMA DE RECOMENDACIÓN\n")
-            f.write("-" * 80 + "\n\n")
-
-            f.write(
-                "Sistema basado en reglas de asociación (Market Basket Analysis):\n"
-            )
-            f.write(
-                f"  - Items frecuentes identificados: {len(association_results['frequent_items'])}\n"
-            )
-            f.write(
-                f"  - Reglas de asociación generadas: {len(association_results['top_rules'])}\n\n"
-            )
-
-            f.write("Ejemplos de recomendaciones:\n")
-            if recommendation_results:
-                # Ejemplo de recomendación para cliente
-                if recommendation_results["customer_recommendations_examples"]:
-                    first_customer = list(
-                        recommendation_results[
-                            "customer_recommendations_examples"
-                        ].keys()
-                    )[0]
-                    recs = recommendation_results["customer_recommendations_examples"][
-                        first_customer
-                    ]
-                    f.write(f"\n  Cliente {first_customer}:\n")
-                    for rec in recs[:3]:
-                        f.write(
-                            f"    → Producto {rec['product']} (relevancia: {rec['score']:.2f})\n"
-                        )
-
-                # Ejemplo de recomendación para producto
-                if recommendation_results["product_recommendations_examples"]:
-                    first_product = list(
-                        recommendation_results[
-                            "product_recommendations_examples"
-                        ].keys()
-                    )[0]
-                    recs = recommendation_results["product_recommendations_examples"][
-                        first_product
-                    ]
-                    f.write(f"\n  Producto {first_product}:\n")
-                    for rec in recs[:3]:
-                        f.write(
-                            f"    → Producto {rec['product']} (lift: {rec['lift']:.2f})\n"
-                        )
-
-            # PRINCIPALES HALLAZGOS
-            f.write("\n\n5. PRINCIPALES HALLAZGOS\n")
-            f.write("-" * 80 + "\n\n")
-
-            f.write(
-                "• Patrones temporales: Existen días específicos con mayor actividad de compra.\n"
-            )
-            f.write(
-                "• Segmentación clara: Se identificaron 4 grupos de clientes con comportamientos distintos.\n"
-            )
-            f.write(
-                "• Productos complementarios: Se detectaron productos que frecuentemente se compran juntos.\n"
-            )
-            f.write(
-                "• Oportunidades de cross-selling: El sistema de recomendación identifica productos relevantes.\n"
-            )
-
-            # RECOMENDACIONES DE NEGOCIO
-            f.write("\n\n6. RECOMENDACIONES DE NEGOCIO\n")
-            f.write("-" * 80 + "\n\n")
-
-            if "clustering" in customer_results:
-                for cluster_name, profile in customer_results["clustering"][
-                    "cluster_profiles"
-                ].items():
-                    f.write(f"\n{cluster_name}:\n")
-                    if "VIP" in cluster_name or "Alto Valor" in cluster_name:
-                        f.write("  - Implementar programa de lealtad premium\n")
-                        f.write("  - Ofrecer descuentos por volumen\n")
-                        f.write("  - Comunicación personalizada prioritaria\n")
-                    elif "Frecuente" in cluster_name:
-                        f.write("  - Incentivar aumento de ticket promedio\n")
-                        f.write("  - Promociones en categorías complementarias\n")
-                        f.write("  - Gamificación para aumentar engagement\n")
-                    elif "Gran Comprador" in cluster_name:
-                        f.write("  - Aumentar frecuencia con recordatorios\n")
-                        f.write("  - Facilitar proceso de recompra\n")
-                        f.write("  - Suscripción o pedidos recurrentes\n")
-                    else:
-                        f.write("  - Campañas de reactivación\n")
-                        f.write("  - Ofertas de entrada atractivas\n")
-                        f.write("  - Comunicación menos frecuente pero relevante\n")
-
-            f.write("\nEstrategias de merchandising:\n")
-            f.write(
-                "  - Colocar productos complementarios cercanos (según reglas de asociación)\n"
-            )
-            f.write("  - Implementar recomendaciones en punto de venta\n")
-            f.write(
-                "  - Diseñar combos basados en productos frecuentemente comprados juntos\n"
-            )
-
-            f.write("\n\n7. CONCLUSIONES\n")
-            f.write("-" * 80 + "\n\n")
-
-            f.write(
-                "El análisis reveló patrones significativos en el comportamiento de compra que pueden\n"
-            )
-            f.write(
-                "ser aprovechados para mejorar la estrategia comercial. La segmentación de clientes\n"
-            )
-            f.write(
-                "permite personalizar la experiencia y maximizar el valor de cada grupo. El sistema\n"
-            )
-            f.write(
-                "de recomendación basado en reglas de asociación ofrece oportunidades claras de\n"
-            )
-            f.write("cross-selling y up-selling.\n\n")
+    except Exception as e:
+        logger.error(f"Error in save_results: {e}")
+        raise
 
-            f.write("=" * 80 + "\n")
-            f.write("Fin del informe\n")
-            f.write("=" * 80 + "\n")
 
-        logger.info("✓ All results saved successfully to files")
+def cleanup_intermediate(**context):
+    """
+    Tarea final: conserva los archivos intermedios de esta ejecución para
+    reutilizarlos en la siguiente y elimina los que ya nadie referencia, y
+    las reglas y tablas de pares de otros datasets o versiones del código.
+    """
+    cleanup_intermediate_files(context["run_id"], keep=True)
+    logger.info("✓ Intermediate files cleaned up")
 
-        # Limpiar archivos intermedios al final
-        run_id = context["run_id"]
-        cleanup_intermediate_files(run_id)
-        logger.info("✓ Intermediate files cleaned up")
+    fingerprint = context["ti"].xcom_pull(key="dataset_fingerprint")
+    if fingerprint:
+        removed, freed = prune_rules(RULES_DIR, fingerprint)
+        logger.info(
+            f"✓ Removed {removed} stale association rule files ({freed / 1e6:.1f} MB)"
+        )
 
-    except Exception as e:
-        logger.error(f"Error in save_results: {e}")
-        raise
+    metrics_file = collect_run_metrics(METRICS_DIR, context["run_id"])
+    if metrics_file:
+        logger.info(f"✓ Run metrics saved to {metrics_file}")
 
 
 # Definición del DAG
@@ -2146,6 +2057,13 @@ with DAG(
     max_active_runs=1,
     dagrun_timeout=timedelta(hours=3),
     tags=["dataset", "analysis", "optimized"],
+    params={
+        "full_refresh": False,
+        "association_backend": "pairs",
+        "profile": False,
+        "review_mode": "auto",
+    },
+    on_failure_callback=cleanup_failed_run,
 ) as dag:
 
     t_setup_pools = PythonOperator(
@@ -2154,11 +2072,27 @@ with DAG(
         execution_timeout=timedelta(minutes=2),
     )
 
+    t_plan_files = PythonOperator(
+        task_id="plan_transaction_files",
+        python_callable=plan_transaction_files,
+        execution_timeout=timedelta(minutes=10),
+        pool="default_pool",
+    )
+
+    # Una tarea por archivo nuevo o modificado (dynamic task mapping)
+    t_ingest_files = PythonOperator.partial(
+        task_id="ingest_transaction_file",
+        python_callable=ingest_transaction_file,
+        execution_timeout=timedelta(minutes=15),
+        pool="default_pool",
+    ).expand(op_kwargs=t_plan_files.output)
+
     t_load = PythonOperator(
         task_id="load_data",
         python_callable=load_data,
         execution_timeout=timedelta(minutes=15),
         pool="default_pool",
+        trigger_rule="none_failed",  # Sin archivos nuevos la etapa mapeada se omite
     )
 
     t_review = PythonOperator(
@@ -2203,6 +2137,35 @@ with DAG(
         pool="default_pool",
     )
 
+    t_category_association = PythonOperator(
+        task_id="category_association",
+        python_callable=category_association_analysis,
+        execution_timeout=timedelta(minutes=10),
+        pool="default_pool",
+    )
+
+    t_plan_partitions = PythonOperator(
+        task_id="plan_rule_partitions",
+        python_callable=plan_rule_partitions,
+        execution_timeout=timedelta(minutes=5),
+        pool="default_pool",
+    )
+
+    # Una tarea por tienda y por mes (dynamic task mapping)
+    t_mine_partitions = PythonOperator.partial(
+        task_id="mine_partition_rules",
+        python_callable=mine_partition_rules,
+        execution_timeout=timedelta(minutes=15),
+        pool="default_pool",
+    ).expand(op_kwargs=t_plan_partitions.output)
+
+    t_rule_drift = PythonOperator(
+        task_id="rule_drift_analysis",
+        python_callable=rule_drift_analysis,
+        execution_timeout=timedelta(minutes=10),
+        pool="default_pool",
+    )
+
     t_generate_plots = PythonOperator(
         task_id="generate_plots",
         python_callable=generate_plots,
@@ -2217,8 +2180,20 @@ with DAG(
         pool="default_pool",
     )
 
+    t_cleanup = PythonOperator(
+        task_id="cleanup_intermediate",
+        python_callable=cleanup_intermediate,
+        execution_timeout=timedelta(minutes=10),
+        pool="default_pool",
+    )
+
     # Definir flujo de tareas
-    t_setup_pools >> t_load >> t_review >> t_stats
-    t_stats >> [t_temporal, t_customer, t_association]
+    t_setup_pools >> t_plan_files >> t_ingest_files >> t_load >> t_review >> t_stats
+    t_stats >> [t_temporal, t_customer, t_association, t_plan_partitions]
+    t_stats >> t_category_association >> t_save
     t_association >> t_recommendation
+    t_plan_partitions >> t_mine_partitions
+    [t_association, t_mine_partitions] >> t_rule_drift
     [t_temporal, t_customer, t_recommendation] >> t_generate_plots >> t_save
+    t_rule_drift >> t_save
+    t_save >> t_cleanup
@@ -0,0 +1,7 @@
+"""
+Módulos de apoyo del pipeline de análisis de transacciones.
+
+Contiene la lógica reutilizable por las tareas de `dataset_analysis_dag`
+(y por la aplicación Streamlit) para que el archivo del DAG se limite a
+orquestar la carga de datos, el cálculo de resultados y su persistencia.
+"""
@@ -0,0 +1,80 @@
+"""
+Agregados parciales por archivo de transacciones y su combinación.
+
+Cada partición del almacén guarda sus propios agregados (ventas por fecha,
+semana, mes y día de la semana, totales por cliente y pares cliente-producto).
+Los agregados del dataset completo se obtienen combinando los parciales, de
+modo que un archivo nuevo solo aporta su delta en vez de recalcular todo.
+"""
+
+import numpy as np
+import pandas as pd
+
+SALES_GROUPINGS = {
+    "daily_sales": ["date"],
+    "weekly_sales": ["year", "week"],
+    "monthly_sales": ["year", "month"],
+    "day_of_week_sales": ["day_name"],
+}
+
+
+def _sales(transactions_df, keys):
+    return (
+        transactions_df.groupby(keys)
+        .agg({"customer": "count", "num_products": "sum"})
+        .rename(
+            columns={
+                "customer": "num_transactions",
+                "num_products": "total_products",
+            }
+        )
+    )
+
+
+def partial_aggregates(transactions_df, baskets):
+    """
+    Agregados sumables de un bloque de transacciones.
+    """
+    transactions_df = transactions_df.assign(num_products=baskets["basket_lengths"])
+
+    aggregates = {
+        name: _sales(transactions_df, keys) for name, keys in SALES_GROUPINGS.items()
+    }
+
+    aggregates["customer_totals"] = (
+        transactions_df.groupby("customer")
+        .agg({"date": "count", "num_products": "sum"})
+        .rename(columns={"date": "frequency", "num_products": "total_volume"})
+    )
+
+    # Pares (cliente, producto) distintos: base para productos y categorías distintas
+    aggregates["customer_products"] = pd.DataFrame(
+        {
+            "customer": np.repeat(
+                transactions_df["customer"].to_numpy(), baskets["basket_lengths"]
+            ),
+            "product_id": baskets["product_ids"],
+        }
+    ).drop_duplicates(ignore_index=True)
+
+    return aggregates
+
+
+def _sum_frames(frames):
+    merged = pd.concat(frames)
+    levels = list(range(merged.index.nlevels))
+    return merged.groupby(level=levels if len(levels) > 1 else 0).sum()
+
+
+def merge_aggregates(partials):
+    """
+    Combina agregados parciales en los del conjunto completo.
+    """
+    merged = {
+        name: _sum_frames([p[name] for p in partials])
+        for name in [*SALES_GROUPINGS, "customer_totals"]
+    }
+    merged["customer_products"] = pd.concat(
+        [p["customer_products"] for p in partials], ignore_index=True
+    ).drop_duplicates(ignore_index=True)
+    return merged
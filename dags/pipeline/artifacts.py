@@ -0,0 +1,138 @@
+"""
+Almacén de artefactos intermedios direccionado por contenido.
+
+Cada artefacto se guarda en `objects/` con un nombre derivado del hash de sus
+entradas (`<key>_<filename>`), de modo que ejecuciones con las mismas entradas
+comparten el mismo archivo en lugar de escribir una copia por run_id.
+
+Referencias: cada ejecución marca los artefactos que usa con un archivo vacío
+en `refs/<run_id>/`. El número de referencias de un artefacto es el número de
+directorios de `refs/` que lo contienen. Al terminar, la ejecución suelta sus
+referencias (y, si terminó bien, las fija en `refs/latest/` para que la
+siguiente ejecución pueda reutilizarlas); `collect_garbage` elimina los
+artefactos sin referencias.
+"""
+
+import hashlib
+import inspect
+import os
+import shutil
+import time
+import uuid
+
+# Incrementar cuando cambie el formato de los artefactos intermedios
+ARTIFACT_VERSION = 2
+
+LATEST_REF = "latest"
+
+# Temporales de escritura más antiguos que esto se consideran abandonados
+STALE_TMP_SECONDS = 3600
+
+
+def artifact_key(filename, inputs):
+    """
+    Hash de un artefacto a partir de su nombre y de sus entradas.
+    Las entradas que son paths de otros artefactos aportan su nombre
+    (que ya incluye su propio hash).
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{ARTIFACT_VERSION}:{filename}".encode())
+    for value in inputs:
+        if isinstance(value, str) and os.path.isabs(value):
+            value = os.path.basename(value)
+        digest.update(b"\0")
+        digest.update(str(value).encode())
+    return digest.hexdigest()
+
+
+def code_version(*objects):
+    """
+    Versión del código de una tarea: hash del código fuente de las funciones
+    o módulos indicados. Se usa como entrada de los artefactos para que un
+    cambio de código invalide los resultados guardados.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+def artifact_path(store_dir, filename, inputs):
+    objects_dir = os.path.join(store_dir, "objects")
+    os.makedirs(objects_dir, exist_ok=True)
+    return os.path.join(objects_dir, f"{artifact_key(filename, inputs)}_{filename}")
+
+
+def add_reference(store_dir, run_id, path):
+    refs_dir = os.path.join(store_dir, "refs", run_id)
+    os.makedirs(refs_dir, exist_ok=True)
+    open(os.path.join(refs_dir, os.path.basename(path)), "a").close()
+
+
+def write_artifact(path, writer):
+    """
+    Escribe un artefacto de forma atómica: `writer(tmp_path)` y luego rename,
+    para que un fallo a mitad de escritura no deje un artefacto incompleto.
+    """
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}-{filename}")
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def reference_counts(store_dir):
+    """
+    Número de ejecuciones (incluida `latest`) que referencian cada artefacto.
+    """
+    counts = {}
+    refs_root = os.path.join(store_dir, "refs")
+    if not os.path.isdir(refs_root):
+        return counts
+    for run_ref in os.listdir(refs_root):
+        for filename in os.listdir(os.path.join(refs_root, run_ref)):
+            counts[filename] = counts.get(filename, 0) + 1
+    return counts
+
+
+def release_run(store_dir, run_id, pin=False):
+    """
+    Suelta las referencias de una ejecución. Con `pin=True` pasan a ser las
+    referencias de `latest` (sustituyendo a las anteriores).
+    """
+    run_refs = os.path.join(store_dir, "refs", run_id)
+    if not os.path.isdir(run_refs):
+        return
+    if pin:
+        latest_refs = os.path.join(store_dir, "refs", LATEST_REF)
+        shutil.rmtree(latest_refs, ignore_errors=True)
+        os.replace(run_refs, latest_refs)
+    else:
+        shutil.rmtree(run_refs, ignore_errors=True)
+
+
+def collect_garbage(store_dir):
+    """
+    Elimina los artefactos sin referencias. Devuelve (archivos, bytes) liberados.
+    """
+    objects_dir = os.path.join(store_dir, "objects")
+    if not os.path.isdir(objects_dir):
+        return 0, 0
+    counts = reference_counts(store_dir)
+    removed, freed = 0, 0
+    now = time.time()
+    for filename in os.listdir(objects_dir):
+        path = os.path.join(objects_dir, filename)
+        if filename.startswith(".tmp-"):
+            # Escritura en curso (o abandonada por un proceso terminado)
+            if now - os.path.getmtime(path) < STALE_TMP_SECONDS:
+                continue
+        elif counts.get(filename, 0) > 0:
+            continue
+        freed += os.path.getsize(path)
+        os.remove(path)
+        removed += 1
+    return removed, freed
@@ -0,0 +1,145 @@
+"""
+Índice vertical de transacciones en bitsets (estilo Eclat).
+
+Para cada producto frecuente se guarda un bitset con las transacciones que lo
+contienen (`tid-bitset`, palabras uint64: el bit t de la fila del item indica
+que la transacción t lo contiene). El soporte de un par o de un trío es el
+número de bits encendidos de la intersección (AND) de sus bitsets, que se
+calcula con operaciones vectorizadas sobre todas las parejas a la vez.
+
+Es un backend alternativo a `pipeline.rules.pair_count_table`: produce la
+misma tabla de pares, por lo que las reglas se obtienen igualmente con
+`rules_from_pair_table`.
+"""
+
+import numpy as np
+
+from pipeline.rules import BASE_SUPPORT, distinct_basket_items
+
+# Bits encendidos de cada byte (para numpy sin `np.bitwise_count`)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Palabras uint64 procesadas por bloque en las consultas de soporte
+QUERY_CHUNK_WORDS = 1 << 24
+
+
+def popcount(words, axis=-1):
+    """
+    Número de bits encendidos de un array uint64, sumado sobre `axis`.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=axis, dtype=np.int64)
+    counts = _POPCOUNT_TABLE[words.view(np.uint8)]
+    shape = words.shape + (8,)
+    return counts.reshape(shape).sum(axis=(axis if axis >= 0 else axis - 1, -1))
+
+
+def build_tid_index(baskets, min_support=BASE_SUPPORT):
+    """
+    Bitsets de transacciones de los productos con soporte >= min_support.
+
+    Devuelve un dict con items (productos del índice, ordenados), bits
+    (matriz uint64 items × palabras), all_items / all_item_counts (conteos
+    de todos los productos) y num_transactions.
+    """
+    num_transactions = len(baskets["basket_lengths"])
+    basket_index, product_ids = distinct_basket_items(baskets)
+    counts = np.bincount(product_ids)
+    all_items = np.flatnonzero(counts)
+
+    items = np.flatnonzero(counts / num_transactions >= min_support)
+    dense = np.full(len(counts), -1, dtype=np.int64)
+    dense[items] = np.arange(len(items))
+    item_dense = dense[product_ids]
+    frequent = item_dense >= 0
+    item_dense, basket_index = item_dense[frequent], basket_index[frequent]
+
+    # Agrupar por (item, palabra) y combinar los bits de cada grupo con OR
+    n_words = (num_transactions + 63) // 64
+    cells = item_dense * n_words + basket_index // 64
+    order = np.argsort(cells, kind="stable")
+    cells = cells[order]
+    values = np.left_shift(
+        np.uint64(1), (basket_index[order] % 64).astype(np.uint64)
+    )
+    bits = np.zeros(len(items) * n_words, dtype=np.uint64)
+    if len(cells):
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+        bits[cells[starts]] = np.bitwise_or.reduceat(values, starts)
+
+    return {
+        "items": items.astype(np.int32),
+        "bits": bits.reshape(len(items), n_words),
+        "all_items": all_items.astype(np.int32),
+        "all_item_counts": counts[all_items],
+        "num_transactions": np.int64(num_transactions),
+    }
+
+
+def _item_rows(index, item_ids):
+    rows = np.searchsorted(index["items"], item_ids)
+    rows = np.minimum(rows, len(index["items"]) - 1)
+    if len(rows) and not (index["items"][rows] == item_ids).all():
+        raise ValueError("Items not present in the tid-bitset index")
+    return rows
+
+
+def itemset_support(index, itemsets):
+    """
+    Número de transacciones que contienen cada itemset (array k columnas de
+    ids de producto, p. ej. pares o tríos), por AND y popcount de sus bitsets.
+    """
+    itemsets = np.atleast_2d(np.asarray(itemsets))
+    rows = _item_rows(index, itemsets.ravel()).reshape(itemsets.shape)
+    bits = index["bits"]
+    chunk = max(1, QUERY_CHUNK_WORDS // max(bits.shape[1], 1))
+    support = np.empty(len(rows), dtype=np.int64)
+    for lo in range(0, len(rows), chunk):
+        block = rows[lo : lo + chunk]
+        intersection = bits[block[:, 0]]
+        for column in range(1, block.shape[1]):
+            intersection = intersection & bits[block[:, column]]
+        support[lo : lo + chunk] = popcount(intersection)
+    return support
+
+
+def pair_supports(index):
+    """
+    Soporte (conteo) de todos los pares de items del índice, a < b.
+    Cada item se cruza a la vez con todos los siguientes.
+    Devuelve (pair_a, pair_b, pair_counts) con ids de producto.
+    """
+    items, bits = index["items"], index["bits"]
+    pair_a, pair_b, pair_counts = [], [], []
+    for row in range(len(items) - 1):
+        counts = popcount(bits[row + 1 :] & bits[row])
+        pair_a.append(np.full(len(counts), items[row], dtype=np.int32))
+        pair_b.append(items[row + 1 :])
+        pair_counts.append(counts)
+    if not pair_counts:
+        empty = np.array([], dtype=np.int32)
+        return empty, empty, np.array([], dtype=np.int64)
+    return (
+        np.concatenate(pair_a),
+        np.concatenate(pair_b),
+        np.concatenate(pair_counts),
+    )
+
+
+def bitset_pair_count_table(baskets, base_support=BASE_SUPPORT):
+    """
+    Misma tabla que `pair_count_table`, calculada con el índice de bitsets.
+    """
+    index = build_tid_index(baskets, base_support)
+    num_transactions = int(index["num_transactions"])
+    pair_a, pair_b, pair_counts = pair_supports(index)
+    keep = pair_counts / num_transactions >= base_support
+    return {
+        "items": index["all_items"],
+        "item_counts": index["all_item_counts"],
+        "pair_a": pair_a[keep],
+        "pair_b": pair_b[keep],
+        "pair_counts": pair_counts[keep],
+        "num_transactions": np.int64(num_transactions),
+        "base_support": np.float64(base_support),
+    }
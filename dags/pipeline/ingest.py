@@ -0,0 +1,278 @@
+"""
+Ingesta incremental de los archivos de Transactions.
+
+Cada CSV se parsea una sola vez y se guarda como una partición del almacén
+columnar (`TRANSACTIONS_STORE_DIR`), identificada por el hash de su contenido:
+
+  - `<sha256>_v<N>.parquet`: transacciones ya procesadas (fecha y variables temporales)
+  - `<sha256>_v<N>_baskets.npz`: canastas codificadas (ver `pipeline.kernels`)
+  - `<sha256>_v<N>_sketches.pkl`: sketches combinables (ver `pipeline.sketches`)
+  - `<sha256>_v<N>_aggregates.pkl`: agregados parciales (ver `pipeline.aggregates`)
+
+`N` es `PARTITION_VERSION`: al cambiar el formato, las particiones antiguas
+dejan de encontrarse y se vuelven a ingerir (y `prune_partitions` las borra).
+
+El manifiesto (`manifest.json`) registra path, tamaño, mtime y hash de cada
+archivo ingerido. En cada ejecución solo se parsean los archivos nuevos o
+modificados; el resto se reutiliza desde el almacén.
+
+Los archivos que no pasan la validación quedan en cuarentena
+(`rejected/<hash del path>.json`, con su tamaño, mtime y el error): no se
+vuelven a considerar pendientes hasta que cambian.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from pipeline.aggregates import partial_aggregates
+from pipeline.kernels import encode_transactions, load_baskets, save_baskets
+from pipeline.sketches import partial_sketches
+
+MANIFEST_FILENAME = "manifest.json"
+
+REJECTED_DIRNAME = "rejected"
+
+TRANSACTION_COLUMNS = ["date", "store", "customer", "products"]
+
+# Incrementar cuando cambie el formato de las particiones
+PARTITION_VERSION = 3
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _unchanged(entry, stat):
+    """
+    True si `stat` tiene el mismo tamaño y mtime que `entry`.
+    """
+    return (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime_ns"] == stat.st_mtime_ns
+    )
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Huella de un archivo: tamaño, mtime y hash del contenido.
+    Si tamaño y mtime coinciden con la entrada previa del manifiesto se
+    reutiliza su hash para no volver a leer el archivo.
+    """
+    stat = os.stat(path)
+    entry = {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if _unchanged(previous, stat):
+        entry["sha256"] = previous["sha256"]
+    else:
+        entry["sha256"] = file_sha256(path)
+    return entry
+
+
+def load_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(store_dir, manifest):
+    path = os.path.join(store_dir, MANIFEST_FILENAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _rejected_path(store_dir, path):
+    name = hashlib.sha256(path.encode()).hexdigest()
+    return os.path.join(store_dir, REJECTED_DIRNAME, f"{name}.json")
+
+
+def reject_file(store_dir, entry, error):
+    """
+    Pone en cuarentena un archivo inválido (entrada de `file_fingerprint`).
+    """
+    path = _rejected_path(store_dir, entry["path"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({**entry, "error": str(error)}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_rejected(store_dir):
+    """
+    {path: entrada} de los archivos en cuarentena.
+    """
+    rejected = {}
+    for path in glob.glob(os.path.join(store_dir, REJECTED_DIRNAME, "*.json")):
+        with open(path) as f:
+            entry = json.load(f)
+        rejected[entry["path"]] = entry
+    return rejected
+
+
+def prune_rejected(store_dir):
+    """
+    Saca de la cuarentena los archivos que ya no existen o que cambiaron.
+    Devuelve sus paths.
+    """
+    released = []
+    for path, entry in load_rejected(store_dir).items():
+        if not os.path.exists(path) or not _unchanged(entry, os.stat(path)):
+            os.remove(_rejected_path(store_dir, path))
+            released.append(path)
+    return released
+
+
+def partition_paths(store_dir, sha256):
+    prefix = os.path.join(store_dir, f"{sha256}_v{PARTITION_VERSION}")
+    return {
+        "transactions": f"{prefix}.parquet",
+        "baskets": f"{prefix}_baskets.npz",
+        "sketches": f"{prefix}_sketches.pkl",
+        "aggregates": f"{prefix}_aggregates.pkl",
+    }
+
+
+def partition_exists(store_dir, sha256):
+    return all(os.path.exists(p) for p in partition_paths(store_dir, sha256).values())
+
+
+def pending_files(directory, store_dir, pattern="*.csv", settle_seconds=0):
+    """
+    Archivos nuevos o modificados respecto al manifiesto, comparando solo
+    tamaño y mtime (sin leer contenido). Se ignoran los archivos modificados
+    hace menos de `settle_seconds` por si aún se están copiando y los que
+    siguen en cuarentena sin cambios.
+    """
+    previous_files = load_manifest(store_dir)["files"]
+    rejected = load_rejected(store_dir)
+    now = time.time()
+    pending = []
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        stat = os.stat(path)
+        if now - stat.st_mtime < settle_seconds:
+            continue
+        if _unchanged(previous_files.get(path), stat):
+            continue
+        if _unchanged(rejected.get(path), stat):
+            continue
+        pending.append(path)
+    return pending
+
+
+def validate_transactions(transactions_df, path):
+    """
+    Validaciones básicas de un archivo de Transactions recién leído.
+    """
+    if transactions_df.empty:
+        raise ValueError(f"{path}: file has no transactions")
+    null_counts = transactions_df[TRANSACTION_COLUMNS].isnull().sum()
+    if null_counts.any():
+        raise ValueError(
+            f"{path}: missing values in {null_counts[null_counts > 0].to_dict()}"
+        )
+
+
+def read_transactions_file(path):
+    """
+    Lee y valida un CSV de Transactions y crea las variables temporales.
+    """
+    transactions_df = pd.read_csv(
+        path,
+        sep="|",
+        header=None,
+        names=TRANSACTION_COLUMNS,
+    )
+    validate_transactions(transactions_df, path)
+
+    transactions_df["date"] = pd.to_datetime(transactions_df["date"])
+    transactions_df["year"] = transactions_df["date"].dt.year
+    transactions_df["month"] = transactions_df["date"].dt.month
+    transactions_df["week"] = transactions_df["date"].dt.isocalendar().week
+    transactions_df["day_of_week"] = transactions_df["date"].dt.dayofweek
+    transactions_df["day_name"] = transactions_df["date"].dt.day_name()
+
+    # store y customer son IDs, no variables numéricas continuas
+    transactions_df["store"] = transactions_df["store"].astype(str)
+    transactions_df["customer"] = transactions_df["customer"].astype(str)
+    return transactions_df
+
+
+def write_partition(store_dir, sha256, transactions_df):
+    """
+    Guarda transacciones, canastas codificadas, sketches y agregados parciales
+    de un archivo.
+    """
+    paths = partition_paths(store_dir, sha256)
+    baskets = encode_transactions(transactions_df)
+    transactions_df.to_parquet(paths["transactions"], index=False)
+    save_baskets(paths["baskets"], baskets)
+    pd.to_pickle(partial_sketches(transactions_df, baskets), paths["sketches"])
+    # Los agregados se escriben al final: su presencia marca la partición completa
+    pd.to_pickle(partial_aggregates(transactions_df, baskets), paths["aggregates"])
+
+
+def read_partition(store_dir, sha256):
+    paths = partition_paths(store_dir, sha256)
+    return (
+        pd.read_parquet(paths["transactions"]),
+        load_baskets(paths["baskets"]),
+        pd.read_pickle(paths["aggregates"]),
+    )
+
+
+def read_partition_sketches(store_dir, sha256):
+    return pd.read_pickle(partition_paths(store_dir, sha256)["sketches"])
+
+
+def plan_ingest(files, manifest, store_dir, full_refresh=False, rejected=None):
+    """
+    Compara los archivos actuales con el manifiesto.
+    Devuelve (entries, changed): las entradas del nuevo manifiesto, en el
+    mismo orden que `files`, y los paths que hay que (re)parsear. Los archivos
+    de `rejected` (ver `load_rejected`) sin cambios se omiten, salvo con
+    `full_refresh`.
+    """
+    previous_files = {} if full_refresh else manifest.get("files", {})
+    rejected = {} if full_refresh else (rejected or {})
+    entries = []
+    changed = []
+    for path in files:
+        if path in rejected and _unchanged(rejected[path], os.stat(path)):
+            continue
+        entry = file_fingerprint(path, previous_files.get(path))
+        entries.append(entry)
+        if full_refresh or not partition_exists(store_dir, entry["sha256"]):
+            changed.append(path)
+    return entries, changed
+
+
+def prune_partitions(store_dir, entries):
+    """
+    Elimina particiones que ya no corresponden a ningún archivo del manifiesto
+    (o que tienen un formato anterior).
+    """
+    keep = {MANIFEST_FILENAME, REJECTED_DIRNAME}
+    for entry in entries:
+        keep.update(
+            os.path.basename(path)
+            for path in partition_paths(store_dir, entry["sha256"]).values()
+        )
+    removed = []
+    for filename in os.listdir(store_dir):
+        if filename not in keep:
+            os.remove(os.path.join(store_dir, filename))
+            removed.append(filename)
+    return removed
@@ -0,0 +1,374 @@
+"""
+Kernels vectorizados sobre canastas codificadas como enteros.
+
+Las canastas se guardan en formato CSR: `product_ids` (int32) contiene los
+productos de todas las transacciones concatenados y `basket_lengths` el número
+de productos de cada transacción. El id codificado de un producto es su código
+numérico, por lo que los conteos se obtienen con `np.bincount` sin diccionarios.
+
+Este módulo solo depende de numpy/pandas para poder usarse tanto en el DAG
+como en la aplicación Streamlit.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Valor para productos sin categoría conocida
+CATEGORY_SENTINEL = -1
+
+
+def encode_baskets(products):
+    """
+    Convierte la columna `products` ("20 3 1") en arrays enteros.
+    Devuelve (product_ids int32, basket_lengths int32).
+    """
+    basket_lengths = products.str.split().str.len().to_numpy(dtype=np.int32)
+    product_ids = np.fromstring(" ".join(products), dtype=np.int64, sep=" ")
+    if len(product_ids) != basket_lengths.sum():
+        raise ValueError("Product lists contain non-numeric product codes")
+    return product_ids.astype(np.int32), basket_lengths
+
+
+def encode_transactions(transactions_df):
+    """
+    Codifica las canastas, la tienda y el mes (AAAAMM) de cada transacción.
+    """
+    product_ids, basket_lengths = encode_baskets(transactions_df["products"])
+    store_index, stores = pd.factorize(transactions_df["store"], sort=True)
+    dates = transactions_df["date"]
+    month_index, months = pd.factorize(
+        dates.dt.year * 100 + dates.dt.month, sort=True
+    )
+    return {
+        "product_ids": product_ids,
+        "basket_lengths": basket_lengths,
+        "store_index": store_index.astype(np.int16),
+        "stores": np.asarray(stores, dtype=str),
+        "month_index": month_index.astype(np.int16),
+        "months": np.asarray(months, dtype=np.int32),
+    }
+
+
+def _concat_labels(parts, index_key, labels_key):
+    # Re-indexa las etiquetas de cada parte sobre su unión ordenada
+    labels = np.unique(np.concatenate([part[labels_key] for part in parts]))
+    index = [
+        np.searchsorted(labels, part[labels_key])[part[index_key]] for part in parts
+    ]
+    return np.concatenate(index).astype(np.int16), labels
+
+
+def concat_baskets(parts):
+    """
+    Une canastas codificadas por separado (p. ej. una por archivo),
+    re-indexando tiendas y meses sobre el conjunto ordenado de todos ellos.
+    """
+    store_index, stores = _concat_labels(parts, "store_index", "stores")
+    month_index, months = _concat_labels(parts, "month_index", "months")
+    return {
+        "product_ids": np.concatenate([part["product_ids"] for part in parts]),
+        "basket_lengths": np.concatenate([part["basket_lengths"] for part in parts]),
+        "store_index": store_index,
+        "stores": stores,
+        "month_index": month_index,
+        "months": months,
+    }
+
+
+def select_baskets(baskets, mask):
+    """
+    Subconjunto de canastas (`mask` booleana por transacción), sin re-codificar.
+    """
+    return {
+        "product_ids": baskets["product_ids"][
+            np.repeat(mask, baskets["basket_lengths"])
+        ],
+        "basket_lengths": baskets["basket_lengths"][mask],
+    }
+
+
+def save_baskets(path, baskets):
+    np.savez(path, **baskets)
+
+
+def load_baskets(path, keys=None):
+    # Con `keys` solo se leen esos arrays del .npz
+    with np.load(path) as data:
+        return {key: data[key] for key in keys or data.files}
+
+
+def build_category_lookup(product_category_df):
+    """
+    Array denso int16 producto -> categoría, indexado por id codificado
+    (CATEGORY_SENTINEL si el producto no tiene categoría).
+    Si un producto aparece varias veces se conserva la última categoría,
+    igual que `set_index(...).to_dict()`.
+    """
+    mapping = pd.DataFrame(
+        {
+            "product_code": pd.to_numeric(
+                product_category_df["product_code"], errors="coerce"
+            ),
+            "category_id": pd.to_numeric(
+                product_category_df["category_id"], errors="coerce"
+            ),
+        }
+    ).dropna()
+    mapping = mapping.drop_duplicates("product_code", keep="last")
+    codes = mapping["product_code"].to_numpy(dtype=np.int64)
+    lookup = np.full(codes.max() + 1, CATEGORY_SENTINEL, dtype=np.int16)
+    lookup[codes] = mapping["category_id"].to_numpy(dtype=np.int16)
+    return lookup
+
+
+def save_category_lookup(path, lookup):
+    np.save(path, lookup)
+
+
+def load_category_lookup(path):
+    return np.load(path)
+
+
+def with_sources(arrays, **sources):
+    """
+    Copia de `arrays` con las huellas (cadenas) de sus datos de origen, para
+    publicar archivos que otro proceso solo debe reutilizar si coinciden.
+    """
+    return {**arrays, **{key: np.array(value) for key, value in sources.items()}}
+
+
+def matches_sources(arrays, **sources):
+    """
+    True si `arrays` se publicó con `with_sources` y estas mismas huellas.
+    """
+    return all(
+        key in arrays and str(arrays[key]) == value for key, value in sources.items()
+    )
+
+
+def publish_category_lookup(path, lookup, product_category_sha256):
+    np.savez(
+        path,
+        **with_sources(
+            {"lookup": lookup}, product_category_sha256=product_category_sha256
+        ),
+    )
+
+
+def load_published_category_lookup(path, product_category_sha256):
+    """
+    Lookup publicado con `publish_category_lookup`, o None si se construyó a
+    partir de otro ProductCategory.
+    """
+    with np.load(path) as data:
+        published = {key: data[key] for key in data.files}
+    if not matches_sources(published, product_category_sha256=product_category_sha256):
+        return None
+    return published["lookup"]
+
+
+def categories_of(product_ids, category_lookup):
+    """
+    Categoría de cada id de producto en una sola operación de indexado.
+    Los ids fuera del rango del lookup devuelven CATEGORY_SENTINEL.
+    """
+    product_ids = np.asarray(product_ids)
+    categories = np.full(product_ids.shape, CATEGORY_SENTINEL, dtype=np.int16)
+    in_range = (product_ids >= 0) & (product_ids < len(category_lookup))
+    categories[in_range] = category_lookup[product_ids[in_range]]
+    return categories
+
+
+def product_category_frequencies(baskets, category_lookup):
+    """
+    Conteos de productos, categorías y tienda × categoría en una pasada.
+
+    Devuelve un dict con:
+      - product_ids / product_counts: productos vendidos ordenados por ventas
+      - category_counts: unidades por id de categoría (índice = category_id)
+      - store_category_counts: matriz tiendas × categorías
+      - stores, num_transactions
+    """
+    product_ids = baskets["product_ids"]
+    counts = np.bincount(product_ids)
+    sold = np.flatnonzero(counts)
+    order = np.argsort(-counts[sold], kind="stable")
+
+    categories = categories_of(product_ids, category_lookup)
+    known = categories != CATEGORY_SENTINEL
+
+    n_stores = len(baskets["stores"])
+    n_categories = int(category_lookup.max()) + 1
+    item_store = np.repeat(baskets["store_index"], baskets["basket_lengths"])
+    cells = item_store[known].astype(np.int64) * n_categories + categories[known]
+    store_category_counts = np.bincount(
+        cells, minlength=n_stores * n_categories
+    ).reshape(n_stores, n_categories)
+
+    return {
+        "product_ids": sold[order].astype(np.int32),
+        "product_counts": counts[sold][order],
+        "category_counts": store_category_counts.sum(axis=0),
+        "store_category_counts": store_category_counts,
+        "stores": baskets["stores"],
+        "num_transactions": np.int64(len(baskets["basket_lengths"])),
+    }
+
+
+def save_frequencies(path, frequencies):
+    np.savez(path, **frequencies)
+
+
+def load_frequencies(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def top_products(frequencies, n=10):
+    """
+    Lista [(código de producto, ventas)] de los n productos más vendidos.
+    """
+    return [
+        (str(product), int(count))
+        for product, count in zip(
+            frequencies["product_ids"][:n], frequencies["product_counts"][:n]
+        )
+    ]
+
+
+def distinct_categories_per_group(group_index, n_groups, product_ids, category_lookup):
+    """
+    Número de categorías distintas por grupo (p. ej. por cliente).
+    `group_index` indica el grupo de cada producto de `product_ids`.
+    """
+    categories = categories_of(product_ids, category_lookup)
+    known = categories != CATEGORY_SENTINEL
+    n_categories = int(category_lookup.max()) + 1
+    pairs = np.unique(
+        group_index[known].astype(np.int64) * n_categories + categories[known]
+    )
+    return np.bincount(pairs // n_categories, minlength=n_groups)
+
+
+def category_basket_bits(baskets, category_lookup):
+    """
+    Conjunto de categorías de cada canasta empaquetado en bits: una fila de
+    palabras uint64 por transacción (bit c encendido si la canasta contiene
+    algún producto de la categoría c).
+    """
+    lengths = baskets["basket_lengths"]
+    n_categories = int(category_lookup.max()) + 1
+    n_words = (n_categories + 63) // 64
+    bits = np.zeros((len(lengths), n_words), dtype=np.uint64)
+
+    categories = categories_of(baskets["product_ids"], category_lookup)
+    known = categories != CATEGORY_SENTINEL
+    word = categories // 64
+    bit = np.left_shift(np.uint64(1), (categories % 64).astype(np.uint64))
+
+    # OR de los bits de los productos de cada canasta (formato CSR)
+    nonempty = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    for w in range(n_words):
+        values = np.where(known & (word == w), bit, np.uint64(0))
+        if len(values):
+            bits[nonempty, w] = np.bitwise_or.reduceat(values, starts)
+    return bits
+
+
+def category_cooccurrence(baskets, category_lookup):
+    """
+    Matriz densa categorías × categorías con el número de canastas que
+    contienen ambas categorías (la diagonal es el número de canastas de cada
+    categoría). Las canastas con el mismo conjunto de categorías se agrupan
+    antes de desempaquetar los bits, así que el coste depende del número de
+    conjuntos distintos y no del de transacciones.
+    """
+    n_categories = int(category_lookup.max()) + 1
+    bits = category_basket_bits(baskets, category_lookup)
+    unique_bits, counts = np.unique(bits, axis=0, return_counts=True)
+    presence = np.unpackbits(
+        unique_bits.astype("<u8").view(np.uint8), axis=1, bitorder="little"
+    )[:, :n_categories].astype(np.int64)
+    return {
+        "matrix": presence.T @ (presence * counts[:, None]),
+        "num_transactions": np.int64(len(baskets["basket_lengths"])),
+    }
+
+
+def save_cooccurrence(path, cooccurrence):
+    np.savez(path, **cooccurrence)
+
+
+def load_cooccurrence(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def category_volume(frequencies):
+    """
+    Series categoría -> unidades vendidas, ordenada de mayor a menor.
+    """
+    counts = pd.Series(frequencies["category_counts"])
+    counts = counts[counts > 0]
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def histogram_quantiles(histogram, quantiles):
+    """
+    Cuantiles de los valores enteros 0..len(histogram)-1 con `histogram[v]`
+    apariciones cada uno, con la interpolación lineal de `np.quantile` (la
+    de pandas por defecto), sin expandir los valores.
+    """
+    cumulative = np.cumsum(histogram)
+    total = int(cumulative[-1]) if len(cumulative) else 0
+    if total == 0:
+        return [float("nan")] * len(quantiles)
+    positions = np.asarray(quantiles, dtype=float) * (total - 1)
+    lower = np.floor(positions)
+    # Valor en la posición k (0-based) de los datos ordenados
+    lower_values = np.searchsorted(cumulative, lower, side="right")
+    upper_values = np.searchsorted(cumulative, np.ceil(positions), side="right")
+    values = lower_values + (upper_values - lower_values) * (positions - lower)
+    return values.astype(float).tolist()
+
+
+def histogram_summary(histogram, percentiles=(0.25, 0.5, 0.75)):
+    """
+    Estadísticas de valores enteros a partir de su histograma (`np.bincount`),
+    sin expandir los valores:
+      - describe: las de `Series.describe` (mismas claves)
+      - mode: valores más frecuentes (como `Series.mode`)
+      - outliers: valores fuera de [Q1 - 1.5 IQR, Q3 + 1.5 IQR]
+    """
+    histogram = np.asarray(histogram, dtype=np.int64)
+    values = np.flatnonzero(histogram)
+    counts = histogram[values]
+    n = int(counts.sum())
+    mean = float((values * counts).sum() / n)
+    std = float("nan")
+    if n > 1:
+        std = float(np.sqrt((counts * (values - mean) ** 2).sum() / (n - 1)))
+    q1, *quantiles, q3 = histogram_quantiles(histogram, [0.25, *percentiles, 0.75])
+
+    describe = {"count": float(n), "mean": mean, "std": std, "min": float(values[0])}
+    for percentile, value in zip(percentiles, quantiles):
+        describe[f"{percentile * 100:g}%"] = value
+    describe["max"] = float(values[-1])
+
+    iqr = q3 - q1
+    is_outlier = (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)
+    outlier_values = values[is_outlier]
+    return {
+        "describe": describe,
+        "mode": values[counts == counts.max()].tolist(),
+        "outliers": {
+            "count": int(counts[is_outlier].sum()),
+            "min_outlier": (
+                float(outlier_values.min()) if len(outlier_values) else None
+            ),
+            "max_outlier": (
+                float(outlier_values.max()) if len(outlier_values) else None
+            ),
+        },
+    }
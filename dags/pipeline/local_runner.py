@@ -0,0 +1,429 @@
+"""
+Ejecución local del DAG, sin el stack de Airflow (Celery, Redis, Postgres).
+
+`LocalRunner` ejecuta las mismas funciones de tarea con el mismo orden de
+dependencias y el mismo mapeo dinámico, en el proceso actual o con las ramas
+independientes en paralelo en un pool de procesos. Cada tarea recibe el
+contexto que usan las funciones del DAG: `ti` / `task_instance` (XCom en
+memoria), `run_id`, `params` y `dag_run`.
+
+El grafo se lee del objeto DAG del módulo. Si Airflow no está instalado, el
+módulo del DAG lo construye con las clases mínimas `DAG` y `PythonOperator`
+de este archivo, que registran los mismos task_id, dependencias (`>>`) y
+tareas mapeadas (`partial(...).expand(op_kwargs=...)`).
+
+No implementa reintentos, pools, timeouts ni trigger rules: una tarea que
+falla detiene la ejecución (tras llamar al `on_failure_callback` del DAG).
+Una instancia que lanza `AirflowSkipException` cuenta como terminada (sin
+valor), como una instancia mapeada omitida antes de una tarea con
+`trigger_rule="none_failed"`.
+"""
+
+import importlib
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+XCOM_RETURN_KEY = "return_value"
+
+AIRFLOW_ROOT = "/opt/airflow"
+
+
+class AirflowException(Exception):
+    """
+    Error de tarea (equivalente local de `airflow.exceptions`).
+    """
+
+
+class AirflowFailException(AirflowException):
+    """
+    Error de tarea que no se debe reintentar.
+    """
+
+
+class AirflowSkipException(AirflowException):
+    """
+    La tarea se omite (no es un error).
+    """
+
+
+# Misma forma que los objetos de Airflow para leer ambos grafos igual
+XComArg = namedtuple("XComArg", ["operator", "key"], defaults=[XCOM_RETURN_KEY])
+ExpandInput = namedtuple("ExpandInput", ["value"])
+TaskSpec = namedtuple(
+    "TaskSpec", ["task_id", "python_callable", "op_kwargs", "upstream", "mapped_from"]
+)
+
+_dag_stack = []
+
+
+class DAG:
+    """
+    Registro mínimo de un DAG: parámetros, callback de fallo y tareas.
+    """
+
+    def __init__(self, dag_id, params=None, on_failure_callback=None, **kwargs):
+        self.dag_id = dag_id
+        self.params = dict(params or {})
+        self.on_failure_callback = on_failure_callback
+        self.task_dict = {}
+
+    @property
+    def tasks(self):
+        return list(self.task_dict.values())
+
+    def __enter__(self):
+        _dag_stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _dag_stack.pop()
+
+
+class _LocalOperator:
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.upstream_task_ids = set()
+        self.dag = _dag_stack[-1]
+        self.dag.task_dict[task_id] = self
+
+    @property
+    def output(self):
+        return XComArg(self)
+
+    def __rshift__(self, other):
+        for task in other if isinstance(other, list) else [other]:
+            task.upstream_task_ids.add(self.task_id)
+        return other
+
+    def __rrshift__(self, other):
+        for task in other:
+            self.upstream_task_ids.add(task.task_id)
+        return self
+
+
+class PythonOperator(_LocalOperator):
+    """
+    Tarea que ejecuta `python_callable(**op_kwargs, **context)`.
+    """
+
+    def __init__(self, task_id, python_callable, op_kwargs=None, **kwargs):
+        super().__init__(task_id)
+        self.python_callable = python_callable
+        self.op_kwargs = op_kwargs or {}
+
+    @classmethod
+    def partial(cls, **kwargs):
+        return _PartialPythonOperator(kwargs)
+
+
+class _PartialPythonOperator:
+    def __init__(self, partial_kwargs):
+        self.partial_kwargs = partial_kwargs
+
+    def expand(self, op_kwargs):
+        return _MappedPythonOperator(self.partial_kwargs, op_kwargs)
+
+
+class _MappedPythonOperator(_LocalOperator):
+    # Una instancia por elemento de la lista que devuelve la tarea de op_kwargs
+    def __init__(self, partial_kwargs, op_kwargs):
+        super().__init__(partial_kwargs["task_id"])
+        self.partial_kwargs = partial_kwargs
+        self.expand_input = ExpandInput({"op_kwargs": op_kwargs})
+        self.upstream_task_ids.add(op_kwargs.operator.task_id)
+
+
+def task_graph(dag):
+    """
+    {task_id: TaskSpec} en orden de declaración, de un DAG de Airflow o local.
+    """
+    graph = {}
+    for task in dag.tasks:
+        if hasattr(task, "expand_input"):
+            python_callable = task.partial_kwargs["python_callable"]
+            op_kwargs = {}
+            mapped_from = task.expand_input.value["op_kwargs"].operator.task_id
+        else:
+            python_callable = task.python_callable
+            op_kwargs = dict(task.op_kwargs or {})
+            mapped_from = None
+        graph[task.task_id] = TaskSpec(
+            task.task_id,
+            python_callable,
+            op_kwargs,
+            frozenset(task.upstream_task_ids),
+            mapped_from,
+        )
+    return graph
+
+
+def select_tasks(graph, targets=None):
+    """
+    task_ids de `targets` y de todas sus dependencias (todas si no hay targets).
+    """
+    if not targets:
+        return list(graph)
+    unknown = set(targets) - set(graph)
+    if unknown:
+        raise ValueError(f"Unknown tasks: {', '.join(sorted(unknown))}")
+    selected = set()
+    pending = list(targets)
+    while pending:
+        task_id = pending.pop()
+        if task_id not in selected:
+            selected.add(task_id)
+            pending.extend(graph[task_id].upstream)
+    return [task_id for task_id in graph if task_id in selected]
+
+
+def airflow_paths(module):
+    """
+    Constantes del módulo del DAG con rutas `/opt/airflow/...`.
+    """
+    return {
+        name: value
+        for name, value in vars(module).items()
+        if isinstance(value, str) and value.startswith(AIRFLOW_ROOT)
+    }
+
+
+def redirect_paths(paths, root, dataset_dir):
+    """
+    Mismas rutas bajo `root` (y `dataset_dir` para `/opt/airflow/dataset`),
+    como en los volúmenes de docker-compose.
+    """
+    redirected = {}
+    for name, value in paths.items():
+        value = value.replace(f"{AIRFLOW_ROOT}/dataset", dataset_dir)
+        redirected[name] = value.replace(AIRFLOW_ROOT, root)
+    return redirected
+
+
+class LocalTaskInstance:
+    """
+    Task instance con XCom en memoria.
+
+    `xcoms` es {(task_id, key): valor}, en orden de escritura; `pushed`
+    guarda lo que escribe esta instancia (para devolverlo desde un proceso).
+    """
+
+    try_number = 1
+
+    def __init__(self, dag_id, task_id, run_id, xcoms, map_index=-1):
+        self.dag_id = dag_id
+        self.task_id = task_id
+        self.run_id = run_id
+        self.map_index = map_index
+        self.xcoms = xcoms
+        self.pushed = {}
+
+    def xcom_push(self, key, value):
+        self.xcoms.pop((self.task_id, key), None)
+        self.xcoms[(self.task_id, key)] = value
+        self.pushed[key] = value
+
+    def xcom_pull(self, task_ids=None, key=XCOM_RETURN_KEY, **kwargs):
+        if task_ids is not None:
+            return self.xcoms.get((task_ids, key))
+        # Sin task_ids: el valor más reciente con esa clave
+        for (_, item_key), value in reversed(self.xcoms.items()):
+            if item_key == key:
+                return value
+        return None
+
+
+def _task_context(dag_id, task_id, run_id, params, xcoms, map_index=-1):
+    ti = LocalTaskInstance(dag_id, task_id, run_id, xcoms, map_index)
+    context = {
+        "ti": ti,
+        "task_instance": ti,
+        "run_id": run_id,
+        "params": params,
+        "dag_run": SimpleNamespace(run_id=run_id, conf={}),
+    }
+    return ti, context
+
+
+def run_task(spec, kwargs, dag_id, run_id, params, xcoms, map_index=-1):
+    """
+    Ejecuta una instancia de tarea. Devuelve (valor, XComs escritos, segundos).
+    """
+    ti, context = _task_context(dag_id, spec.task_id, run_id, params, xcoms, map_index)
+    start = time.perf_counter()
+    value = spec.python_callable(**spec.op_kwargs, **kwargs, **context)
+    return value, ti.pushed, time.perf_counter() - start
+
+
+_worker_graphs = {}
+
+
+def _run_in_worker(module_name, overrides, task_id, *args):
+    # En el proceso hijo: importar el módulo del DAG una vez y aplicar rutas
+    if module_name not in _worker_graphs:
+        module = importlib.import_module(module_name)
+        for name, value in overrides.items():
+            setattr(module, name, value)
+        _worker_graphs[module_name] = task_graph(module.dag)
+    return run_task(_worker_graphs[module_name][task_id], *args)
+
+
+class LocalRunner:
+    """
+    Ejecuta el grafo de tareas del módulo de un DAG (`module.dag`).
+
+    `overrides` son atributos del módulo a sustituir (p. ej. rutas de
+    `redirect_paths`); con `workers > 1` las instancias listas se ejecutan en
+    un pool de procesos.
+    """
+
+    def __init__(self, module, run_id=None, params=None, workers=1, overrides=None):
+        self.module = module
+        self.dag = module.dag
+        self.graph = task_graph(self.dag)
+        self.run_id = run_id or (
+            f"local__{datetime.now(timezone.utc):%Y-%m-%dT%H:%M:%S.%f}"
+        )
+        default_params = self.dag.params
+        if hasattr(default_params, "dump"):
+            default_params = default_params.dump()
+        self.params = {**default_params, **(params or {})}
+        self.workers = workers
+        self.overrides = overrides or {}
+        self.xcoms = {}
+        for name, value in self.overrides.items():
+            setattr(module, name, value)
+
+    def _submit(self, executor, task_id, kwargs, map_index):
+        args = (kwargs, self.dag.dag_id, self.run_id, self.params)
+        if executor is None:
+            # En serie: en este proceso (útil para perfilar con cProfile)
+            future = Future()
+            try:
+                future.set_result(
+                    run_task(self.graph[task_id], *args, self.xcoms, map_index)
+                )
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return executor.submit(
+            _run_in_worker,
+            self.module.__name__,
+            self.overrides,
+            task_id,
+            *args,
+            dict(self.xcoms),
+            map_index,
+        )
+
+    def run(self, targets=None):
+        """
+        Ejecuta `targets` y sus dependencias (todo el DAG si no se indican).
+        Devuelve {task_id: segundos} (suma de las instancias mapeadas).
+        """
+        pending = select_tasks(self.graph, targets)
+        logger.info(
+            f"Running {len(pending)} tasks of {self.dag.dag_id} locally "
+            f"(run_id={self.run_id}, workers={self.workers})"
+        )
+        timings = {}
+        done = set()
+        mapped_values = {}
+        remaining = {}
+        running = {}
+        error = None
+
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while pending or running:
+                # Lanzar las tareas cuyas dependencias ya terminaron
+                launched = False
+                for task_id in list(pending):
+                    if error is not None:
+                        break
+                    spec = self.graph[task_id]
+                    if not spec.upstream <= done:
+                        continue
+                    pending.remove(task_id)
+                    launched = True
+                    if spec.mapped_from is None:
+                        instances = [({}, -1)]
+                    else:
+                        expand = self.xcoms.get((spec.mapped_from, XCOM_RETURN_KEY))
+                        instances = [
+                            (kwargs, index) for index, kwargs in enumerate(expand or [])
+                        ]
+                        mapped_values[task_id] = [None] * len(instances)
+                    remaining[task_id] = len(instances)
+                    timings[task_id] = 0.0
+                    logger.info(
+                        f"▶ {task_id}"
+                        + (f" ({len(instances)} mapped)" if spec.mapped_from else "")
+                    )
+                    if not instances:
+                        done.add(task_id)
+                        self.xcoms[(task_id, XCOM_RETURN_KEY)] = []
+                        logger.info(f"✓ {task_id} skipped (nothing to map)")
+                    for kwargs, map_index in instances:
+                        future = self._submit(executor, task_id, kwargs, map_index)
+                        running[future] = (task_id, map_index)
+                    if executor is None:
+                        # En serie: una tarea cada vez, en orden de declaración
+                        break
+
+                if not running:
+                    if launched:
+                        continue
+                    if pending and error is None:
+                        raise RuntimeError(f"Unsatisfiable dependencies: {pending}")
+                    break
+
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task_id, map_index = running.pop(future)
+                    try:
+                        value, pushed, seconds = future.result()
+                    except AirflowSkipException as e:
+                        logger.info(f"↷ {task_id} skipped: {e}")
+                        value, pushed, seconds = None, {}, 0.0
+                    except Exception as e:
+                        logger.error(f"✗ {task_id} failed: {e}")
+                        error = error or e
+                        continue
+                    for key, pushed_value in pushed.items():
+                        self.xcoms.pop((task_id, key), None)
+                        self.xcoms[(task_id, key)] = pushed_value
+                    timings[task_id] += seconds
+                    if map_index >= 0:
+                        mapped_values[task_id][map_index] = value
+                    remaining[task_id] -= 1
+                    if remaining[task_id] == 0:
+                        done.add(task_id)
+                        self.xcoms[(task_id, XCOM_RETURN_KEY)] = mapped_values.get(
+                            task_id, value
+                        )
+                        logger.info(
+                            f"✓ {task_id} finished in {timings[task_id]:.2f}s"
+                        )
+                if error is not None:
+                    pending = []
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        if error is not None:
+            callbacks = getattr(self.dag, "on_failure_callback", None) or []
+            _, context = _task_context(
+                self.dag.dag_id, None, self.run_id, self.params, self.xcoms
+            )
+            for callback in callbacks if isinstance(callbacks, list) else [callbacks]:
+                callback({**context, "exception": error})
+            raise error
+        return timings
@@ -0,0 +1,209 @@
+"""
+Instrumentación de rendimiento de las tareas del DAG.
+
+`instrument_task` envuelve una función de tarea y `measure` cualquier
+sub-paso dentro de ella. Para cada uno se registra:
+
+- wall_seconds / cpu_seconds: tiempo real y de CPU del proceso.
+- max_rss_mb: memoria residente máxima del proceso al terminar el paso
+  (`resource.getrusage`, acumulada desde el inicio del proceso).
+- traced_peak_mb: pico de memoria asignada durante el paso según
+  `tracemalloc` (incluye arrays de numpy). Solo con la variable de entorno
+  PIPELINE_TRACEMALLOC=1, porque ralentiza las asignaciones.
+- rows / rows_per_second: filas procesadas, si el paso las indica
+  (`measure(name, rows=...)` o `record_rows`).
+
+Al terminar, cada tarea guarda sus métricas en
+`<metrics_dir>/<run_id>/<task_id>.json` y las publica en XCom
+(`task_metrics`); `collect_run_metrics` las une en `<metrics_dir>/<run_id>.json`.
+Si el perfilado está activo (ver `pipeline/profiling.py`), la tarea se
+ejecuta además bajo cProfile.
+"""
+
+import functools
+import json
+import os
+import shutil
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from pipeline.profiling import profile, profiling_enabled
+
+TRACEMALLOC_ENV = "PIPELINE_TRACEMALLOC"
+
+# Pasos abiertos, del más externo al más interno
+_open_steps = []
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _update_traced_peaks():
+    if not tracemalloc.is_tracing():
+        return
+    _, peak = tracemalloc.get_traced_memory()
+    for step in _open_steps:
+        step["traced_peak_mb"] = max(step.get("traced_peak_mb", 0.0), peak / 1e6)
+    tracemalloc.reset_peak()
+
+
+@contextmanager
+def measure(name, rows=None):
+    """
+    Mide un paso. Devuelve (en el `with`) el dict de métricas, donde se
+    puede fijar `rows` si no se conoce al empezar. Los pasos anidados quedan
+    en `steps` del paso que los contiene.
+    """
+    # El pico hasta ahora pertenece a los pasos ya abiertos
+    _update_traced_peaks()
+    step = {"name": name, "rows": rows, "steps": []}
+    if _open_steps:
+        _open_steps[-1]["steps"].append(step)
+    _open_steps.append(step)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield step
+    finally:
+        step["wall_seconds"] = round(time.perf_counter() - wall_start, 6)
+        step["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+        step["max_rss_mb"] = _max_rss_mb()
+        _update_traced_peaks()
+        _open_steps.pop()
+        if step["rows"] is None and step["steps"]:
+            # Sin filas propias: las del sub-paso que más procesó
+            step["rows"] = max(
+                (child["rows"] for child in step["steps"] if child["rows"]),
+                default=None,
+            )
+        if step["rows"] and step["wall_seconds"] > 0:
+            step["rows_per_second"] = round(step["rows"] / step["wall_seconds"], 1)
+        if not step["steps"]:
+            del step["steps"]
+
+
+def record_rows(rows):
+    """
+    Filas procesadas por el paso más interno abierto.
+    """
+    if _open_steps:
+        _open_steps[-1]["rows"] = int(rows)
+
+
+def _task_filename(ti):
+    map_index = getattr(ti, "map_index", -1)
+    return ti.task_id if map_index < 0 else f"{ti.task_id}.{map_index}"
+
+
+def _task_metrics_path(metrics_dir, run_id, ti):
+    return os.path.join(metrics_dir, run_id, f"{_task_filename(ti)}.json")
+
+
+def instrument_task(metrics_dir, profile_dir=None):
+    """
+    Decorador para funciones de tarea (`**context`). `metrics_dir` es una
+    función que devuelve el directorio de métricas; se evalúa al ejecutar la
+    tarea (así respeta rutas sustituidas, p. ej. en el runner local).
+    `profile_dir`, igual, el directorio de perfiles cuando el perfilado está
+    activo (parámetro `profile` o PIPELINE_PROFILE).
+    """
+
+    def decorator(task_function):
+        @functools.wraps(task_function)
+        def wrapper(*args, **context):
+            ti = context["ti"]
+            started_at = datetime.now(timezone.utc).isoformat()
+            tracing = bool(os.environ.get(TRACEMALLOC_ENV)) and (
+                not tracemalloc.is_tracing()
+            )
+            if tracing:
+                tracemalloc.start()
+            profiler = nullcontext()
+            if profile_dir is not None and profiling_enabled(context.get("params")):
+                profiler = profile(
+                    os.path.join(profile_dir(), context["run_id"]),
+                    _task_filename(ti),
+                )
+            status = "failed"
+            try:
+                with measure(task_function.__name__) as step, profiler:
+                    result = task_function(*args, **context)
+                status = "success"
+                return result
+            finally:
+                if tracing:
+                    tracemalloc.stop()
+                metrics = {
+                    "task_id": ti.task_id,
+                    "map_index": getattr(ti, "map_index", -1),
+                    "try_number": getattr(ti, "try_number", None),
+                    "run_id": context["run_id"],
+                    "started_at": started_at,
+                    "status": status,
+                    **step,
+                }
+                _write_task_metrics(metrics_dir(), context["run_id"], ti, metrics)
+
+        return wrapper
+
+    return decorator
+
+
+def _write_task_metrics(metrics_dir, run_id, ti, metrics):
+    path = _task_metrics_path(metrics_dir, run_id, ti)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(metrics, f, indent=2)
+    # Resumen ligero como metadato de la tarea
+    ti.xcom_push(
+        key="task_metrics",
+        value={
+            key: metrics.get(key)
+            for key in ["wall_seconds", "cpu_seconds", "max_rss_mb", "rows"]
+        },
+    )
+
+
+def collect_run_metrics(metrics_dir, run_id):
+    """
+    Une las métricas de todas las tareas de una ejecución en
+    `<metrics_dir>/<run_id>.json` (ordenadas por inicio). Devuelve el path,
+    o None si no hay métricas.
+    """
+    run_dir = os.path.join(metrics_dir, run_id)
+    if not os.path.isdir(run_dir):
+        return None
+    tasks = []
+    for filename in os.listdir(run_dir):
+        if filename.endswith(".json"):
+            with open(os.path.join(run_dir, filename)) as f:
+                tasks.append(json.load(f))
+    tasks.sort(key=lambda metrics: metrics["started_at"])
+
+    path = os.path.join(metrics_dir, f"{run_id}.json")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "run_id": run_id,
+                "collected_at": datetime.now(timezone.utc).isoformat(),
+                "total_task_seconds": round(
+                    sum(metrics["wall_seconds"] for metrics in tasks), 6
+                ),
+                "tasks": tasks,
+            },
+            f,
+            indent=2,
+        )
+    shutil.rmtree(run_dir, ignore_errors=True)
+    return path
@@ -0,0 +1,574 @@
+"""
+Renderizado de las gráficas del análisis como trabajos independientes.
+
+Cada gráfica es una función pura que recibe agregados ya calculados (Series,
+DataFrames o diccionarios pequeños) y escribe un PNG. `render_plots` ejecuta
+los trabajos en un pool de procesos con el backend Agg, de modo que el tiempo
+total queda acotado por la gráfica más lenta.
+
+Opcionalmente se usa una caché direccionada por contenido: cada gráfica se
+identifica por un hash de sus datos de entrada y parámetros, y si ese hash ya
+fue renderizado se copia el PNG de la caché en lugar de volver a dibujarlo.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+logger = logging.getLogger(__name__)
+
+# Número máximo de procesos para renderizar gráficas (configurable por entorno)
+PLOT_WORKERS = int(os.environ.get("PLOT_WORKERS", "4"))
+
+# Incrementar al cambiar el estilo de las gráficas para invalidar la caché
+PLOT_CACHE_VERSION = 1
+PLOT_CACHE_MANIFEST = "manifest.json"
+
+CLUSTER_COLORS = ["#e74c3c", "#3498db", "#2ecc71", "#f39c12"]
+
+
+def _save(output_path, dpi):
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=dpi, bbox_inches="tight")
+    plt.close("all")
+
+
+def render_top_products(data, output_path, dpi=100):
+    """
+    Top 10 productos más vendidos. `data`: Series producto -> ventas.
+    """
+    plt.figure(figsize=(10, 6))
+    data.plot(kind="barh", color="skyblue")
+    plt.title("Top 10 Productos Mas Vendidos")
+    plt.xlabel("Numero de Ventas")
+    plt.ylabel("Producto")
+    _save(output_path, dpi)
+
+
+def render_store_ranking(data, output_path, dpi=100):
+    """
+    Ranking de tiendas. `data`: Series tienda -> transacciones.
+    """
+    plt.figure(figsize=(8, 6))
+    data.plot(kind="bar", color="lightgreen")
+    plt.title("Ranking de Tiendas por Numero de Transacciones")
+    plt.xlabel("Tienda")
+    plt.ylabel("Numero de Transacciones")
+    plt.xticks(rotation=0)
+    _save(output_path, dpi)
+
+
+def render_products_histogram(data, output_path, dpi=100, bins=30):
+    """
+    Histograma de productos por transacción.
+    `data`: Series num_products -> número de transacciones.
+    """
+    plt.figure(figsize=(10, 6))
+    plt.hist(
+        data.index.values,
+        bins=bins,
+        weights=data.values,
+        edgecolor="black",
+        alpha=0.7,
+    )
+    plt.title("Distribucion del Numero de Productos por Transaccion")
+    plt.xlabel("Numero de Productos")
+    plt.ylabel("Frecuencia")
+    _save(output_path, dpi)
+
+
+def render_category_distribution(data, output_path, dpi=100):
+    """
+    Top 10 categorías por número de productos. `data`: Series nombre -> conteo.
+    """
+    plt.figure(figsize=(12, 6))
+    data.plot(kind="bar", color="coral")
+    plt.title("Top 10 Categorias por Numero de Productos")
+    plt.xlabel("Categoria")
+    plt.ylabel("Numero de Productos")
+    plt.xticks(rotation=45, ha="right")
+    _save(output_path, dpi)
+
+
+def render_daily_sales(data, output_path, dpi=100):
+    """
+    Serie temporal diaria. `data`: Series indexada por fecha -> transacciones.
+    """
+    plt.figure(figsize=(14, 6))
+    plt.plot(data.index, data.values, linewidth=1)
+    plt.title("Serie Temporal de Transacciones Diarias")
+    plt.xlabel("Fecha")
+    plt.ylabel("Numero de Transacciones")
+    plt.xticks(rotation=45)
+    _save(output_path, dpi)
+
+
+def render_sales_by_day_of_week(data, output_path, dpi=100):
+    """
+    Transacciones por día de la semana. `data`: Series día -> transacciones.
+    """
+    plt.figure(figsize=(10, 6))
+    data.plot(kind="bar", color="steelblue")
+    plt.title("Transacciones por Dia de la Semana")
+    plt.xlabel("Dia de la Semana")
+    plt.ylabel("Numero de Transacciones")
+    plt.xticks(rotation=45, ha="right")
+    _save(output_path, dpi)
+
+
+def render_monthly_sales(data, output_path, dpi=100):
+    """
+    Ventas mensuales. `data`: DataFrame con columnas date y num_transactions.
+    """
+    plt.figure(figsize=(12, 6))
+    plt.plot(data["date"], data["num_transactions"], marker="o", linewidth=2)
+    plt.title("Ventas Mensuales")
+    plt.xlabel("Mes")
+    plt.ylabel("Numero de Transacciones")
+    plt.xticks(rotation=45)
+    _save(output_path, dpi)
+
+
+def render_cluster_sizes(data, output_path, dpi=150):
+    """
+    Pie chart de tamaños de cluster. `data`: Series nombre de cluster -> clientes.
+    """
+    plt.figure(figsize=(12, 8))
+    # Colores más contrastantes para distinguir mejor los 4 clusters
+    wedges, texts, autotexts = plt.pie(
+        data.values,
+        labels=data.index,
+        autopct="%1.1f%%",
+        colors=CLUSTER_COLORS,
+        startangle=90,
+        textprops={"fontsize": 11, "weight": "bold"},
+        explode=[0.05] * len(data),  # Separar ligeramente las porciones
+    )
+    # Hacer más legibles los porcentajes
+    for autotext in autotexts:
+        autotext.set_color("white")
+        autotext.set_fontsize(12)
+        autotext.set_weight("bold")
+    plt.title(
+        "Clustering K-Means de Clientes (4 Segmentos)", fontsize=14, weight="bold"
+    )
+    _save(output_path, dpi)
+
+
+def render_cluster_scatter(data, output_path, dpi=150):
+    """
+    Proyección 2D (frecuencia vs volumen) del clustering.
+    `data`: DataFrame con frequency, total_volume, cluster y cluster_name.
+    """
+    plt.figure(figsize=(14, 9))
+
+    # Nota: Los clusters fueron calculados en 5D; esta es solo una proyección 2D
+    for cluster_id in sorted(data["cluster"].unique()):
+        cluster_data = data[data["cluster"] == cluster_id]
+        plt.scatter(
+            cluster_data["frequency"],
+            cluster_data["total_volume"],
+            c=CLUSTER_COLORS[cluster_id],
+            label=cluster_data["cluster_name"].iloc[0],
+            alpha=0.6,
+            s=100,
+            edgecolors="black",
+            linewidths=0.5,
+        )
+
+    plt.xlabel("Frecuencia de Compra (# Transacciones)", fontsize=12, weight="bold")
+    plt.ylabel("Volumen Total (# Productos)", fontsize=12, weight="bold")
+    plt.title(
+        "K-Means: Proyección 2D (Frecuencia vs Volumen)\nClusters calculados en 5D: Frecuencia + Volumen + Productos Distintos + Diversidad Categorías + Prom Prod/Trans",
+        fontsize=13,
+        weight="bold",
+    )
+    plt.legend(title="Segmento de Cliente", loc="best", fontsize=10)
+    plt.grid(True, alpha=0.3, linestyle="--")
+    _save(output_path, dpi)
+
+
+def render_cluster_profiles(data, output_path, dpi=150):
+    """
+    Comparación de las 5 características por cluster.
+    `data`: dict nombre de cluster -> perfil (salida de customer_analysis).
+    """
+    fig, axes = plt.subplots(3, 2, figsize=(16, 16))
+    fig.suptitle(
+        "Perfiles de los 4 Clusters K-Means - Comparación de 5 Características",
+        fontsize=16,
+        weight="bold",
+    )
+
+    cluster_names_list = list(data.keys())
+    panels = [
+        (axes[0, 0], "avg_frequency", "Frecuencia Promedio", "Frecuencia de Compra por Cluster"),
+        (axes[0, 1], "avg_total_volume", "Volumen Total Promedio", "Volumen de Compra por Cluster"),
+        (axes[1, 0], "avg_distinct_products", "Productos Distintos Promedio", "Variedad de Productos por Cluster"),
+        (axes[1, 1], "avg_category_diversity", "Diversidad de Categorías Promedio", "Diversidad de Categorías por Cluster"),
+        (axes[2, 0], "avg_products_per_transaction", "Promedio Prod/Trans", "Productos Promedio por Transacción por Cluster"),
+    ]
+    for ax, key, ylabel, title in panels:
+        values = [data[name][key] for name in cluster_names_list]
+        ax.bar(
+            range(len(cluster_names_list)),
+            values,
+            color=CLUSTER_COLORS,
+            edgecolor="black",
+            linewidth=1.5,
+        )
+        ax.set_xticks(range(len(cluster_names_list)))
+        ax.set_xticklabels(cluster_names_list, rotation=15, ha="right", fontsize=10)
+        ax.set_ylabel(ylabel, fontsize=11, weight="bold")
+        ax.set_title(title, fontsize=12, weight="bold")
+        ax.grid(axis="y", alpha=0.3, linestyle="--")
+
+    # Ocultar el panel vacío (2, 1)
+    axes[2, 1].axis("off")
+    _save(output_path, dpi)
+
+
+def render_association_rules(data, output_path, dpi=100):
+    """
+    Top reglas por lift. `data`: lista de reglas (dicts antecedent/consequent/lift).
+    """
+    rules_labels = [f"{r['antecedent']}->{r['consequent']}" for r in data]
+    rules_lift = [r["lift"] for r in data]
+
+    plt.figure(figsize=(12, 6))
+    plt.barh(range(len(rules_labels)), rules_lift, color="teal")
+    plt.yticks(range(len(rules_labels)), rules_labels)
+    plt.xlabel("Lift")
+    plt.title("Top 10 Reglas de Asociacion (por Lift)")
+    _save(output_path, dpi)
+
+
+def render_top_customers(data, output_path, dpi=100):
+    """
+    Top 10 clientes. `data`: Series cliente -> transacciones.
+    """
+    plt.figure(figsize=(10, 6))
+    data.plot(kind="barh", color="orange")
+    plt.title("Top 10 Clientes por Numero de Transacciones")
+    plt.xlabel("Numero de Transacciones")
+    plt.ylabel("Cliente ID")
+    _save(output_path, dpi)
+
+
+def render_boxplot_distribution(data, output_path, dpi=100):
+    """
+    Boxplot de productos por cliente y barras de las top categorías.
+    `data`: dict con customer_volume (Series) y top_categories (Series).
+    """
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+
+    # Boxplot 1: Distribución por cliente
+    axes[0].boxplot([data["customer_volume"]], labels=["Clientes"])
+    axes[0].set_ylabel("Total de Productos Comprados")
+    axes[0].set_title("Distribucion de Productos por Cliente")
+    axes[0].grid(axis="y", alpha=0.3)
+
+    # Boxplot 2: Distribución por categoría (top 10 categorías)
+    top_categories = data["top_categories"]
+    axes[1].barh(range(len(top_categories)), top_categories.values)
+    axes[1].set_yticks(range(len(top_categories)))
+    axes[1].set_yticklabels([f"Cat {cat}" for cat in top_categories.index])
+    axes[1].set_xlabel("Numero de Productos")
+    axes[1].set_title("Top 10 Categorias por Volumen")
+    _save(output_path, dpi)
+
+
+def render_correlation_heatmap(data, output_path, dpi=100):
+    """
+    Heatmap de correlación. `data`: matriz de correlación (DataFrame).
+    """
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(
+        data,
+        annot=True,
+        cmap="coolwarm",
+        center=0,
+        square=True,
+        linewidths=1,
+        cbar_kws={"shrink": 0.8},
+    )
+    plt.title("Heatmap de Correlacion entre Variables de Cliente")
+    _save(output_path, dpi)
+
+
+def render_peak_days(data, output_path, dpi=100):
+    """
+    Top 10 días pico. `data`: Series fecha -> transacciones (ya ordenada).
+    """
+    plt.figure(figsize=(12, 6))
+    plt.bar(range(len(data)), data.values, color="purple", alpha=0.7)
+    plt.xticks(
+        range(len(data)),
+        [str(d) for d in data.index],
+        rotation=45,
+        ha="right",
+    )
+    plt.xlabel("Fecha")
+    plt.ylabel("Numero de Transacciones")
+    plt.title("Top 10 Dias Pico de Compra")
+    _save(output_path, dpi)
+
+
+def render_categories_by_volume(data, output_path, dpi=100):
+    """
+    Top 10 categorías por volumen vendido. `data`: Series etiqueta -> volumen.
+    """
+    plt.figure(figsize=(12, 6))
+    plt.barh(range(len(data)), data.values, color="gold")
+    plt.yticks(range(len(data)), list(data.index))
+    plt.xlabel("Volumen Total (Frecuencia de Productos)")
+    plt.title("Top 10 Categorias por Volumen (Rentabilidad Relativa)")
+    _save(output_path, dpi)
+
+
+PLOT_RENDERERS = {
+    "top_products": render_top_products,
+    "store_ranking": render_store_ranking,
+    "products_histogram": render_products_histogram,
+    "category_distribution": render_category_distribution,
+    "daily_sales_timeseries": render_daily_sales,
+    "sales_by_day_of_week": render_sales_by_day_of_week,
+    "monthly_sales": render_monthly_sales,
+    "customer_clustering_kmeans": render_cluster_sizes,
+    "customer_clustering_scatter": render_cluster_scatter,
+    "customer_clustering_profiles": render_cluster_profiles,
+    "association_rules": render_association_rules,
+    "top_10_customers": render_top_customers,
+    "boxplot_distribution": render_boxplot_distribution,
+    "correlation_heatmap": render_correlation_heatmap,
+    "peak_days": render_peak_days,
+    "categories_by_volume": render_categories_by_volume,
+}
+
+
+def plot_job(name, data, **params):
+    """
+    Crea la especificación de un trabajo de renderizado.
+    El PNG resultante se llama `<name>.png`.
+    """
+    if name not in PLOT_RENDERERS:
+        raise ValueError(f"Unknown plot: {name}")
+    return {"name": name, "data": data, "params": params}
+
+
+def run_plot_job(job, output_dir):
+    """
+    Ejecuta un trabajo de renderizado y devuelve (nombre, segundos).
+    Se ejecuta dentro de los procesos del pool.
+    """
+    start = time.perf_counter()
+    output_path = os.path.join(output_dir, f"{job['name']}.png")
+    try:
+        PLOT_RENDERERS[job["name"]](job["data"], output_path, **job["params"])
+    finally:
+        plt.close("all")
+    return job["name"], time.perf_counter() - start
+
+
+def _update_digest(h, obj):
+    """
+    Agrega `obj` al hash de forma determinista (datos y estructura).
+    """
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"DataFrame")
+        h.update(repr(list(obj.columns)).encode())
+        h.update(repr([str(t) for t in obj.dtypes]).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        h.update(b"Series")
+        h.update(repr((obj.name, str(obj.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(b"ndarray")
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"dict")
+        for key in sorted(obj, key=str):
+            h.update(repr(key).encode())
+            _update_digest(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_digest(h, item)
+    else:
+        h.update(repr(obj).encode())
+
+
+def plot_cache_key(job):
+    """
+    Hash del contenido de un trabajo: nombre, parámetros y datos de entrada.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{PLOT_CACHE_VERSION}:{job['name']}".encode())
+    _update_digest(h, job["params"])
+    _update_digest(h, job["data"])
+    return h.hexdigest()
+
+
+def load_plot_manifest(cache_dir):
+    """
+    Carga el manifiesto de la caché (nombre de gráfica -> entrada).
+    """
+    manifest_path = os.path.join(cache_dir, PLOT_CACHE_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read plot cache manifest, ignoring it: {e}")
+        return {}
+
+
+def _write_plot_manifest(cache_dir, manifest):
+    manifest_path = os.path.join(cache_dir, PLOT_CACHE_MANIFEST)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _prune_plot_cache(cache_dir, manifest):
+    """
+    Elimina de la caché los PNG que ya no referencia el manifiesto.
+    """
+    referenced = {entry["file"] for entry in manifest.values()}
+    for filename in os.listdir(cache_dir):
+        if filename.endswith(".png") and filename not in referenced:
+            try:
+                os.remove(os.path.join(cache_dir, filename))
+            except OSError as e:
+                logger.warning(f"Could not remove cached plot {filename}: {e}")
+
+
+def _execute_jobs(jobs, output_dir, max_workers):
+    """
+    Ejecuta los trabajos (en serie o en un pool de procesos) y devuelve
+    (timings, errores).
+    """
+    timings = {}
+    errors = []
+    if not jobs:
+        return timings, errors
+
+    logger.info(f"Rendering {len(jobs)} plots with {max_workers} worker(s)")
+    if max_workers == 1:
+        for job in jobs:
+            try:
+                name, elapsed = run_plot_job(job, output_dir)
+                timings[name] = elapsed
+                logger.info(f"✓ {name}.png rendered in {elapsed:.2f}s")
+            except Exception as e:
+                logger.error(f"Plot {job['name']} failed: {e}")
+                errors.append(e)
+        return timings, errors
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_plot_job, job, output_dir): job["name"]
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                name, elapsed = future.result()
+                timings[name] = elapsed
+                logger.info(f"✓ {name}.png rendered in {elapsed:.2f}s")
+            except Exception as e:
+                logger.error(f"Plot {futures[future]} failed: {e}")
+                errors.append(e)
+    return timings, errors
+
+
+def render_plots(jobs, output_dir, max_workers=None, cache_dir=None):
+    """
+    Renderiza los trabajos en paralelo y registra el tiempo de cada gráfica.
+    Si se indica `cache_dir`, las gráficas cuyo hash de entrada ya está en la
+    caché se copian en lugar de renderizarse.
+    Devuelve un dict nombre -> segundos (solo gráficas renderizadas). Si
+    alguna gráfica falla, se terminan las demás y luego se lanza el primer error.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    wall_start = time.perf_counter()
+
+    manifest = {}
+    keys = {}
+    pending = jobs
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = load_plot_manifest(cache_dir)
+        pending = []
+        for job in jobs:
+            key = plot_cache_key(job)
+            keys[job["name"]] = key
+            cached_path = os.path.join(cache_dir, f"{key}.png")
+            if os.path.exists(cached_path):
+                shutil.copyfile(
+                    cached_path, os.path.join(output_dir, f"{job['name']}.png")
+                )
+                if manifest.get(job["name"], {}).get("key") != key:
+                    manifest[job["name"]] = {
+                        "key": key,
+                        "file": f"{key}.png",
+                        "rendered_at": datetime.now().isoformat(),
+                    }
+                logger.info(f"✓ {job['name']}.png unchanged, copied from cache")
+            else:
+                pending.append(job)
+        logger.info(
+            f"Plot cache: {len(jobs) - len(pending)} hit(s), {len(pending)} miss(es)"
+        )
+
+    if max_workers is None:
+        max_workers = PLOT_WORKERS
+    max_workers = max(1, min(max_workers, len(pending)))
+    timings, errors = _execute_jobs(pending, output_dir, max_workers)
+
+    wall = time.perf_counter() - wall_start
+    if timings:
+        slowest = max(timings, key=timings.get)
+        logger.info(
+            f"Plot rendering wall time: {wall:.2f}s "
+            f"(sum of plots: {sum(timings.values()):.2f}s, "
+            f"slowest: {slowest} {timings[slowest]:.2f}s)"
+        )
+
+    if cache_dir:
+        # Registrar en la caché solo las gráficas renderizadas con éxito
+        for name, elapsed in timings.items():
+            key = keys[name]
+            shutil.copyfile(
+                os.path.join(output_dir, f"{name}.png"),
+                os.path.join(cache_dir, f"{key}.png"),
+            )
+            manifest[name] = {
+                "key": key,
+                "file": f"{key}.png",
+                "rendered_at": datetime.now().isoformat(),
+                "render_seconds": round(elapsed, 3),
+            }
+        _write_plot_manifest(cache_dir, manifest)
+        _prune_plot_cache(cache_dir, manifest)
+
+    if errors:
+        raise errors[0]
+    return timings
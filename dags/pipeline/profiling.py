@@ -0,0 +1,149 @@
+"""
+Perfilado opcional de las tareas del DAG con cProfile.
+
+Se activa con el parámetro `profile` del DAG o con la variable de entorno
+PIPELINE_PROFILE=1. Por cada tarea se escriben, en
+`<profile_dir>/<run_id>/`:
+
+- `<tarea>.prof`: estadísticas de cProfile (`pstats`, snakeviz, tuna...).
+- `<tarea>.collapsed`: pilas colapsadas (`a;b;c microsegundos`) para
+  flamegraph.pl, speedscope o inferno.
+- `<tarea>.top.txt`: funciones con más tiempo acumulado y propio.
+
+cProfile solo registra pares llamador/llamado, así que las pilas colapsadas
+se reconstruyen repartiendo el tiempo de cada función entre sus llamadores en
+proporción al tiempo de cada llamada. Los procesos hijos (p. ej. el
+renderizado de gráficas) no se perfilan.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+from contextlib import contextmanager
+
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+# Funciones listadas en el informe
+TOP_FUNCTIONS = 25
+
+# Profundidad máxima de las pilas reconstruidas
+MAX_STACK_DEPTH = 100
+
+# Las ramas con menos de esta fracción del tiempo total no se expanden
+MIN_STACK_FRACTION = 0.0005
+
+
+def profiling_enabled(params=None):
+    """
+    True si el parámetro `profile` del DAG o PIPELINE_PROFILE lo activan.
+    """
+    if params and params.get("profile"):
+        return True
+    return os.environ.get(PROFILE_ENV, "").lower() not in ("", "0", "false")
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == "~":
+        # Funciones built-in: "<built-in method ...>"
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    # ';' separa los marcos en el formato colapsado
+    return label.replace(";", ",")
+
+
+def collapsed_stacks(stats):
+    """
+    Pilas colapsadas {pila: microsegundos} a partir de un `pstats.Stats`.
+    """
+    entries = stats.stats
+    children = {}
+    for callee, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            # edge = (cc, nc, tt, ct) de las llamadas caller -> callee
+            children.setdefault(caller, []).append((callee, edge[3]))
+
+    roots = [
+        func
+        for func, (_, _, _, _, callers) in entries.items()
+        if not set(callers) - {func}
+    ]
+    total = sum(entries[func][3] for func in roots)
+    min_seconds = total * MIN_STACK_FRACTION
+
+    stacks = {}
+    # (función, funciones de la pila, etiquetas de la pila, fracción del
+    # tiempo de la función que pasa por esa pila)
+    pending = [(func, (func,), (_frame_label(func),), 1.0) for func in roots]
+    while pending:
+        func, path, stack, scale = pending.pop()
+        _, _, own_time, cumulative_time, _ = entries[func]
+        micros = int(own_time * scale * 1e6)
+        if micros > 0:
+            key = ";".join(stack)
+            stacks[key] = stacks.get(key, 0) + micros
+        if len(stack) >= MAX_STACK_DEPTH:
+            continue
+        for child, edge_time in children.get(func, []):
+            child_cumulative = entries[child][3]
+            child_time = edge_time * scale
+            # Las llamadas recursivas ya están en el tiempo acumulado
+            if child in path or child_time < min_seconds or child_cumulative <= 0:
+                continue
+            pending.append(
+                (
+                    child,
+                    path + (child,),
+                    stack + (_frame_label(child),),
+                    min(1.0, child_time / child_cumulative),
+                )
+            )
+    return stacks
+
+
+def top_functions_report(stats, limit=TOP_FUNCTIONS):
+    """
+    Texto con las funciones de más tiempo acumulado y de más tiempo propio.
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stream.write(f"Top {limit} functions by cumulative time\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    stream.write(f"\nTop {limit} functions by own time\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+    return stream.getvalue()
+
+
+def write_profile(profiler, output_dir, name):
+    """
+    Guarda `.prof`, `.collapsed` y `.top.txt` de un perfil. Devuelve el path
+    del `.prof`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, name)
+    profiler.dump_stats(f"{base}.prof")
+
+    stats = pstats.Stats(profiler)
+    with open(f"{base}.collapsed", "w") as f:
+        for stack, micros in sorted(collapsed_stacks(stats).items()):
+            f.write(f"{stack} {micros}\n")
+    with open(f"{base}.top.txt", "w") as f:
+        f.write(top_functions_report(stats))
+    return f"{base}.prof"
+
+
+@contextmanager
+def profile(output_dir, name):
+    """
+    Perfila el bloque y escribe sus archivos en `output_dir` (también si el
+    bloque falla, para ver dónde se fue el tiempo antes de un timeout).
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        write_profile(profiler, output_dir, name)
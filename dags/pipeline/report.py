@@ -0,0 +1,545 @@
+"""
+Informes de resultados del análisis.
+
+Los informes son una función pura de los artefactos de resultados (dicts
+pequeños generados por cada tarea del DAG): no vuelven a leer las
+transacciones. `write_text_reports` genera los `.txt` legibles y
+`write_machine_readable` los mismos resultados en JSON y las tablas en
+Parquet, junto a los `.txt`.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def write_text_reports(results_dir, results):
+    """
+    Escribe los informes `.txt` (incluido INFORME_EJECUTIVO.txt).
+
+    `results` es un dict con los resultados de cada tarea: review, stats,
+    temporal, customer, association y, opcionalmente, recommendation,
+    category y drift.
+    """
+    review_results = results["review"]
+    stats_results = results["stats"]
+    temporal_results = results["temporal"]
+    customer_results = results["customer"]
+    association_results = results["association"]
+    recommendation_results = results.get("recommendation")
+    category_results = results.get("category")
+    drift_results = results.get("drift")
+
+    # Guardar revisión de datos
+    with open(os.path.join(results_dir, "data_review.txt"), "w") as f:
+        for table, stats in review_results.items():
+            f.write(f"=== {table.upper()} ===\n")
+            for key, value in stats.items():
+                f.write(f"{key}: {value}\n")
+            f.write("\n")
+
+    # Guardar estadísticas descriptivas
+    with open(os.path.join(results_dir, "descriptive_stats.txt"), "w") as f:
+        f.write("=== ESTADÍSTICAS NUMÉRICAS ===\n")
+        for var, stats in stats_results["numeric"].items():
+            f.write(f"\n--- {var.upper()} ---\n")
+            desc_df = pd.DataFrame(stats["describe"])
+            f.write(desc_df.to_string())
+            f.write(f"\nModa: {stats['mode']}\n")
+            f.write(f"Outliers: {stats_results['outliers'][var]}\n")
+
+        f.write("\n=== ESTADÍSTICAS CATEGÓRICAS ===\n")
+        f.write("Categorías:\n")
+        for cat, count in list(
+            stats_results["categorical"]["category_counts"].items()
+        )[:10]:
+            freq = stats_results["categorical"]["category_frequencies"][cat]
+            f.write(f"Categoría {cat}: {count} productos ({freq}%)\n")
+
+        f.write("\nTop productos:\n")
+        for prod, count in list(stats_results["product_frequencies"].items())[:10]:
+            f.write(f"Producto {prod}: {count} veces\n")
+
+        f.write("\nTop stores:\n")
+        for store, count in list(
+            stats_results["store_frequencies"]["counts"].items()
+        )[:10]:
+            freq = stats_results["store_frequencies"]["frequencies"][store]
+            f.write(f"Store {store}: {count} transacciones ({freq}%)\n")
+
+        sketch_stats = stats_results.get("sketches")
+        if sketch_stats:
+            error = sketch_stats["distinct_relative_error"]
+            f.write("\n=== ESTADÍSTICAS INCREMENTALES (SKETCHES POR ARCHIVO) ===\n")
+            f.write(
+                f"Clientes distintos (aprox. ±{error:.1%}): "
+                f"{sketch_stats['unique_customers']}\n"
+            )
+            f.write(
+                f"Productos distintos (aprox. ±{error:.1%}): "
+                f"{sketch_stats['unique_products']}\n"
+            )
+            f.write("Top productos (conteo máximo / mínimo garantizado):\n")
+            for top in sketch_stats["top_products"]:
+                f.write(
+                    f"Producto {top['product']}: {top['count']} / {top['min_count']}\n"
+                )
+            f.write("Top clientes (conteo máximo / mínimo garantizado):\n")
+            for top in sketch_stats["top_customers"]:
+                f.write(
+                    f"Cliente {top['customer']}: {top['count']} / {top['min_count']}\n"
+                )
+            f.write(
+                f"Cuantiles del tamaño de canasta: {sketch_stats['basket_size_quantiles']}\n"
+            )
+
+    # Guardar análisis temporal
+    with open(os.path.join(results_dir, "temporal_analysis.txt"), "w") as f:
+        f.write("=== ANÁLISIS TEMPORAL ===\n\n")
+
+        f.write("Estadísticas diarias:\n")
+        for key, value in temporal_results["daily_stats"].items():
+            f.write(f"{key}: {value}\n")
+
+        f.write("\nVentas por día de la semana:\n")
+        for day, stats in temporal_results["day_of_week_sales"].items():
+            f.write(
+                f"{day}: {stats['num_transactions']} transacciones, {stats['total_products']} productos\n"
+            )
+
+        f.write("\nTop 10 días con más ventas:\n")
+        daily_sales_sorted = sorted(
+            temporal_results["daily_sales"].items(),
+            key=lambda x: x[1]["num_transactions"],
+            reverse=True,
+        )[:10]
+        for date, stats in daily_sales_sorted:
+            f.write(f"{date}: {stats['num_transactions']} transacciones\n")
+
+    # Guardar análisis de clientes (incluyendo clustering K-Means)
+    with open(os.path.join(results_dir, "customer_analysis.txt"), "w") as f:
+        f.write("=== ANÁLISIS DE CLIENTES ===\n\n")
+
+        f.write("Frecuencia de compra:\n")
+        for key, value in customer_results["purchase_frequency"].items():
+            f.write(f"{key}: {value}\n")
+
+        if customer_results["time_between_purchases"]:
+            f.write("\nTiempo entre compras:\n")
+            for key, value in customer_results["time_between_purchases"].items():
+                f.write(f"{key}: {value}\n")
+
+        if "clustering" in customer_results:
+            f.write("\n=== CLUSTERING K-MEANS ===\n\n")
+            f.write(
+                f"Número de clusters: {customer_results['clustering']['n_clusters']}\n\n"
+            )
+
+            for cluster_name, profile in customer_results["clustering"][
+                "cluster_profiles"
+            ].items():
+                f.write(f"\n{cluster_name} (n={profile['size']}):\n")
+                f.write(f"  Descripción: {profile['description']}\n")
+                f.write(f"  Frecuencia promedio: {profile['avg_frequency']:.2f}\n")
+                f.write(
+                    f"  Volumen total promedio: {profile['avg_total_volume']:.2f}\n"
+                )
+                f.write(
+                    f"  Productos distintos promedio: {profile['avg_distinct_products']:.2f}\n"
+                )
+                f.write(
+                    f"  Diversidad de categorías promedio: {profile['avg_category_diversity']:.2f}\n"
+                )
+
+    # Guardar análisis de asociación de productos
+    with open(os.path.join(results_dir, "product_association.txt"), "w") as f:
+        f.write("=== ANÁLISIS DE ASOCIACIÓN DE PRODUCTOS ===\n\n")
+
+        f.write("Items frecuentes (Top 20):\n")
+        for item, count in association_results["frequent_items"].items():
+            f.write(f"Producto {item}: {count} transacciones\n")
+
+        f.write(f"\nReglas de asociación (Top 20 por lift):\n")
+        for i, rule in enumerate(association_results["top_rules"], 1):
+            f.write(
+                f"{i}. {rule['antecedent']} -> {rule['consequent']}: "
+                f"Support={rule['support']:.4f}, "
+                f"Confidence={rule['confidence']:.4f}, "
+                f"Lift={rule['lift']:.4f}\n"
+            )
+
+    # Guardar sistema de recomendaciones
+    if recommendation_results:
+        with open(os.path.join(results_dir, "recommendations.txt"), "w") as f:
+            f.write("=== SISTEMA DE RECOMENDACIÓN ===\n\n")
+
+            f.write("RECOMENDACIONES PARA CLIENTES:\n\n")
+            for customer, recs in list(
+                recommendation_results["customer_recommendations_examples"].items()
+            )[:10]:
+                f.write(f"\nCliente {customer}:\n")
+                for i, rec in enumerate(recs[:5], 1):
+                    f.write(
+                        f"  {i}. Producto {rec['product']} "
+                        f"(Score: {rec['score']:.2f}, Lift: {rec['avg_lift']:.2f})\n"
+                    )
+
+            f.write("\n\nRECOMENDACIONES PARA PRODUCTOS:\n\n")
+            for product, recs in list(
+                recommendation_results["product_recommendations_examples"].items()
+            )[:10]:
+                f.write(f"\nProducto {product}:\n")
+                for i, rec in enumerate(recs[:5], 1):
+                    f.write(
+                        f"  {i}. Producto {rec['product']} "
+                        f"(Lift: {rec['lift']:.2f}, Confidence: {rec['confidence']:.2f})\n"
+                    )
+
+    # Guardar reglas entre categorías
+    if category_results:
+        with open(
+            os.path.join(results_dir, "category_association.txt"),
+            "w",
+            encoding="utf-8",
+        ) as f:
+            f.write("=== REGLAS DE ASOCIACIÓN ENTRE CATEGORÍAS ===\n\n")
+            f.write(f"Categorías con ventas: {category_results['num_categories']}\n")
+            f.write(f"Reglas generadas: {category_results['num_rules']}\n")
+            f.write(f"\nReglas de asociación (Top 20 por lift):\n")
+            for i, rule in enumerate(category_results["top_rules"], 1):
+                f.write(
+                    f"{i}. {rule['antecedent_name']} ({rule['antecedent']}) -> "
+                    f"{rule['consequent_name']} ({rule['consequent']}): "
+                    f"Support={rule['support']:.4f}, "
+                    f"Confidence={rule['confidence']:.4f}, "
+                    f"Lift={rule['lift']:.4f}\n"
+                )
+
+    # Guardar deriva de reglas por tienda y por mes
+    if drift_results:
+        with open(os.path.join(results_dir, "rule_drift.txt"), "w") as f:
+            f.write("=== DERIVA DE REGLAS ENTRE PARTICIONES ===\n\n")
+            f.write(
+                f"Umbrales: soporte >= {drift_results['min_support']}, "
+                f"confianza >= {drift_results['min_confidence']} (por partición)\n\n"
+            )
+            f.write(drift_results["summary"].to_string(index=False))
+            f.write("\n\nReglas con mayor variación de lift (Top 20):\n")
+            f.write(drift_results["top_drift"].to_string(index=False))
+            f.write("\n")
+
+    # === INFORME EJECUTIVO CONSOLIDADO ===
+    summary = stats_results["summary"]
+    with open(
+        os.path.join(results_dir, "INFORME_EJECUTIVO.txt"), "w", encoding="utf-8"
+    ) as f:
+        f.write("=" * 80 + "\n")
+        f.write(" " * 20 + "INFORME EJECUTIVO\n")
+        f.write(" " * 10 + "Análisis y Modelado Analítico de Transacciones\n")
+        f.write("=" * 80 + "\n\n")
+
+        # RESUMEN EJECUTIVO
+        f.write("1. RESUMEN EJECUTIVO\n")
+        f.write("-" * 80 + "\n\n")
+
+        total_ventas = summary["total_products"]
+        num_transacciones = summary["num_transactions"]
+
+        f.write(f"Total de ventas (unidades): {total_ventas:,}\n")
+        f.write(f"Número de transacciones: {num_transacciones:,}\n")
+        f.write(
+            f"Promedio de productos por transacción: {total_ventas/num_transacciones:.2f}\n"
+        )
+        f.write(f"Número de clientes únicos: {summary['num_customers']:,}\n")
+        f.write(f"Número de tiendas: {summary['num_stores']}\n\n")
+
+        # Top 10 productos
+        f.write("Top 10 Productos Más Vendidos:\n")
+        for i, (prod, count) in enumerate(
+            list(stats_results["product_frequencies"].items())[:10], 1
+        ):
+            f.write(f"  {i}. Producto {prod}: {count} ventas\n")
+
+        # Top 10 clientes
+        f.write("\nTop 10 Clientes:\n")
+        for i, (customer, count) in enumerate(
+            customer_results["top_customers"].items(), 1
+        ):
+            f.write(f"  {i}. Cliente {customer}: {count} transacciones\n")
+
+        # Días pico
+        f.write("\nTop 5 Días Pico de Compra:\n")
+        daily_sales_sorted = sorted(
+            temporal_results["daily_sales"].items(),
+            key=lambda x: x[1]["num_transactions"],
+            reverse=True,
+        )[:5]
+        for i, (date, stats) in enumerate(daily_sales_sorted, 1):
+            f.write(f"  {i}. {date}: {stats['num_transactions']} transacciones\n")
+
+        # Categorías más rentables
+        f.write("\nTop 5 Categorías por Volumen:\n")
+        for i, (cat, count) in enumerate(
+            list(stats_results["categorical"]["category_counts"].items())[:5], 1
+        ):
+            freq = stats_results["categorical"]["category_frequencies"][cat]
+            f.write(f"  {i}. Categoría {cat}: {count} productos ({freq}%)\n")
+
+        # ANÁLISIS DESCRIPTIVO
+        f.write("\n\n2. ANÁLISIS DESCRIPTIVO\n")
+        f.write("-" * 80 + "\n\n")
+
+        f.write("2.1 Análisis Temporal\n")
+        f.write(
+            "  - Tendencia: Se identificaron patrones de venta diarios y semanales.\n"
+        )
+        f.write(
+            f"  - Promedio de transacciones diarias: {temporal_results['daily_stats']['mean_daily_transactions']:.2f}\n"
+        )
+        f.write(f"  - Día de la semana con más ventas: ")
+        day_sales = temporal_results["day_of_week_sales"]
+        max_day = max(day_sales.items(), key=lambda x: x[1]["num_transactions"])
+        f.write(f"{max_day[0]} ({max_day[1]['num_transactions']} transacciones)\n")
+
+        f.write("\n2.2 Análisis de Clientes\n")
+        f.write(
+            f"  - Frecuencia promedio de compra: {customer_results['purchase_frequency']['mean']:.2f} transacciones\n"
+        )
+        if customer_results["time_between_purchases"]:
+            f.write(
+                f"  - Tiempo promedio entre compras: {customer_results['time_between_purchases']['mean_days']:.2f} días\n"
+            )
+
+        # ANÁLISIS AVANZADO - CLUSTERING
+        f.write("\n\n3. ANÁLISIS AVANZADO: SEGMENTACIÓN DE CLIENTES (K-MEANS)\n")
+        f.write("-" * 80 + "\n\n")
+
+        if "clustering" in customer_results:
+            f.write("Se aplicó clustering K-Means con 4 grupos basados en:\n")
+            f.write("  - Frecuencia de compra\n")
+            f.write("  - Volumen total de productos\n")
+            f.write("  - Número de productos distintos\n")
+            f.write("  - Diversidad de categorías compradas\n\n")
+
+            for cluster_name, profile in customer_results["clustering"][
+                "cluster_profiles"
+            ].items():
+                f.write(
+                    f"{cluster_name} ({profile['size']} clientes, {profile['size']/summary['num_customers']*100:.1f}%):\n"
+                )
+                f.write(f"  {profile['description']}\n")
+                f.write(f"  - Frecuencia: {profile['avg_frequency']:.2f}\n")
+                f.write(f"  - Volumen: {profile['avg_total_volume']:.2f}\n")
+                f.write(
+                    f"  - Productos distintos: {profile['avg_distinct_products']:.2f}\n"
+                )
+                f.write(
+                    f"  - Diversidad de categorías: {profile['avg_category_diversity']:.2f}\n\n"
+                )
+
+        # ANÁLISIS AVANZADO - RECOMENDACIONES
+        f.write("\n4. ANÁLISIS AVANZADO: SISTEMA DE RECOMENDACIÓN\n")
+        f.write("-" * 80 + "\n\n")
+
+        f.write(
+            "Sistema basado en reglas de asociación (Market Basket Analysis):\n"
+        )
+        f.write(
+            f"  - Items frecuentes identificados: {len(association_results['frequent_items'])}\n"
+        )
+        f.write(
+            f"  - Reglas de asociación generadas: {len(association_results['top_rules'])}\n\n"
+        )
+
+        f.write("Ejemplos de recomendaciones:\n")
+        if recommendation_results:
+            # Ejemplo de recomendación para cliente
+            if recommendation_results["customer_recommendations_examples"]:
+                first_customer = list(
+                    recommendation_results[
+                        "customer_recommendations_examples"
+                    ].keys()
+                )[0]
+                recs = recommendation_results["customer_recommendations_examples"][
+                    first_customer
+                ]
+                f.write(f"\n  Cliente {first_customer}:\n")
+                for rec in recs[:3]:
+                    f.write(
+                        f"    → Producto {rec['product']} (relevancia: {rec['score']:.2f})\n"
+                    )
+
+            # Ejemplo de recomendación para producto
+            if recommendation_results["product_recommendations_examples"]:
+                first_product = list(
+                    recommendation_results[
+                        "product_recommendations_examples"
+                    ].keys()
+                )[0]
+                recs = recommendation_results["product_recommendations_examples"][
+                    first_product
+                ]
+                f.write(f"\n  Producto {first_product}:\n")
+                for rec in recs[:3]:
+                    f.write(
+                        f"    → Producto {rec['product']} (lift: {rec['lift']:.2f})\n"
+                    )
+
+        # PRINCIPALES HALLAZGOS
+        f.write("\n\n5. PRINCIPALES HALLAZGOS\n")
+        f.write("-" * 80 + "\n\n")
+
+        f.write(
+            "• Patrones temporales: Existen días específicos con mayor actividad de compra.\n"
+        )
+        f.write(
+            "• Segmentación clara: Se identificaron 4 grupos de clientes con comportamientos distintos.\n"
+        )
+        f.write(
+            "• Productos complementarios: Se detectaron productos que frecuentemente se compran juntos.\n"
+        )
+        f.write(
+            "• Oportunidades de cross-selling: El sistema de recomendación identifica productos relevantes.\n"
+        )
+
+        # RECOMENDACIONES DE NEGOCIO
+        f.write("\n\n6. RECOMENDACIONES DE NEGOCIO\n")
+        f.write("-" * 80 + "\n\n")
+
+        if "clustering" in customer_results:
+            for cluster_name, profile in customer_results["clustering"][
+                "cluster_profiles"
+            ].items():
+                f.write(f"\n{cluster_name}:\n")
+                if "VIP" in cluster_name or "Alto Valor" in cluster_name:
+                    f.write("  - Implementar programa de lealtad premium\n")
+                    f.write("  - Ofrecer descuentos por volumen\n")
+                    f.write("  - Comunicación personalizada prioritaria\n")
+                elif "Frecuente" in cluster_name:
+                    f.write("  - Incentivar aumento de ticket promedio\n")
+                    f.write("  - Promociones en categorías complementarias\n")
+                    f.write("  - Gamificación para aumentar engagement\n")
+                elif "Gran Comprador" in cluster_name:
+                    f.write("  - Aumentar frecuencia con recordatorios\n")
+                    f.write("  - Facilitar proceso de recompra\n")
+                    f.write("  - Suscripción o pedidos recurrentes\n")
+                else:
+                    f.write("  - Campañas de reactivación\n")
+                    f.write("  - Ofertas de entrada atractivas\n")
+                    f.write("  - Comunicación menos frecuente pero relevante\n")
+
+        f.write("\nEstrategias de merchandising:\n")
+        f.write(
+            "  - Colocar productos complementarios cercanos (según reglas de asociación)\n"
+        )
+        f.write("  - Implementar recomendaciones en punto de venta\n")
+        f.write(
+            "  - Diseñar combos basados en productos frecuentemente comprados juntos\n"
+        )
+
+        f.write("\n\n7. CONCLUSIONES\n")
+        f.write("-" * 80 + "\n\n")
+
+        f.write(
+            "El análisis reveló patrones significativos en el comportamiento de compra que pueden\n"
+        )
+        f.write(
+            "ser aprovechados para mejorar la estrategia comercial. La segmentación de clientes\n"
+        )
+        f.write(
+            "permite personalizar la experiencia y maximizar el valor de cada grupo. El sistema\n"
+        )
+        f.write(
+            "de recomendación basado en reglas de asociación ofrece oportunidades claras de\n"
+        )
+        f.write("cross-selling y up-selling.\n\n")
+
+        f.write("=" * 80 + "\n")
+        f.write("Fin del informe\n")
+        f.write("=" * 80 + "\n")
+
+
+# Nombre base de cada resultado (mismo nombre que su informe `.txt`)
+RESULT_FILENAMES = {
+    "review": "data_review",
+    "stats": "descriptive_stats",
+    "temporal": "temporal_analysis",
+    "customer": "customer_analysis",
+    "association": "product_association",
+    "recommendation": "recommendations",
+    "category": "category_association",
+    "drift": "rule_drift",
+}
+
+
+def to_json_compatible(value):
+    """
+    Convierte resultados (dicts con tipos numpy/pandas) a tipos JSON.
+    """
+    if isinstance(value, dict):
+        return {str(key): to_json_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_compatible(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return to_json_compatible(value.to_dict("records"))
+    if isinstance(value, (pd.Series, np.ndarray)):
+        return to_json_compatible(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def result_tables(results):
+    """
+    Tablas de resultados para Parquet: {nombre de archivo: DataFrame}.
+    """
+    tables = {
+        "product_association_rules": pd.DataFrame(
+            results["association"]["top_rules"]
+        ),
+        "daily_sales": pd.DataFrame.from_dict(
+            results["temporal"]["daily_sales"], orient="index"
+        )
+        .rename_axis("date")
+        .reset_index(),
+    }
+    clustering = results["customer"].get("clustering")
+    if clustering:
+        tables["cluster_profiles"] = (
+            pd.DataFrame.from_dict(clustering["cluster_profiles"], orient="index")
+            .rename_axis("cluster")
+            .reset_index()
+        )
+    if results.get("category"):
+        tables["category_association_rules"] = pd.DataFrame(
+            results["category"]["top_rules"]
+        )
+    if results.get("drift"):
+        tables["rule_drift_summary"] = results["drift"]["summary"]
+        tables["rule_drift_top"] = results["drift"]["top_drift"].rename_axis(
+            columns=None
+        )
+    return tables
+
+
+def write_machine_readable(results_dir, results):
+    """
+    Escribe cada resultado como `<nombre>.json` y las tablas como Parquet.
+    """
+    for key, filename in RESULT_FILENAMES.items():
+        if results.get(key) is None:
+            continue
+        with open(
+            os.path.join(results_dir, f"{filename}.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(
+                to_json_compatible(results[key]), f, ensure_ascii=False, indent=2
+            )
+    for name, table in result_tables(results).items():
+        table.to_parquet(os.path.join(results_dir, f"{name}.parquet"), index=False)
@@ -0,0 +1,193 @@
+"""
+Almacén de resultados consultable (SQLite, biblioteca estándar).
+
+Cada ejecución del DAG guarda sus resultados versionados por `run_id`:
+
+- `runs`: una fila por ejecución (fecha, huella del dataset y umbrales).
+- `results`: cada dict de resultados como JSON, por (run_id, nombre).
+- `result_tables`: las tablas de resultados (reglas top, ventas diarias,
+  perfiles de clusters, drift...) como JSON, por (run_id, nombre).
+- `rules`: el conjunto completo de reglas de asociación de productos, con
+  índices para buscar por antecedente u ordenar por lift sin cargarlas todas.
+
+La app y las herramientas ad hoc consultan la última ejecución (o una
+concreta) en lugar de recalcular a partir de las transacciones.
+"""
+
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from pipeline.report import to_json_compatible
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    dataset_fingerprint TEXT,
+    min_support REAL,
+    min_confidence REAL
+);
+CREATE INDEX IF NOT EXISTS runs_by_fingerprint
+    ON runs (dataset_fingerprint, created_at);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS result_tables (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS rules (
+    run_id TEXT NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    antecedent TEXT NOT NULL,
+    consequent TEXT NOT NULL,
+    support REAL NOT NULL,
+    confidence REAL NOT NULL,
+    lift REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rules_by_antecedent
+    ON rules (run_id, antecedent, lift DESC);
+CREATE INDEX IF NOT EXISTS rules_by_lift ON rules (run_id, lift DESC);
+"""
+
+
+def connect(db_path):
+    """
+    Conexión al almacén (crea el esquema si no existe).
+    """
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def save_run(
+    db_path,
+    run_id,
+    results,
+    tables,
+    rules=None,
+    fingerprint=None,
+    min_support=None,
+    min_confidence=None,
+):
+    """
+    Guarda los resultados de una ejecución en una sola transacción. Si el
+    run_id ya existe (reintento de save_results) se reemplaza por completo.
+
+    `results` es {nombre: dict de resultados} (los None se omiten), `tables`
+    {nombre: DataFrame} y `rules` el DataFrame completo de reglas.
+    """
+    with closing(connect(db_path)) as connection, connection:
+        connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        connection.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+            (
+                run_id,
+                datetime.now(timezone.utc).isoformat(),
+                fingerprint,
+                min_support,
+                min_confidence,
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO results VALUES (?, ?, ?)",
+            [
+                (run_id, name, json.dumps(to_json_compatible(value)))
+                for name, value in results.items()
+                if value is not None
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO result_tables VALUES (?, ?, ?)",
+            [
+                (run_id, name, table.to_json(orient="split", index=False))
+                for name, table in tables.items()
+            ],
+        )
+        if rules is not None and len(rules):
+            connection.executemany(
+                "INSERT INTO rules VALUES (?, ?, ?, ?, ?, ?)",
+                zip(
+                    [run_id] * len(rules),
+                    rules["antecedent"].astype(str),
+                    rules["consequent"].astype(str),
+                    rules["support"].astype(float),
+                    rules["confidence"].astype(float),
+                    rules["lift"].astype(float),
+                ),
+            )
+
+
+def latest_run(db_path, fingerprint=None):
+    """
+    Última ejecución guardada (opcionalmente de un dataset concreto), como
+    dict con las columnas de `runs`, o None si no hay ninguna.
+    """
+    query = "SELECT * FROM runs"
+    params = ()
+    if fingerprint is not None:
+        query += " WHERE dataset_fingerprint = ?"
+        params = (fingerprint,)
+    query += " ORDER BY created_at DESC LIMIT 1"
+    with closing(connect(db_path)) as connection:
+        connection.row_factory = sqlite3.Row
+        row = connection.execute(query, params).fetchone()
+    return dict(row) if row is not None else None
+
+
+def load_result(db_path, run_id, name):
+    """
+    Dict de resultados `name` (p. ej. "stats", "customer") de una ejecución.
+    """
+    with closing(connect(db_path)) as connection:
+        row = connection.execute(
+            "SELECT payload FROM results WHERE run_id = ? AND name = ?",
+            (run_id, name),
+        ).fetchone()
+    return json.loads(row[0]) if row is not None else None
+
+
+def load_table(db_path, run_id, name):
+    """
+    Tabla de resultados `name` de una ejecución como DataFrame.
+    """
+    with closing(connect(db_path)) as connection:
+        row = connection.execute(
+            "SELECT payload FROM result_tables WHERE run_id = ? AND name = ?",
+            (run_id, name),
+        ).fetchone()
+    if row is None:
+        return None
+    payload = json.loads(row[0])
+    return pd.DataFrame(payload["data"], columns=payload["columns"])
+
+
+def query_rules(db_path, run_id, antecedent=None, limit=None):
+    """
+    Reglas de una ejecución ordenadas por lift (desc), opcionalmente solo
+    las de un antecedente. Usa los índices de `rules`.
+    """
+    query = (
+        "SELECT antecedent, consequent, support, confidence, lift "
+        "FROM rules WHERE run_id = ?"
+    )
+    params = [run_id]
+    if antecedent is not None:
+        query += " AND antecedent = ?"
+        params.append(str(antecedent))
+    query += " ORDER BY lift DESC, consequent"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    with closing(connect(db_path)) as connection:
+        return pd.read_sql_query(query, connection, params=params)
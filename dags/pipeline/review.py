@@ -0,0 +1,204 @@
+"""
+Revisión de calidad de un DataFrame: tipos, nulos y filas duplicadas.
+
+- Tipos y nulos en una sola pasada por columnas; las columnas que no pueden
+  contener nulos (enteros y booleanos de NumPy) no se recorren.
+- Duplicados exactos con hashes de 64 bits por fila (`hash_pandas_object`)
+  construidos columna a columna: primero las baratas de hashear (números,
+  fechas) y, de las de texto, antes las más variadas y cortas (p. ej.
+  `customer`). En cuanto las columnas hasheadas casi distinguen las filas de
+  una muestra, solo siguen las filas cuyo hash parcial coincide con el de
+  otra, así que las cadenas largas (p. ej. `products`) se hashean solo para
+  unas pocas. Los candidatos finales se comparan con `DataFrame.duplicated`,
+  por lo que el resultado es exacto aunque haya colisiones de hash.
+- Modo aproximado para entradas muy grandes: por bloques, se hashean las
+  columnas del primer grupo (las que ya casi distinguen las filas) y se
+  conservan las filas de hash menor que un umbral (una fracción fija del
+  espacio de hashes). Las filas iguales tienen el mismo hash, así que cada
+  grupo de duplicados entra completo o no entra: los duplicados exactos de la
+  muestra divididos por la fracción estiman sin sesgo los del total, con
+  memoria proporcional a la muestra y no a la entrada.
+
+Cada comprobación se mide como sub-paso (`pipeline.metrics.measure`).
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from pipeline.metrics import measure
+
+REVIEW_MODES = ("auto", "exact", "approximate")
+
+# En modo "auto", filas a partir de las cuales se usa el modo aproximado
+REVIEW_EXACT_MAX_ROWS = 20_000_000
+
+# Filas (esperadas) de la muestra del modo aproximado
+REVIEW_SAMPLE_ROWS = 1_000_000
+
+# Filas hasheadas por bloque en el modo aproximado
+REVIEW_CHUNK_ROWS = 1_000_000
+
+# Filas de la muestra para ordenar las columnas (longitud, variedad)
+ORDER_SAMPLE_ROWS = 1000
+
+# Fracción de filas distintas en la muestra a partir de la cual se filtran
+# los candidatos
+FILTER_MIN_DISTINCT = 0.9
+
+_HASH_MULTIPLIER = np.uint64(1000003)
+
+
+def resolve_review_mode(mode, num_rows):
+    """
+    Modo efectivo ("exact" o "approximate") para `mode` y el tamaño de entrada.
+    """
+    if mode not in REVIEW_MODES:
+        raise ValueError(
+            f"Unknown review mode {mode!r}, expected one of {REVIEW_MODES}"
+        )
+    if mode == "auto":
+        return "approximate" if num_rows > REVIEW_EXACT_MAX_ROWS else "exact"
+    return mode
+
+
+def null_counts(df):
+    """
+    {columna: nulos} en una pasada por columnas, sin recorrer las de tipos que
+    no admiten nulos.
+    """
+    nulls = {}
+    for column in df.columns:
+        series = df[column]
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "biu":
+            nulls[column] = 0
+        elif isinstance(dtype, np.dtype) and dtype.kind in "mM":
+            nulls[column] = int(np.isnat(series.to_numpy()).sum())
+        elif isinstance(dtype, np.dtype) and dtype.kind == "f":
+            nulls[column] = int(np.isnan(series.to_numpy()).sum())
+        else:
+            nulls[column] = int(series.isna().sum())
+    return nulls
+
+
+def _hash_steps(df):
+    """
+    Grupos de columnas a hashear antes de cada filtrado de candidatos: las de
+    tipo fijo y después las de texto (primero las variadas, y entre ellas las
+    cortas), cortando un grupo cuando sus columnas acumuladas distinguen casi
+    todas las filas de una muestra repartida por el DataFrame.
+    """
+    sample = df.iloc[:: max(1, len(df) // ORDER_SAMPLE_ROWS)]
+    object_columns = [c for c in df.columns if df[c].dtype == object]
+    fixed_columns = [c for c in df.columns if c not in set(object_columns)]
+    texts = {column: sample[column].astype(str) for column in object_columns}
+    object_columns.sort(
+        key=lambda c: (
+            texts[c].nunique() < FILTER_MIN_DISTINCT * len(sample),
+            texts[c].str.len().mean(),
+        )
+    )
+
+    steps, group = [], []
+    for column in fixed_columns + object_columns:
+        group.append(column)
+        accumulated = [c for step in steps for c in step] + group
+        distinct = len(sample) - sample.duplicated(subset=accumulated).sum()
+        if distinct >= FILTER_MIN_DISTINCT * len(sample):
+            steps.append(group)
+            group = []
+    if group:
+        steps.append(group)
+    return steps
+
+
+def _column_hashes(data):
+    """
+    Hash uint64 por fila de una Serie o DataFrame. Normaliza -0.0 y NaN en
+    columnas float para que valores iguales según `duplicated` tengan el
+    mismo hash.
+    """
+    if isinstance(data, pd.DataFrame):
+        floats = [c for c in data.columns if data[c].dtype.kind == "f"]
+        if floats:
+            data = data.assign(**{c: data[c] + 0.0 for c in floats})
+    elif data.dtype.kind == "f":
+        data = data + 0.0
+    return hash_pandas_object(data, index=False).to_numpy()
+
+
+def _combine(hashes, column_hashes):
+    return hashes * _HASH_MULTIPLIER ^ column_hashes
+
+
+def count_duplicates_exact(df):
+    """
+    Filas duplicadas (como `df.duplicated().sum()`) filtrando candidatos por
+    hashes parciales y verificando solo esos.
+    """
+    num_rows = len(df)
+    if num_rows < 2 or len(df.columns) == 0:
+        return int(df.duplicated().sum())
+
+    rows = np.arange(num_rows)
+    hashes = np.zeros(num_rows, dtype=np.uint64)
+    for columns in _hash_steps(df):
+        subset = df[columns] if len(rows) == num_rows else df[columns].iloc[rows]
+        data = subset if len(columns) > 1 else subset[columns[0]]
+        hashes = _combine(hashes, _column_hashes(data))
+        candidates = pd.Series(hashes).duplicated(keep=False).to_numpy()
+        rows, hashes = rows[candidates], hashes[candidates]
+        if len(rows) == 0:
+            return 0
+    return int(df.iloc[rows].duplicated().sum())
+
+
+def estimate_duplicates(
+    df, sample_rows=REVIEW_SAMPLE_ROWS, chunk_rows=REVIEW_CHUNK_ROWS
+):
+    """
+    Estimación de filas duplicadas con una muestra por hash de las columnas
+    del primer grupo. Devuelve (estimación, fracción muestreada).
+    """
+    num_rows = len(df)
+    if num_rows <= sample_rows or len(df.columns) == 0:
+        return count_duplicates_exact(df), 1.0
+
+    fraction = sample_rows / num_rows
+    threshold = np.uint64(int(fraction * 2.0**64))
+    key_columns = _hash_steps(df)[0]
+    sampled = []
+    for start in range(0, num_rows, chunk_rows):
+        chunk = df.iloc[start : start + chunk_rows]
+        data = chunk[key_columns] if len(key_columns) > 1 else chunk[key_columns[0]]
+        sampled.append(start + np.flatnonzero(_column_hashes(data) <= threshold))
+    duplicates = count_duplicates_exact(df.iloc[np.concatenate(sampled)])
+    return int(round(duplicates / fraction)), fraction
+
+
+def review_frame(df, name, mode="exact", timings=None):
+    """
+    Estructura, tipos, nulos y duplicados de `df`. Con `mode="approximate"`
+    los duplicados son una estimación (se indica la fracción muestreada).
+    Si se pasa `timings`, se rellena con los segundos de cada comprobación.
+    """
+    review = {
+        "num_records": len(df),
+        "num_columns": len(df.columns),
+        "columns": df.columns.tolist(),
+    }
+    with measure(f"{name}.dtypes_nulls", rows=len(df)) as nulls_step:
+        review["dtypes"] = {k: str(v) for k, v in df.dtypes.to_dict().items()}
+        review["nulls"] = null_counts(df)
+    with measure(f"{name}.duplicates", rows=len(df)) as duplicates_step:
+        if mode == "approximate":
+            duplicates, fraction = estimate_duplicates(df)
+            review["duplicates"] = duplicates
+            review["duplicates_sample_fraction"] = round(fraction, 6)
+        else:
+            review["duplicates"] = count_duplicates_exact(df)
+    if timings is not None:
+        timings["dtypes_nulls"] = nulls_step["wall_seconds"]
+        timings["duplicates"] = duplicates_step["wall_seconds"]
+    return review
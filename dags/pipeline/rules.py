@@ -0,0 +1,568 @@
+"""
+Reglas de asociación (Apriori de pares) y su caché en disco.
+
+El DAG guarda el conjunto completo de reglas en `RULES_DIR`, identificado por
+la huella del dataset (hash del contenido de los archivos de Transactions),
+la versión del código que cuenta pares y genera reglas (`rules_code_version`)
+y los umbrales `min_support` / `min_confidence`. La aplicación Streamlit carga
+esas reglas directamente y, para umbrales sin caché, lanza
+`compute_rules_for_files` en segundo plano.
+
+Además se guarda la tabla de conteos de items y pares al soporte base
+(`BASE_SUPPORT`): las reglas de cualquier umbral mayor se obtienen de ella
+con máscaras vectorizadas (`rules_from_pair_table`), sin volver a contar.
+
+Minería por particiones: las mismas reglas por tienda y por mes, sobre
+subconjuntos de las canastas ya codificadas (`mine_partition`), y la deriva
+de las reglas entre particiones respecto al conjunto global (`rule_drift`).
+
+Este módulo solo depende de numpy/pandas para poder usarse tanto en el DAG
+como en la aplicación Streamlit.
+"""
+
+import hashlib
+import importlib
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from pipeline.artifacts import STALE_TMP_SECONDS, code_version
+from pipeline.kernels import encode_baskets, select_baskets
+
+RULE_COLUMNS = ["antecedent", "consequent", "support", "confidence", "lift"]
+
+# Soporte mínimo con el que se guarda la tabla de conteos de pares: cualquier
+# umbral mayor se obtiene filtrando esa tabla
+BASE_SUPPORT = 0.001
+
+# Pares generados por bloque al contar co-ocurrencias (acota la memoria)
+PAIR_CHUNK_SIZE = 20_000_000
+
+# Particiones de la minería por partes: arrays (etiquetas, índice por
+# transacción) de las canastas codificadas
+PARTITION_KINDS = {
+    "store": ("stores", "store_index"),
+    "month": ("months", "month_index"),
+}
+
+
+def dataset_fingerprint(file_hashes):
+    """
+    Huella del dataset: hash de los hashes de contenido de sus archivos
+    (independiente del orden y de la ubicación de los archivos).
+    """
+    digest = hashlib.sha256()
+    for file_hash in sorted(file_hashes):
+        digest.update(file_hash.encode())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def rules_code_version():
+    """
+    Versión del código de este módulo y del backend de bitsets (también
+    produce la tabla de pares): un cambio en cualquiera de los dos deja de
+    encontrar los archivos guardados con la versión anterior.
+    """
+    bitsets = importlib.import_module("pipeline.bitsets")
+    return code_version(sys.modules[__name__], bitsets)[:12]
+
+
+def _store_prefix(fingerprint):
+    return f"{fingerprint[:16]}_{rules_code_version()}"
+
+
+def rules_path(rules_dir, fingerprint, min_support, min_confidence):
+    return os.path.join(
+        rules_dir,
+        f"{_store_prefix(fingerprint)}"
+        f"_s{min_support:.4f}_c{min_confidence:.4f}.parquet",
+    )
+
+
+def item_counts_path(rules_dir, fingerprint):
+    return os.path.join(rules_dir, f"{_store_prefix(fingerprint)}_items.parquet")
+
+
+def pairs_path(rules_dir, fingerprint, base_support=BASE_SUPPORT):
+    return os.path.join(
+        rules_dir, f"{_store_prefix(fingerprint)}_pairs_b{base_support:.4f}.npz"
+    )
+
+
+def partition_rules_path(
+    rules_dir, fingerprint, kind, key, min_support, min_confidence
+):
+    return os.path.join(
+        rules_dir,
+        f"{_store_prefix(fingerprint)}_{kind}-{key}"
+        f"_s{min_support:.4f}_c{min_confidence:.4f}.parquet",
+    )
+
+
+def prune_rules(rules_dir, fingerprint):
+    """
+    Elimina los archivos de `rules_dir` de otros datasets o de otra versión
+    del código (y las escrituras abandonadas). Devuelve (archivos, bytes).
+    """
+    if not os.path.isdir(rules_dir):
+        return 0, 0
+    keep_prefix = f"{_store_prefix(fingerprint)}_"
+    removed, freed = 0, 0
+    now = time.time()
+    for filename in os.listdir(rules_dir):
+        path = os.path.join(rules_dir, filename)
+        if filename.startswith(".tmp-"):
+            # Escritura en curso (p. ej. recálculo en segundo plano de la app)
+            if now - os.path.getmtime(path) < STALE_TMP_SECONDS:
+                continue
+        elif filename.startswith(keep_prefix):
+            continue
+        freed += os.path.getsize(path)
+        os.remove(path)
+        removed += 1
+    return removed, freed
+
+
+def distinct_basket_items(baskets):
+    """
+    (basket_index, product_ids) sin productos repetidos dentro de una canasta,
+    ordenados por canasta y producto.
+    """
+    product_ids = baskets["product_ids"]
+    basket_index = np.repeat(
+        np.arange(len(baskets["basket_lengths"]), dtype=np.int64),
+        baskets["basket_lengths"],
+    )
+    order = np.lexsort((product_ids, basket_index))
+    basket_index, product_ids = basket_index[order], product_ids[order]
+    keep = np.ones(len(product_ids), dtype=bool)
+    keep[1:] = (basket_index[1:] != basket_index[:-1]) | (
+        product_ids[1:] != product_ids[:-1]
+    )
+    return basket_index[keep], product_ids[keep]
+
+
+def _count_pairs(basket_index, items, n_items, chunk_size=PAIR_CHUNK_SIZE):
+    """
+    Conteo de pares (a < b) de items densos que co-ocurren en una canasta.
+    Cada elemento se empareja con los que le siguen en su canasta; los pares
+    se generan por bloques con aritmética de rangos, sin bucles por canasta.
+    """
+    n = len(items)
+    if n == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, basket_index[1:] != basket_index[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    reps = np.repeat(starts + sizes, sizes) - np.arange(n) - 1
+
+    # Cortes entre bloques: cada bloque genera unos chunk_size pares
+    cumulative = np.cumsum(reps)
+    cuts = np.searchsorted(
+        cumulative, np.arange(chunk_size, cumulative[-1], chunk_size)
+    )
+    bounds = np.unique(np.r_[0, cuts, n])
+
+    codes_list, counts_list = [], []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        r = reps[lo:hi]
+        total = int(r.sum())
+        if total == 0:
+            continue
+        first_b = np.repeat(np.arange(lo, hi) + 1, r)
+        offset = np.arange(total) - np.repeat(np.cumsum(r) - r, r)
+        codes = np.repeat(items[lo:hi], r) * n_items + items[first_b + offset]
+        codes, counts = np.unique(codes, return_counts=True)
+        codes_list.append(codes)
+        counts_list.append(counts)
+
+    if not codes_list:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    codes, inverse = np.unique(np.concatenate(codes_list), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate(counts_list))
+    return codes, counts.astype(np.int64)
+
+
+def pair_count_table(baskets, base_support=BASE_SUPPORT):
+    """
+    Conteos de items y de pares con soporte >= base_support.
+
+    Devuelve un dict de arrays: items / item_counts (todos los productos,
+    ordenados, y número de canastas que los contienen), pair_a / pair_b /
+    pair_counts (pares frecuentes, a < b) y num_transactions.
+    """
+    num_transactions = len(baskets["basket_lengths"])
+    basket_index, product_ids = distinct_basket_items(baskets)
+    counts = np.bincount(product_ids)
+    items = np.flatnonzero(counts)
+
+    # Un par nunca tiene más soporte que sus items: solo cuentan los frecuentes
+    frequent_items = np.flatnonzero(counts / num_transactions >= base_support)
+    dense = np.full(len(counts), -1, dtype=np.int64)
+    dense[frequent_items] = np.arange(len(frequent_items))
+    item_dense = dense[product_ids]
+    frequent = item_dense >= 0
+
+    codes, pair_counts = _count_pairs(
+        basket_index[frequent], item_dense[frequent], len(frequent_items)
+    )
+    keep = pair_counts / num_transactions >= base_support
+    pair_a, pair_b = np.divmod(codes[keep], max(len(frequent_items), 1))
+
+    return {
+        "items": items.astype(np.int32),
+        "item_counts": counts[items],
+        "pair_a": frequent_items[pair_a].astype(np.int32),
+        "pair_b": frequent_items[pair_b].astype(np.int32),
+        "pair_counts": pair_counts[keep],
+        "num_transactions": np.int64(num_transactions),
+        "base_support": np.float64(base_support),
+    }
+
+
+def save_pair_table(path, table):
+    directory, filename = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}-{filename}")
+    np.savez(tmp_path, **table)
+    os.replace(tmp_path, path)
+
+
+def load_pair_table(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def category_pair_table(cooccurrence, base_support=0.0):
+    """
+    Tabla de pares (mismo formato que pair_count_table) a partir de la matriz
+    de co-ocurrencia de categorías, para generar reglas entre categorías con
+    rules_from_pair_table.
+    """
+    matrix = cooccurrence["matrix"]
+    num_transactions = int(cooccurrence["num_transactions"])
+    item_counts = np.diag(matrix)
+    items = np.flatnonzero(item_counts)
+    pair_a, pair_b = np.triu_indices(len(matrix), k=1)
+    pair_counts = matrix[pair_a, pair_b]
+    keep = (pair_counts > 0) & (pair_counts / num_transactions >= base_support)
+    return {
+        "items": items.astype(np.int32),
+        "item_counts": item_counts[items],
+        "pair_a": pair_a[keep].astype(np.int32),
+        "pair_b": pair_b[keep].astype(np.int32),
+        "pair_counts": pair_counts[keep],
+        "num_transactions": np.int64(num_transactions),
+        "base_support": np.float64(base_support),
+    }
+
+
+def rules_from_pair_table(table, min_support, min_confidence):
+    """
+    Reglas A -> B y B -> A para cualquier min_support >= base_support,
+    calculadas con máscaras vectorizadas sobre la tabla de pares.
+    Devuelve un DataFrame con RULE_COLUMNS (A -> B seguida de B -> A por par).
+    """
+    if min_support < table["base_support"]:
+        raise ValueError(
+            f"min_support {min_support} is below the table base support "
+            f"{float(table['base_support'])}"
+        )
+    n = table["num_transactions"]
+    keep = table["pair_counts"] / n >= min_support
+    pair_a, pair_b = table["pair_a"][keep], table["pair_b"][keep]
+    count_ab = table["pair_counts"][keep]
+    # `items` está ordenado: el conteo de cada item se busca con searchsorted
+    count_a = table["item_counts"][np.searchsorted(table["items"], pair_a)]
+    count_b = table["item_counts"][np.searchsorted(table["items"], pair_b)]
+
+    # Columnas (A -> B, B -> A) aplanadas por filas: ambas reglas de un par
+    # quedan contiguas, como en el recorrido original por pares
+    antecedent = np.column_stack([pair_a, pair_b]).ravel()
+    consequent = np.column_stack([pair_b, pair_a]).ravel()
+    support = np.repeat(count_ab, 2) / n
+    confidence = np.repeat(count_ab, 2) / np.column_stack([count_a, count_b]).ravel()
+    lift = confidence / (np.column_stack([count_b, count_a]).ravel() / n)
+
+    valid = confidence >= min_confidence
+    return pd.DataFrame(
+        {
+            "antecedent": antecedent[valid].astype(str),
+            "consequent": consequent[valid].astype(str),
+            "support": support[valid],
+            "confidence": confidence[valid],
+            "lift": lift[valid],
+        }
+    )
+
+
+def rule_count_curve(table, supports, min_confidence):
+    """
+    Número de reglas con confianza >= min_confidence para cada umbral de soporte.
+    """
+    rules = rules_from_pair_table(table, float(table["base_support"]), min_confidence)
+    rule_supports = np.sort(rules["support"].to_numpy())
+    supports = np.asarray(supports, dtype=np.float64)
+    return len(rule_supports) - np.searchsorted(rule_supports, supports, side="left")
+
+
+def top_rules(rules, k, column="lift"):
+    """
+    Las k reglas con mayor `column`, de mayor a menor, sin ordenar el conjunto
+    completo: argpartition selecciona las candidatas y solo se ordenan esas.
+    Los empates conservan el orden de `rules`.
+    """
+    values = rules[column].to_numpy()
+    if 0 < k < len(values):
+        kth = values[np.argpartition(-values, k - 1)[:k]].min()
+        # Todas las reglas empatadas con la k-ésima, para un orden determinista
+        candidates = np.flatnonzero(values >= kth)
+    else:
+        candidates = np.arange(len(values))
+    order = candidates[np.argsort(-values[candidates], kind="stable")][:k]
+    return rules.iloc[order].reset_index(drop=True)
+
+
+def rule_partitions(baskets):
+    """
+    Particiones para la minería por partes: [(kind, key)] con una por tienda
+    y una por mes (AAAAMM) de las canastas codificadas.
+    """
+    return [
+        (kind, baskets[labels_key][i].item())
+        for kind, (labels_key, _) in PARTITION_KINDS.items()
+        for i in range(len(baskets[labels_key]))
+    ]
+
+
+def partition_label(kind, key):
+    if kind == "month":
+        return f"month {key // 100}-{key % 100:02d}"
+    return f"{kind} {key}"
+
+
+def mine_partition(baskets, kind, key, min_support, min_confidence):
+    """
+    Reglas de una partición (tienda o mes) sobre el subconjunto de canastas
+    ya codificadas. El soporte es relativo a las transacciones de la partición.
+    Devuelve (rules, num_transactions).
+    """
+    if kind not in PARTITION_KINDS:
+        raise ValueError(f"Unknown partition kind: {kind}")
+    labels_key, index_key = PARTITION_KINDS[kind]
+    labels = baskets[labels_key]
+    # Comparar índices (int16) en lugar de etiquetas por transacción
+    mask = np.isin(
+        baskets[index_key], np.flatnonzero(labels == labels.dtype.type(key))
+    )
+    subset = select_baskets(baskets, mask)
+    table = pair_count_table(subset, min_support)
+    return rules_from_pair_table(table, min_support, min_confidence), int(mask.sum())
+
+
+def rule_drift(global_rules, partition_rules):
+    """
+    Compara las reglas de cada partición con las globales.
+
+    `partition_rules` es un dict etiqueta -> DataFrame de reglas. Devuelve
+    (summary, lifts): por partición, número de reglas, compartidas con el
+    conjunto global, nuevas, ausentes, índice de Jaccard y cambio medio de
+    lift; y el lift de cada regla por partición con su rango (max - min),
+    ordenado de mayor a menor deriva.
+    """
+    frames = [global_rules.assign(partition="global")] + [
+        rules.assign(partition=label) for label, rules in partition_rules.items()
+    ]
+    lifts = pd.concat(frames, ignore_index=True).pivot_table(
+        index=["antecedent", "consequent"],
+        columns="partition",
+        values="lift",
+        aggfunc="first",
+    )
+    labels = list(partition_rules)
+    lifts = lifts.reindex(columns=["global"] + labels)
+
+    in_global = lifts["global"].notna()
+    summary = []
+    for label in labels:
+        in_partition = lifts[label].notna()
+        shared = in_partition & in_global
+        union = int((in_partition | in_global).sum())
+        summary.append(
+            {
+                "partition": label,
+                "rules": int(in_partition.sum()),
+                "shared": int(shared.sum()),
+                "new": int((in_partition & ~in_global).sum()),
+                "missing": int((in_global & ~in_partition).sum()),
+                "jaccard": shared.sum() / union if union else 1.0,
+                "mean_lift_change": (
+                    (lifts.loc[shared, label] - lifts.loc[shared, "global"])
+                    .abs()
+                    .mean()
+                ),
+            }
+        )
+
+    partition_lifts = lifts[labels]
+    lifts["partitions"] = partition_lifts.notna().sum(axis=1)
+    lifts["lift_range"] = partition_lifts.max(axis=1) - partition_lifts.min(axis=1)
+    lifts = lifts.sort_values("lift_range", ascending=False, kind="stable")
+    return pd.DataFrame(summary), lifts.reset_index()
+
+
+def mine_association_rules(transactions_list, min_support, min_confidence):
+    """
+    Apriori de pares sobre listas de productos con Counter (implementación
+    de referencia en Python puro; el pipeline usa pair_count_table).
+    Devuelve (rules, item_counts, frequent_items, frequent_pairs).
+    """
+    # Calcular frecuencia de itemsets individuales
+    item_counts = Counter()
+    for transaction in transactions_list:
+        for item in set(transaction):
+            item_counts[item] += 1
+
+    total_transactions = len(transactions_list)
+    frequent_items = {
+        item: count
+        for item, count in item_counts.items()
+        if count / total_transactions >= min_support
+    }
+
+    # Calcular pares frecuentes
+    pair_counts = Counter()
+    for transaction in transactions_list:
+        items = list(set(transaction))
+        for pair in combinations(sorted(items), 2):
+            pair_counts[pair] += 1
+
+    frequent_pairs = {
+        pair: count
+        for pair, count in pair_counts.items()
+        if count / total_transactions >= min_support
+    }
+
+    # Calcular reglas de asociación
+    rules = []
+    for (item_a, item_b), count_ab in frequent_pairs.items():
+        support_ab = count_ab / total_transactions
+        support_a = item_counts[item_a] / total_transactions
+        support_b = item_counts[item_b] / total_transactions
+
+        # Regla A -> B
+        confidence_ab = count_ab / item_counts[item_a]
+        lift_ab = confidence_ab / support_b
+
+        if confidence_ab >= min_confidence:
+            rules.append(
+                {
+                    "antecedent": item_a,
+                    "consequent": item_b,
+                    "support": float(support_ab),
+                    "confidence": float(confidence_ab),
+                    "lift": float(lift_ab),
+                }
+            )
+
+        # Regla B -> A
+        confidence_ba = count_ab / item_counts[item_b]
+        lift_ba = confidence_ba / support_a
+
+        if confidence_ba >= min_confidence:
+            rules.append(
+                {
+                    "antecedent": item_b,
+                    "consequent": item_a,
+                    "support": float(support_ab),
+                    "confidence": float(confidence_ba),
+                    "lift": float(lift_ba),
+                }
+            )
+
+    return rules, item_counts, frequent_items, frequent_pairs
+
+
+def _write_parquet(df, path):
+    # Escritura atómica: la app nunca lee un archivo a medio escribir
+    directory, filename = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}-{filename}")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def save_rules(rules_dir, fingerprint, min_support, min_confidence, rules, table):
+    """
+    Guarda el conjunto completo de reglas (tabla columnar) y los conteos de
+    productos de la tabla de pares.
+    """
+    path = rules_path(rules_dir, fingerprint, min_support, min_confidence)
+    _write_parquet(rules[RULE_COLUMNS], path)
+    _write_parquet(
+        pd.DataFrame(
+            {
+                "product": table["items"].astype(str),
+                "count": table["item_counts"],
+            }
+        ),
+        item_counts_path(rules_dir, fingerprint),
+    )
+    return path
+
+
+def load_rules(rules_dir, fingerprint, min_support, min_confidence):
+    """
+    Devuelve (rules_df, item_counts) o None si los umbrales no están en caché.
+    """
+    path = rules_path(rules_dir, fingerprint, min_support, min_confidence)
+    items_path = item_counts_path(rules_dir, fingerprint)
+    if not (os.path.exists(path) and os.path.exists(items_path)):
+        return None
+    items_df = pd.read_parquet(items_path)
+    item_counts = Counter(dict(zip(items_df["product"], items_df["count"].tolist())))
+    return pd.read_parquet(path), item_counts
+
+
+def _read_baskets(transactions_files):
+    # Solo la columna de productos de los CSV de Transactions
+    parts = [
+        encode_baskets(pd.read_csv(path, sep="|", header=None, usecols=[3])[3])
+        for path in transactions_files
+    ]
+    return {
+        "product_ids": np.concatenate([part[0] for part in parts]),
+        "basket_lengths": np.concatenate([part[1] for part in parts]),
+    }
+
+
+def compute_rules_for_files(
+    transactions_files, rules_dir, fingerprint, min_support, min_confidence
+):
+    """
+    Calcula y guarda las reglas leyendo directamente los CSV de Transactions.
+    Pensada para ejecutarse en un proceso aparte (recalculo bajo demanda).
+    """
+    table = pair_count_table(_read_baskets(transactions_files), min_support)
+    rules = rules_from_pair_table(table, min_support, min_confidence)
+    return save_rules(rules_dir, fingerprint, min_support, min_confidence, rules, table)
+
+
+def compute_pair_table_for_files(
+    transactions_files, rules_dir, fingerprint, base_support=BASE_SUPPORT
+):
+    """
+    Calcula y guarda la tabla de pares leyendo directamente los CSV de
+    Transactions (cuando el DAG aún no la ha publicado).
+    """
+    path = pairs_path(rules_dir, fingerprint, base_support)
+    baskets = _read_baskets(transactions_files)
+    save_pair_table(path, pair_count_table(baskets, base_support))
+    return path
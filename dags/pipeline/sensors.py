@@ -0,0 +1,64 @@
+"""
+Sensor de llegada de archivos de transacciones.
+"""
+
+from datetime import timedelta
+
+from airflow.sensors.base import BaseSensorOperator
+
+from pipeline.ingest import pending_files
+from pipeline.triggers import NewTransactionFilesTrigger
+
+
+class NewTransactionFilesSensor(BaseSensorOperator):
+    """
+    Espera CSVs nuevos o modificados en `directory` y devuelve sus paths.
+    Si no hay archivos pendientes se difiere al triggerer.
+    """
+
+    template_fields = ("directory", "store_dir")
+
+    def __init__(
+        self,
+        *,
+        directory,
+        store_dir,
+        pattern="*.csv",
+        settle_seconds=30.0,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.directory = directory
+        self.store_dir = store_dir
+        self.pattern = pattern
+        self.settle_seconds = settle_seconds
+
+    def _pending(self):
+        return pending_files(
+            self.directory, self.store_dir, self.pattern, self.settle_seconds
+        )
+
+    def poke(self, context):
+        return bool(self._pending())
+
+    def execute(self, context):
+        files = self._pending()
+        if files:
+            self.log.info(f"Found {len(files)} new transaction files")
+            return files
+
+        self.defer(
+            trigger=NewTransactionFilesTrigger(
+                directory=self.directory,
+                store_dir=self.store_dir,
+                pattern=self.pattern,
+                settle_seconds=self.settle_seconds,
+                poll_interval=self.poke_interval,
+            ),
+            method_name="execute_complete",
+            timeout=timedelta(seconds=self.timeout),
+        )
+
+    def execute_complete(self, context, event=None):
+        self.log.info(f"New transaction files: {event['files']}")
+        return event["files"]
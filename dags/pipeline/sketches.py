@@ -0,0 +1,195 @@
+"""
+Sketches combinables para estadísticas incrementales de transacciones.
+
+Cada archivo ingerido guarda sus sketches junto a su partición; los del
+dataset completo se obtienen combinando los de cada archivo, sin volver a
+leer transacciones ya ingeridas. Su tamaño no crece con el histórico:
+
+- Clientes y productos distintos: HyperLogLog (`HLL_PRECISION` bits de
+  índice, 2^p registros de un byte; error relativo típico 1.04 / sqrt(2^p)).
+  Se combinan con el máximo registro a registro.
+- Top clientes y productos: resúmenes Space-Saving de `TOP_CAPACITY`
+  elementos. Cada elemento guarda un conteo que es cota superior del real y
+  su error máximo (el real está en [count - error, count]); `floor` acota el
+  conteo de cualquier elemento que no esté en el resumen. Por archivo los
+  conteos son exactos; al combinar, un elemento ausente de un resumen suma el
+  `floor` de ese resumen.
+- Tamaño de canasta: histograma exacto (los tamaños son enteros pequeños),
+  que se combina sumando y da cuantiles exactos.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+from pipeline.kernels import histogram_quantiles
+
+HLL_PRECISION = 14
+
+# Elementos guardados por resumen Space-Saving
+TOP_CAPACITY = 1000
+
+BASKET_SIZE_QUANTILES = [0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def hll_registers(hashes, precision=HLL_PRECISION):
+    """
+    Registros HyperLogLog (uint8) de un array de hashes uint64.
+    """
+    registers = np.zeros(1 << precision, dtype=np.uint8)
+    if len(hashes) == 0:
+        return registers
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest_bits = 64 - precision
+    rest = hashes & np.uint64((1 << rest_bits) - 1)
+    # Posición del primer bit a 1 en los bits restantes (rest < 2^53: log2
+    # en float64 es exacto)
+    ranks = np.full(len(hashes), rest_bits + 1, dtype=np.uint8)
+    nonzero = rest > 0
+    ranks[nonzero] = rest_bits - np.floor(np.log2(rest[nonzero].astype(np.float64)))
+    np.maximum.at(registers, index, ranks)
+    return registers
+
+
+def hll_estimate(registers):
+    """
+    Número estimado de elementos distintos (con corrección para pocos elementos).
+    """
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return float(estimate)
+
+
+def hll_relative_error(precision=HLL_PRECISION):
+    return 1.04 / np.sqrt(1 << precision)
+
+
+def top_summary(items, counts, capacity=TOP_CAPACITY):
+    """
+    Resumen Space-Saving a partir de conteos exactos: los `capacity` más
+    frecuentes (sin error) y como `floor` el mayor conteo descartado.
+    """
+    order = np.argsort(-np.asarray(counts), kind="stable")
+    kept, dropped = order[:capacity], order[capacity:]
+    return {
+        "items": np.asarray(items)[kept],
+        "counts": np.asarray(counts, dtype=np.int64)[kept],
+        "errors": np.zeros(len(kept), dtype=np.int64),
+        "floor": int(np.asarray(counts)[dropped].max()) if len(dropped) else 0,
+    }
+
+
+def merge_top_summaries(summaries, capacity=TOP_CAPACITY):
+    """
+    Combina resúmenes Space-Saving (conteo y error de un elemento ausente de
+    un resumen = `floor` de ese resumen).
+    """
+    floors = sum(summary["floor"] for summary in summaries)
+    entries = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "item": summary["items"],
+                    # Exceso sobre el floor del propio resumen
+                    "count": summary["counts"] - summary["floor"],
+                    "error": summary["errors"] - summary["floor"],
+                }
+            )
+            for summary in summaries
+        ],
+        ignore_index=True,
+    )
+    merged = entries.groupby("item", sort=False).sum() + floors
+    merged = merged.sort_values("count", ascending=False, kind="stable")
+    dropped = merged["count"].iloc[capacity:]
+    kept = merged.iloc[:capacity]
+    return {
+        "items": kept.index.to_numpy(),
+        "counts": kept["count"].to_numpy(dtype=np.int64),
+        "errors": kept["error"].to_numpy(dtype=np.int64),
+        "floor": max(floors, int(dropped.max()) if len(dropped) else 0),
+    }
+
+
+def top_items(summary, n):
+    """
+    [(elemento, conteo máximo, conteo mínimo garantizado)] de los n primeros.
+    """
+    return [
+        (item, int(count), int(count - error))
+        for item, count, error in zip(
+            summary["items"][:n], summary["counts"][:n], summary["errors"][:n]
+        )
+    ]
+
+
+def partial_sketches(transactions_df, baskets):
+    """
+    Sketches de un bloque de transacciones (p. ej. un archivo).
+    """
+    customer_index, customers = pd.factorize(transactions_df["customer"])
+    customer_counts = np.bincount(customer_index, minlength=len(customers))
+    product_counts = np.bincount(baskets["product_ids"])
+    products = np.flatnonzero(product_counts)
+
+    # Los elementos repetidos no cambian los registros: basta hashear los
+    # distintos
+    customers = np.asarray(customers, dtype=object)
+    return {
+        "num_transactions": len(transactions_df),
+        "customers_hll": hll_registers(hash_array(customers)),
+        "products_hll": hll_registers(hash_array(products.astype(np.int64))),
+        "top_customers": top_summary(customers, customer_counts),
+        "top_products": top_summary(products, product_counts[products]),
+        "basket_sizes": np.bincount(baskets["basket_lengths"]),
+    }
+
+
+def merge_sketches(partials):
+    """
+    Combina los sketches de varios bloques en los del conjunto completo.
+    """
+    basket_sizes = np.zeros(
+        max(len(p["basket_sizes"]) for p in partials), dtype=np.int64
+    )
+    for partial in partials:
+        basket_sizes[: len(partial["basket_sizes"])] += partial["basket_sizes"]
+    return {
+        "num_transactions": sum(p["num_transactions"] for p in partials),
+        "customers_hll": np.maximum.reduce([p["customers_hll"] for p in partials]),
+        "products_hll": np.maximum.reduce([p["products_hll"] for p in partials]),
+        "top_customers": merge_top_summaries([p["top_customers"] for p in partials]),
+        "top_products": merge_top_summaries([p["top_products"] for p in partials]),
+        "basket_sizes": basket_sizes,
+    }
+
+
+def sketch_statistics(sketches, n=10):
+    """
+    Estadísticas (aproximadas salvo los cuantiles) a partir de sketches
+    combinados.
+    """
+    quantiles = histogram_quantiles(sketches["basket_sizes"], BASKET_SIZE_QUANTILES)
+    return {
+        "num_transactions": int(sketches["num_transactions"]),
+        "unique_customers": int(round(hll_estimate(sketches["customers_hll"]))),
+        "unique_products": int(round(hll_estimate(sketches["products_hll"]))),
+        "distinct_relative_error": round(hll_relative_error(), 4),
+        "top_customers": [
+            {"customer": str(item), "count": count, "min_count": min_count}
+            for item, count, min_count in top_items(sketches["top_customers"], n)
+        ],
+        "top_products": [
+            {"product": str(item), "count": count, "min_count": min_count}
+            for item, count, min_count in top_items(sketches["top_products"], n)
+        ],
+        "basket_size_quantiles": {
+            f"p{round(q * 100)}": value
+            for q, value in zip(BASKET_SIZE_QUANTILES, quantiles)
+        },
+    }
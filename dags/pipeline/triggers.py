@@ -0,0 +1,63 @@
+"""
+Trigger diferible que espera archivos nuevos en Transactions/.
+
+Se ejecuta en el proceso triggerer (no ocupa un slot de worker mientras
+espera), por lo que debe poder importarse como `pipeline.triggers`.
+"""
+
+import asyncio
+
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+from pipeline.ingest import pending_files
+
+
+class NewTransactionFilesTrigger(BaseTrigger):
+    """
+    Se dispara cuando hay CSVs nuevos o modificados respecto al manifiesto
+    del almacén de transacciones. El evento contiene la lista de archivos.
+    """
+
+    def __init__(
+        self,
+        directory,
+        store_dir,
+        pattern="*.csv",
+        settle_seconds=30.0,
+        poll_interval=60.0,
+    ):
+        super().__init__()
+        self.directory = directory
+        self.store_dir = store_dir
+        self.pattern = pattern
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+
+    def serialize(self):
+        return (
+            "pipeline.triggers.NewTransactionFilesTrigger",
+            {
+                "directory": self.directory,
+                "store_dir": self.store_dir,
+                "pattern": self.pattern,
+                "settle_seconds": self.settle_seconds,
+                "poll_interval": self.poll_interval,
+            },
+        )
+
+    async def run(self):
+        while True:
+            # glob, stat y lectura del manifiesto bloquean: en un hilo para no
+            # detener el bucle de eventos del triggerer
+            files = await asyncio.to_thread(
+                pending_files,
+                self.directory,
+                self.store_dir,
+                self.pattern,
+                self.settle_seconds,
+            )
+            if files:
+                self.log.info(f"Found {len(files)} new transaction files")
+                yield TriggerEvent({"files": files})
+                return
+            await asyncio.sleep(self.poll_interval)
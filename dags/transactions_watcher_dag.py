@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from airflow import DAG
+from airflow.operators.trigger_dagrun import TriggerDagRunOperator
+import os
+
+from pipeline.sensors import NewTransactionFilesSensor
+
+DATA_DIR = "/opt/airflow/data"
+DATASET_DIR = "/opt/airflow/dataset"
+
+# Mismo almacén/manifiesto que usa load_data en dataset_analysis_dag
+TRANSACTIONS_STORE_DIR = os.path.join(DATA_DIR, "transactions_store")
+
+default_args = {
+    "owner": "Marin_Botina",
+    "depends_on_past": False,
+    "retries": 0,
+}
+
+# DAG vigilante: espera archivos nuevos en Transactions/ (sin ocupar un worker
+# gracias al trigger diferible) y lanza el análisis completo cuando llegan.
+with DAG(
+    dag_id="transactions_watcher_dag",
+    default_args=default_args,
+    description="Detecta nuevos archivos de transacciones y lanza el análisis",
+    schedule="@continuous",
+    start_date=datetime(2025, 10, 11),
+    catchup=False,
+    max_active_runs=1,
+    tags=["dataset", "sensor"],
+) as dag:
+
+    t_wait_for_files = NewTransactionFilesSensor(
+        task_id="wait_for_transaction_files",
+        directory=os.path.join(DATASET_DIR, "Transactions"),
+        store_dir=TRANSACTIONS_STORE_DIR,
+        poke_interval=60,
+        timeout=timedelta(hours=12).total_seconds(),
+        soft_fail=True,
+    )
+
+    # Esperar a que termine el análisis: así el manifiesto (o la cuarentena,
+    # si un archivo no es válido) ya incluye los archivos antes de volver a
+    # vigilar la carpeta
+    t_trigger_analysis = TriggerDagRunOperator(
+        task_id="trigger_dataset_analysis",
+        trigger_dag_id="dataset_analysis_dag",
+        wait_for_completion=True,
+        deferrable=True,
+        poke_interval=60,
+    )
+
+    t_wait_for_files >> t_trigger_analysis
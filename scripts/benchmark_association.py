@@ -0,0 +1,105 @@
+"""
+Benchmark de los backends de conteo de pares para las reglas de asociación.
+
+Compara, sobre los CSV de Transactions, el Apriori original con Counter
+(`mine_association_rules`), la tabla de pares con NumPy (`pair_count_table`)
+y el índice de bitsets estilo Eclat (`bitset_pair_count_table`), y verifica
+que los tres generan las mismas reglas.
+
+Uso:
+    python scripts/benchmark_association.py [--transactions-dir Transactions]
+        [--min-support 0.01] [--min-confidence 0.3] [--skip-counter]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "dags"))
+
+from pipeline.bitsets import bitset_pair_count_table  # noqa: E402
+from pipeline.kernels import encode_baskets  # noqa: E402
+from pipeline.rules import (  # noqa: E402
+    RULE_COLUMNS,
+    mine_association_rules,
+    pair_count_table,
+    rules_from_pair_table,
+)
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _normalized(rules):
+    # Mismo orden y redondeo para comparar reglas de distintos backends
+    rules = pd.DataFrame(rules, columns=RULE_COLUMNS)
+    rules = rules.sort_values(["antecedent", "consequent"]).reset_index(drop=True)
+    return rules.round(12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--transactions-dir", default=os.path.join(BASE_DIR, "Transactions")
+    )
+    parser.add_argument("--min-support", type=float, default=0.01)
+    parser.add_argument("--min-confidence", type=float, default=0.3)
+    parser.add_argument(
+        "--skip-counter",
+        action="store_true",
+        help="No ejecutar el backend Counter (lento en datasets grandes)",
+    )
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.transactions_dir, "*.csv")))
+    if not files:
+        sys.exit(f"No transaction files found in {args.transactions_dir}")
+    products = pd.concat(
+        [pd.read_csv(path, sep="|", header=None, usecols=[3])[3] for path in files],
+        ignore_index=True,
+    )
+    product_ids, basket_lengths = encode_baskets(products)
+    baskets = {"product_ids": product_ids, "basket_lengths": basket_lengths}
+    print(
+        f"{len(basket_lengths):,} transactions, {len(product_ids):,} items, "
+        f"min_support={args.min_support}, min_confidence={args.min_confidence}"
+    )
+
+    results = {}
+    if not args.skip_counter:
+        transactions_list = [products_str.split() for products_str in products]
+        (rules, _, _, _), elapsed = _timed(
+            mine_association_rules,
+            transactions_list,
+            args.min_support,
+            args.min_confidence,
+        )
+        results["counter"] = (_normalized(rules), elapsed)
+
+    for name, count_pairs in [
+        ("numpy_pairs", pair_count_table),
+        ("bitset", bitset_pair_count_table),
+    ]:
+        table, elapsed = _timed(count_pairs, baskets, args.min_support)
+        rules = rules_from_pair_table(table, args.min_support, args.min_confidence)
+        results[name] = (_normalized(rules), elapsed)
+
+    reference_name, (reference, _) = next(iter(results.items()))
+    print(f"\n{'backend':<12} {'seconds':>10} {'rules':>8}  same_rules")
+    for name, (rules, elapsed) in results.items():
+        same = rules.equals(reference)
+        print(f"{name:<12} {elapsed:>10.3f} {len(rules):>8}  {same}")
+        if not same:
+            print(f"  ! {name} rules differ from {reference_name}")
+
+
+if __name__ == "__main__":
+    main()
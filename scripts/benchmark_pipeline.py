@@ -0,0 +1,306 @@
+"""
+Benchmark de las rutas críticas del pipeline y de la app, fuera de Airflow.
+
+Ejecuta con el runner local las tareas del DAG (ingesta y `load_data`,
+`data_review`, `descriptive_stats`, `temporal_analysis`, `customer_analysis`,
+`product_association`, `recommendation_system`) sobre un directorio de
+trabajo temporal, y después las funciones de la app de Streamlit que
+recalculan a partir de las transacciones (si Streamlit está instalado).
+Cada repetición empieza con el almacén vacío, así que no hay memoización.
+
+Los tiempos se guardan en JSON; con `--compare` se comparan con un JSON
+anterior y el script termina con error si algún paso es más lento que la
+tolerancia indicada.
+
+No necesita Airflow (ver `scripts/run_local.py`).
+
+Uso:
+    python scripts/benchmark_pipeline.py [--transactions-dir Transactions]
+        [--scale 1] [--seed 0] [--repeat 1] [--output benchmark.json]
+        [--compare baseline.json] [--tolerance 0.1]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "dags"))
+sys.path.insert(0, BASE_DIR)
+
+from generate_transactions import generate  # noqa: E402
+from pipeline.local_runner import (  # noqa: E402
+    LocalRunner,
+    airflow_paths,
+    redirect_paths,
+)
+
+# Tareas del DAG medidas (se ejecutan con sus dependencias)
+PIPELINE_TASKS = [
+    "load_data",
+    "data_review",
+    "descriptive_stats",
+    "temporal_analysis",
+    "customer_analysis",
+    "product_association",
+    "recommendation_system",
+]
+
+# Tareas que se suman al tiempo de load_data (planificación e ingesta)
+LOAD_TASKS = ["plan_transaction_files", "ingest_transaction_file"]
+
+
+def prepare_dataset(workdir, transactions_dir, products_dir):
+    """
+    Directorio con la estructura que espera el DAG (Products/, Transactions/).
+    """
+    dataset_dir = os.path.join(workdir, "dataset")
+    os.makedirs(dataset_dir)
+    os.symlink(products_dir, os.path.join(dataset_dir, "Products"))
+    os.symlink(transactions_dir, os.path.join(dataset_dir, "Transactions"))
+    return dataset_dir
+
+
+def run_pipeline(dag_module, overrides, backend):
+    """
+    Ejecuta las tareas medidas del DAG con el runner local, en este proceso.
+    Devuelve {tarea: segundos}.
+    """
+    runner = LocalRunner(
+        dag_module,
+        params={"full_refresh": True, "association_backend": backend},
+        overrides=overrides,
+    )
+    timings = runner.run(PIPELINE_TASKS)
+    timings["load_data"] += sum(timings.pop(task_id, 0.0) for task_id in LOAD_TASKS)
+    return {task_id: timings[task_id] for task_id in PIPELINE_TASKS}
+
+
+def run_app_helpers(app, workdir, dataset_dir, min_support, min_confidence):
+    """
+    Funciones de la app sin la caché de Streamlit (`__wrapped__`), usando los
+    archivos publicados por el DAG en el directorio de trabajo.
+    """
+    data_dir = Path(workdir) / "data"
+    app.PRODUCTS_DIR = Path(dataset_dir) / "Products"
+    app.TRANSACTIONS_DIR = Path(dataset_dir) / "Transactions"
+    for name in [
+        "FREQUENCIES_FILE",
+        "CATEGORY_LOOKUP_FILE",
+        "CATEGORY_COOCCURRENCE_FILE",
+        "RULES_DIR",
+        "RESULTS_DB",
+    ]:
+        setattr(app, name, data_dir / getattr(app, name).relative_to(app.DATA_DIR))
+    app.DATA_DIR = data_dir
+
+    def timed(step, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = getattr(function, "__wrapped__", function)(*args, **kwargs)
+        timings[step] = time.perf_counter() - start
+        return result
+
+    timings = {}
+    _, product_category_df, transactions_df = timed("app.load_data", app.load_data)
+    timed("app.calculate_statistics", app.calculate_statistics, transactions_df)
+    timed(
+        "app.get_top_products",
+        app.get_top_products,
+        transactions_df,
+        product_category_df,
+    )
+    timed("app.get_top_customers", app.get_top_customers, transactions_df)
+    timed(
+        "app.get_category_cooccurrence",
+        app.get_category_cooccurrence,
+        transactions_df,
+        product_category_df,
+    )
+    fingerprint = timed(
+        "app.get_dataset_fingerprint",
+        app.get_dataset_fingerprint,
+        app.get_transactions_file_stats(),
+    )
+    association = app.get_association_rules(fingerprint, min_support, min_confidence)
+    if association is not None:
+        rules, item_counts = association
+        customer = transactions_df["customer"].iloc[0]
+        timed(
+            "app.recommend_for_customer",
+            app.recommend_for_customer,
+            customer,
+            transactions_df,
+            rules,
+        )
+        product, _ = item_counts.most_common(1)[0]
+        timed("app.recommend_for_product", app.recommend_for_product, product, rules)
+    return timings
+
+
+def summarize(runs):
+    """
+    {paso: {seconds, best, median}} a partir de los tiempos de cada repetición.
+    """
+    steps = {}
+    for timings in runs:
+        for step, seconds in timings.items():
+            steps.setdefault(step, []).append(seconds)
+    return {
+        step: {
+            "seconds": values,
+            "best": min(values),
+            "median": statistics.median(values),
+        }
+        for step, values in steps.items()
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Imprime la comparación por paso (mejor tiempo). Devuelve los pasos que
+    empeoran más que `tolerance` (fracción).
+    """
+    regressions = []
+    print(f"\n{'step':<36} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for step, stats in current["steps"].items():
+        previous = baseline["steps"].get(step)
+        if previous is None:
+            print(f"{step:<36} {'-':>10} {stats['best']:>10.3f}")
+            continue
+        ratio = stats["best"] / previous["best"] if previous["best"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(step)
+            flag = "  REGRESSION"
+        print(
+            f"{step:<36} {previous['best']:>10.3f} {stats['best']:>10.3f} "
+            f"{ratio:>7.2f}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--transactions-dir",
+        help="CSV de transacciones reales (por defecto se generan sintéticos)",
+    )
+    parser.add_argument(
+        "--products-dir", default=os.path.join(BASE_DIR, "Products")
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Escala de los datos sintéticos (1 = 1.1M transacciones)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--backend", default="pairs")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Empeoramiento admitido en --compare (0.1 = 10%%)",
+    )
+    parser.add_argument(
+        "--skip-app", action="store_true", help="No medir las funciones de la app"
+    )
+    args = parser.parse_args()
+
+    import dataset_analysis_dag as dag_module
+
+    dag_paths = airflow_paths(dag_module)
+
+    app = None
+    if not args.skip_app:
+        try:
+            import app_streamlit as app
+        except ImportError as e:
+            print(f"Skipping Streamlit helpers ({e})")
+
+    products_dir = os.path.abspath(args.products_dir)
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="benchmark_") as tmp:
+        transactions_dir = args.transactions_dir
+        if transactions_dir is None:
+            transactions_dir = os.path.join(tmp, "Transactions")
+            start = time.perf_counter()
+            generate(transactions_dir, args.scale, args.seed, products_dir)
+            print(
+                f"Generated synthetic data (scale={args.scale}, seed={args.seed}) "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+        transactions_dir = os.path.abspath(transactions_dir)
+        files = sorted(Path(transactions_dir).glob("*.csv"))
+        dataset = {
+            "transactions_dir": transactions_dir if args.transactions_dir else None,
+            "scale": None if args.transactions_dir else args.scale,
+            "seed": None if args.transactions_dir else args.seed,
+            "num_files": len(files),
+            "bytes": sum(path.stat().st_size for path in files),
+        }
+
+        for repetition in range(args.repeat):
+            workdir = os.path.join(tmp, f"run_{repetition}")
+            dataset_dir = prepare_dataset(workdir, transactions_dir, products_dir)
+            overrides = redirect_paths(dag_paths, workdir, dataset_dir)
+            timings = run_pipeline(dag_module, overrides, args.backend)
+            if app is not None:
+                timings.update(
+                    run_app_helpers(
+                        app,
+                        workdir,
+                        dataset_dir,
+                        dag_module.MIN_SUPPORT,
+                        dag_module.MIN_CONFIDENCE,
+                    )
+                )
+            runs.append(timings)
+            shutil.rmtree(workdir, ignore_errors=True)
+            summary = ", ".join(
+                f"{step}={seconds:.2f}s" for step, seconds in timings.items()
+            )
+            print(f"Run {repetition + 1}/{args.repeat}: {summary}")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": args.backend,
+        "repeat": args.repeat,
+        "dataset": dataset,
+        "steps": summarize(runs),
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            sys.exit(
+                f"Regressions above {args.tolerance:.0%}: {', '.join(regressions)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Generador determinista de transacciones sintéticas.
+
+Escribe `<tienda>_Tran.csv` con el mismo formato que los CSV reales de
+Transactions (`fecha|tienda|cliente|productos`, productos separados por
+espacios) a una escala configurable: `--scale 1` equivale al dataset original
+(1,108,987 transacciones de 131,186 clientes entre enero y junio de 2013),
+`--scale 10` a diez veces más, etc.
+
+Distribuciones:
+- Tamaño de canasta: 1 + binomial negativa (media ~9.5 productos).
+- Popularidad de productos: Zipf sobre los productos de ProductCategory.csv
+  (los códigos bajos son los más vendidos, como en los datos reales).
+- Afinidad por categoría: cada canasta tiene una categoría principal y parte
+  de sus productos se eligen dentro de ella, lo que genera reglas con lift > 1.
+- Fechas con más transacciones en fin de semana y clientes con actividad
+  desigual (unos pocos compran mucho).
+
+La misma semilla y escala generan siempre los mismos archivos.
+
+Uso:
+    python scripts/generate_transactions.py --output-dir /tmp/synthetic/Transactions
+        [--scale 1] [--seed 0] [--products-dir Products]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tamaño del dataset original (escala 1)
+BASE_TRANSACTIONS = 1_108_987
+BASE_CUSTOMERS = 131_186
+MEAN_BASKET_SIZE = 9.55
+
+# Reparto de transacciones por tienda (una tienda por archivo)
+STORE_SHARES = {102: 0.30, 103: 0.25, 107: 0.25, 110: 0.20}
+
+DATE_RANGE = ("2013-01-01", "2013-06-30")
+
+# Peso relativo de cada día de la semana (lunes a domingo)
+WEEKDAY_WEIGHTS = np.array([1.0, 0.98, 0.95, 1.0, 1.1, 1.2, 1.35])
+
+# Exponente de la ley de Zipf de popularidad de productos
+ZIPF_EXPONENT = 1.1
+
+# Fracción de productos de una canasta elegidos en su categoría principal
+CATEGORY_AFFINITY = 0.4
+
+# Dispersión del tamaño de canasta (parámetro n de la binomial negativa)
+BASKET_SIZE_DISPERSION = 4
+
+# Transacciones generadas y escritas por bloque
+CHUNK_TRANSACTIONS = 250_000
+
+
+def load_catalog(products_dir):
+    """
+    Productos y su categoría desde ProductCategory.csv, ordenados por código.
+    """
+    catalog = pd.read_csv(
+        os.path.join(products_dir, "ProductCategory.csv"),
+        sep="|",
+        header=None,
+        names=["product_code", "category_id"],
+    )
+    # La primera fila del archivo es una cabecera
+    catalog = catalog.apply(pd.to_numeric, errors="coerce").dropna()
+    catalog = catalog.astype(np.int64).drop_duplicates("product_code")
+    catalog = catalog.sort_values("product_code")
+    return catalog["product_code"].to_numpy(), catalog["category_id"].to_numpy()
+
+
+def build_product_sampler(product_codes, categories, exponent=ZIPF_EXPONENT):
+    """
+    Tablas para muestrear productos (Zipf por código) globalmente o dentro
+    de una categoría, con búsqueda binaria sobre probabilidades acumuladas.
+    """
+    weights = 1.0 / np.arange(1, len(product_codes) + 1) ** exponent
+    global_cdf = np.cumsum(weights) / weights.sum()
+    global_cdf[-1] = 1.0
+
+    # Productos agrupados por categoría: clave = posición de la categoría +
+    # probabilidad acumulada dentro de ella (en (c, c + 1])
+    _, category_position = np.unique(categories, return_inverse=True)
+    order = np.lexsort((np.arange(len(categories)), category_position))
+    grouped_weights = weights[order]
+    grouped_positions = category_position[order]
+    category_totals = np.bincount(grouped_positions, weights=grouped_weights)
+    cumulative = np.cumsum(grouped_weights)
+    ends = np.cumsum(np.bincount(grouped_positions))
+    previous = np.repeat(
+        np.r_[0.0, cumulative[ends[:-1] - 1]], np.diff(np.r_[0, ends])
+    )
+    within = (cumulative - previous) / category_totals[grouped_positions]
+    within[ends - 1] = 1.0
+
+    category_cdf = np.cumsum(category_totals) / category_totals.sum()
+    category_cdf[-1] = 1.0
+
+    labels = product_codes.astype(str).astype(object)
+    return {
+        "global_cdf": global_cdf,
+        "category_cdf": category_cdf,
+        "category_keys": grouped_positions + within,
+        "category_order": order,
+        "labels_space": labels + " ",
+        "labels_newline": labels + "\n",
+    }
+
+
+def sample_products(sampler, rng, basket_categories):
+    """
+    Un producto por posición: dentro de la categoría principal de su canasta
+    con probabilidad CATEGORY_AFFINITY, si no según la popularidad global.
+    """
+    size = len(basket_categories)
+    products = np.searchsorted(sampler["global_cdf"], rng.random(size), side="right")
+    in_category = rng.random(size) < CATEGORY_AFFINITY
+    targets = basket_categories[in_category] + rng.random(int(in_category.sum()))
+    grouped = np.searchsorted(sampler["category_keys"], targets, side="right")
+    products[in_category] = sampler["category_order"][grouped]
+    return products
+
+
+def generate_chunk(sampler, rng, store, num_transactions, customer_cdf, days):
+    """
+    Texto CSV de un bloque de transacciones de una tienda.
+    """
+    sizes = 1 + rng.negative_binomial(
+        BASKET_SIZE_DISPERSION,
+        BASKET_SIZE_DISPERSION / (BASKET_SIZE_DISPERSION + MEAN_BASKET_SIZE - 1),
+        num_transactions,
+    )
+    basket_categories = np.searchsorted(
+        sampler["category_cdf"], rng.random(num_transactions), side="right"
+    )
+    products = sample_products(sampler, rng, np.repeat(basket_categories, sizes))
+
+    day_index = np.searchsorted(
+        days["cdf"], rng.random(num_transactions), side="right"
+    )
+    customers = 1 + np.searchsorted(
+        customer_cdf, rng.random(num_transactions), side="right"
+    )
+
+    # Tokens en orden de escritura: cabecera de cada fila y sus productos
+    # (el último de cada canasta termina la línea)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    last = np.zeros(len(products), dtype=bool)
+    last[starts + sizes - 1] = True
+    header_positions = starts + np.arange(num_transactions)
+    product_positions = np.arange(len(products)) + np.repeat(
+        np.arange(1, num_transactions + 1), sizes
+    )
+    tokens = np.empty(len(products) + num_transactions, dtype=object)
+    tokens[header_positions] = [
+        f"{day}|{store}|{customer}|"
+        for day, customer in zip(
+            days["labels"][day_index].tolist(), customers.tolist()
+        )
+    ]
+    tokens[product_positions] = np.where(
+        last, sampler["labels_newline"][products], sampler["labels_space"][products]
+    )
+    return "".join(tokens.tolist())
+
+
+def generate(output_dir, scale=1.0, seed=0, products_dir=None):
+    """
+    Genera los CSV sintéticos en `output_dir`. Devuelve {path: transacciones}.
+    """
+    products_dir = products_dir or os.path.join(BASE_DIR, "Products")
+    os.makedirs(output_dir, exist_ok=True)
+    product_codes, categories = load_catalog(products_dir)
+    sampler = build_product_sampler(product_codes, categories)
+
+    # Actividad de clientes compartida por todas las tiendas
+    num_customers = max(1, round(BASE_CUSTOMERS * scale))
+    customer_weights = np.random.default_rng([seed]).gamma(0.6, size=num_customers)
+    customer_cdf = np.cumsum(customer_weights) / customer_weights.sum()
+    customer_cdf[-1] = 1.0
+
+    dates = pd.date_range(*DATE_RANGE, freq="D")
+    day_weights = WEEKDAY_WEIGHTS[dates.dayofweek]
+    days = {
+        "labels": np.array(dates.strftime("%Y-%m-%d"), dtype=object),
+        "cdf": np.cumsum(day_weights) / day_weights.sum(),
+    }
+    days["cdf"][-1] = 1.0
+
+    total = round(BASE_TRANSACTIONS * scale)
+    written = {}
+    for store, share in STORE_SHARES.items():
+        path = os.path.join(output_dir, f"{store}_Tran.csv")
+        num_transactions = round(total * share)
+        with open(path, "w") as f:
+            chunk_starts = range(0, num_transactions, CHUNK_TRANSACTIONS)
+            for chunk, lo in enumerate(chunk_starts):
+                # Semilla por (tienda, bloque): el resultado no depende del orden
+                rng = np.random.default_rng([seed, store, chunk])
+                size = min(CHUNK_TRANSACTIONS, num_transactions - lo)
+                f.write(
+                    generate_chunk(sampler, rng, store, size, customer_cdf, days)
+                )
+        written[path] = num_transactions
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Tamaño relativo al dataset original (1 = 1.1M transacciones)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--products-dir", default=os.path.join(BASE_DIR, "Products")
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = generate(args.output_dir, args.scale, args.seed, args.products_dir)
+    for path, num_transactions in written.items():
+        print(f"{path}: {num_transactions:,} transactions")
+    print(
+        f"Generated {sum(written.values()):,} transactions "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
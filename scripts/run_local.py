@@ -0,0 +1,90 @@
+"""
+Ejecuta el DAG `dataset_analysis_dag` en local, sin Airflow.
+
+Usa las mismas funciones de tarea y el mismo grafo (ver
+`dags/pipeline/local_runner.py`). Las rutas `/opt/airflow/...` se sustituyen
+como en los volúmenes de docker-compose: `data/` y `results/` bajo `--root`,
+`Products/` y `Transactions/` bajo `--dataset-dir` (por defecto, la raíz del
+repositorio para ambos).
+
+Uso:
+    python scripts/run_local.py [--task customer_analysis ...] [--workers 4]
+        [--param full_refresh=true] [--root DIR] [--dataset-dir DIR]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "dags"))
+
+import dataset_analysis_dag  # noqa: E402
+from pipeline.local_runner import (  # noqa: E402
+    LocalRunner,
+    airflow_paths,
+    redirect_paths,
+)
+
+
+def parse_param(text):
+    # key=valor, con el valor interpretado como JSON si es posible
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--task",
+        action="append",
+        dest="tasks",
+        help="Tarea a ejecutar junto con sus dependencias (repetible; "
+        "por defecto todo el DAG)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para ejecutar ramas en paralelo (1 = en este proceso)",
+    )
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        type=parse_param,
+        help="Parámetro del DAG key=valor (repetible)",
+    )
+    parser.add_argument("--run-id")
+    parser.add_argument("--root", default=BASE_DIR)
+    parser.add_argument("--dataset-dir", default=BASE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    overrides = redirect_paths(
+        airflow_paths(dataset_analysis_dag),
+        os.path.abspath(args.root),
+        os.path.abspath(args.dataset_dir),
+    )
+    runner = LocalRunner(
+        dataset_analysis_dag,
+        run_id=args.run_id,
+        params=dict(args.param),
+        workers=args.workers,
+        overrides=overrides,
+    )
+    timings = runner.run(args.tasks)
+
+    print(f"\n{'task':<32} {'seconds':>10}")
+    for task_id, seconds in timings.items():
+        print(f"{task_id:<32} {seconds:>10.2f}")
+    print(f"{'total':<32} {sum(timings.values()):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()